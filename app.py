@@ -13,7 +13,10 @@ import json
 import os
 import sys
 import logging
-from datetime import datetime
+import re
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime, date, time as dt_time
+from decimal import Decimal
 from typing import Dict, Any, List
 
 # Add project root to path for imports
@@ -54,6 +57,14 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Seconds between two checks of the background export and chart jobs
+ARTIFACT_POLL_SECONDS = float(os.getenv("ARTIFACT_POLL_SECONDS", "0.5"))
+
+@st.cache_resource
+def _question_executor() -> ThreadPoolExecutor:
+    """Worker threads running questions, so the script can poll for query previews."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="telmi-question")
+
 class TelmiApp:
     """Main Telmi application class with avatar button and account settings toggle."""
 
@@ -76,6 +87,7 @@ class TelmiApp:
             'processing_message': False,  # FIXED: Single processing flag
             'show_thinking': False,       # FIXED: Separate flag for thinking indicator
             'typing_response': "",
+            'approximate_mode': False,    # Opt-in: answer large aggregates from a sample
             'show_account_settings': False,  # NEW: Toggle between chat and account settings
             'show_delete_confirmation': False,  # NEW: Delete confirmation state
             'agent_status_checked': False,
@@ -432,7 +444,9 @@ class TelmiApp:
 
     def _render_thinking_overlay(self):
         """FIXED: Render thinking overlay that doesn't interfere with layout."""
-        st.markdown("""
+        # Kept in a placeholder so a query preview can replace it
+        self._thinking_slot = st.empty()
+        self._thinking_slot.markdown("""
             <div class="thinking-overlay">
                 <div class="thinking-card">
                     <div class="thinking-icon">🔮</div>
@@ -457,11 +471,19 @@ class TelmiApp:
             return
 
         user_input = st.session_state.queued_message
+        approximate = st.session_state.get('queued_approximate', False)
         logger.info(f"🔄 Processing queued message: {user_input[:50]}...")
 
+        request_id = uuid.uuid4().hex
+
         try:
-            # Call the bridge
-            result = telmi_bridge.process_question(user_input)
+            # Call the bridge in a worker; a fast preview of the query is shown meanwhile
+            future = _question_executor().submit(
+                telmi_bridge.process_question, user_input,
+                username=(st.session_state.user_info or {}).get('username', 'unknown'),
+                approximate=approximate, request_id=request_id
+            )
+            result = self._wait_with_preview(future, request_id)
 
             if result['success']:
                 response = result['response']
@@ -471,11 +493,16 @@ class TelmiApp:
                 if processing_time > 0:
                     response += f"\n\n*⏱️ Processed in {processing_time:.2f} seconds*"
 
-                # Parse response for attachments
-                attachments = self._extract_attachments(response)
+                # Artifact references and result rows come straight from the agent state
+                attachments = self._attachments_from_result(result)
+
+                # Sampled answers can be escalated to an exact run of the same question
+                if '[EXACT_RUN_PLACEHOLDER]' in response:
+                    attachments['exact_rerun'] = {'question': user_input, 'id': uuid.uuid4().hex}
 
                 # Add agent response
                 self._add_message('agent', response, attachments)
+                self._link_artifacts(attachments)
             else:
                 # Add error response
                 error_response = result.get('response', 'Unknown error occurred')
@@ -503,11 +530,67 @@ class TelmiApp:
             # FIXED: Clear processing states properly
             if 'queued_message' in st.session_state:
                 del st.session_state.queued_message
+            st.session_state.queued_approximate = False
             st.session_state.processing_message = False
             st.session_state.show_thinking = False
             logger.info("🔄 Message processing completed")
             st.rerun()
 
+    def _wait_with_preview(self, future, request_id: str) -> Dict[str, Any]:
+        """Wait for the answer, rendering the speculative preview as soon as it lands.
+
+        If the script run is interrupted (the user clicked or typed something else),
+        the full query is cancelled on the database.
+        """
+        from src.database.speculative import speculative_executor
+
+        preview_slot = st.empty()
+        started = time.time()
+        preview_shown = False
+        try:
+            while True:
+                try:
+                    result = future.result(timeout=0.25)
+                except FutureTimeout:
+                    pass
+                else:
+                    speculative_executor.release(request_id)
+                    return result
+                elapsed = time.time() - started
+
+                preview = speculative_executor.get_preview(request_id)
+                if preview is None:
+                    # Also gives Streamlit a point to interrupt this run
+                    preview_slot.caption(f"⏳ Working... {elapsed:.0f}s")
+                    continue
+
+                if not preview_shown and getattr(self, '_thinking_slot', None) is not None:
+                    self._thinking_slot.empty()
+                preview_shown = True
+                with preview_slot.container():
+                    self._render_preview(preview, elapsed)
+        except BaseException:
+            # The cancelled entry stays until it expires: a worker that has not
+            # reached start() yet must still find its token cancelled
+            speculative_executor.cancel(request_id)
+            raise
+        finally:
+            preview_slot.empty()
+
+    def _render_preview(self, preview: Dict[str, Any], elapsed: float):
+        """Render the fast preview shown until the full result replaces it."""
+        import pandas as pd
+
+        if preview['kind'] == 'sampled':
+            approximation = preview.get('approximation') or {}
+            label = f"≈ Preview from a {approximation.get('sample_percent', 0):g}% sample"
+        else:
+            label = f"Preview of the first {preview['row_count']:,} rows"
+
+        st.caption(f"🔮 {label} ({preview['elapsed_ms']:.0f} ms) — full result running for {elapsed:.0f}s...")
+        df = pd.DataFrame(preview['data'], columns=preview['columns'])
+        st.dataframe(df, use_container_width=True, hide_index=True)
+
     def _render_main_chat(self):
         """Render the main chat interface."""
         # Header
@@ -556,12 +639,21 @@ class TelmiApp:
                 </div>
             """, unsafe_allow_html=True)
 
+        # Exports and charts generated in the background appear as their jobs finish
+        pending, resolved = self._refresh_pending_artifacts()
+        if resolved:
+            self._save_session_to_history()
+
         for message in st.session_state.current_messages:
             if message['role'] == 'user':
                 self._render_user_message(message['content'])
             else:
                 self._render_agent_message_unified(message)
 
+        if pending and not st.session_state.processing_message:
+            time.sleep(ARTIFACT_POLL_SECONDS)
+            st.rerun()
+
     def _render_user_message(self, content: str):
         """Render a user message."""
         st.markdown(f"""
@@ -611,12 +703,15 @@ class TelmiApp:
                 continue
 
             # Handle each type of placeholder
+            pending = attachments.get('pending_artifacts', {})
+
             if '[TABLE_DATA_PLACEHOLDER]' in section:
-                section_title = section.replace('[TABLE_DATA_PLACEHOLDER]', '').strip()
+                section_title = section.replace('[TABLE_DATA_PLACEHOLDER]', '')
+                section_title = re.sub(r'\[RESULT_HANDLE:\w+\]', '', section_title).strip()
                 if section_title:
                     st.markdown(section_title)
                 if 'table_data' in attachments:
-                    self._render_table_clean(attachments['table_data'])
+                    self._render_table_clean(attachments['table_data'], attachments.get('result_handle'))
 
             elif '[CHART_DISPLAY_PLACEHOLDER]' in section:
                 section_title = section.replace('[CHART_DISPLAY_PLACEHOLDER]', '').strip()
@@ -624,12 +719,22 @@ class TelmiApp:
                     st.markdown(section_title)
                 if 'chart' in attachments:
                     self._render_chart_complete(attachments['chart'])
+                elif 'chart' in pending:
+                    st.caption("⏳ Preparing the chart...")
+                else:
+                    st.caption("No chart for this result")
+
+            elif '[EXACT_RUN_PLACEHOLDER]' in section:
+                if 'exact_rerun' in attachments:
+                    self._render_exact_run_button(attachments['exact_rerun'])
 
             elif '[DOWNLOAD_BUTTONS_PLACEHOLDER]' in section:
                 section_title = section.replace('[DOWNLOAD_BUTTONS_PLACEHOLDER]', '').strip()
                 if section_title:
                     st.markdown(section_title)
-                if attachments:
+                if pending:
+                    st.caption("⏳ Preparing downloads...")
+                if 'csv' in attachments or 'chart' in attachments:
                     self._render_downloads_clean(attachments)
 
             elif '```sql' in section or (section.startswith('```') and 'sql' in section.lower()):
@@ -646,6 +751,13 @@ class TelmiApp:
             st.markdown("### **📁 Downloads:**")
             self._render_downloads_clean(attachments)
 
+    def _render_exact_run_button(self, exact_rerun: Dict[str, Any]):
+        """Render the one-click escalation from a sampled answer to an exact run."""
+        if st.button("🎯 Run exact query", key=f"exact_run_{exact_rerun['id']}",
+                     disabled=st.session_state.processing_message,
+                     help="Re-run this question on the full table instead of a sample"):
+            self._process_user_message(exact_rerun['question'], approximate=False)
+
     def _render_sql_block_from_section(self, section: str):
         """Render SQL code block from a section."""
         lines = section.split('\n')
@@ -687,8 +799,8 @@ class TelmiApp:
             else:
                 st.markdown(line)
 
-    def _render_table_clean(self, table_data: Dict[str, Any]):
-        """Render data table with clean styling."""
+    def _render_table_clean(self, table_data: Dict[str, Any], handle_ref: Dict[str, Any] = None):
+        """Render data table with clean styling, plus a button to load the next page."""
         try:
             import pandas as pd
 
@@ -703,9 +815,31 @@ class TelmiApp:
             st.dataframe(df, use_container_width=True, hide_index=True)
             st.markdown(f"<small style='color: #666; font-style: italic;'>📉 {len(data):,} rows × {len(columns)} columns</small>", unsafe_allow_html=True)
 
+            if handle_ref:
+                self._render_load_more(table_data, handle_ref)
+
         except Exception as e:
             st.error(f"Error displaying table: {e}")
 
+    def _render_load_more(self, table_data: Dict[str, Any], handle_ref: Dict[str, Any]):
+        """Fetch the next page of a large result through its handle (keyset pagination)."""
+        from src.database.pagination import result_handles
+
+        handle = result_handles.get(handle_ref['id'])
+        if handle is None:
+            st.caption("More rows are available — ask the question again to browse them")
+            return
+        if not handle.has_more:
+            return
+
+        if st.button(f"⬇️ Load {handle.page_size:,} more rows", key=f"load_more_{handle.id}",
+                     disabled=st.session_state.processing_message):
+            with st.spinner("Loading more rows..."):
+                page = handle.next_page()
+            table_data['data'].extend(self._table_rows(page['data']))
+            self._save_session_to_history()
+            st.rerun()
+
     def _render_chart_complete(self, chart_info: Dict[str, str]):
         """Render chart with complete content."""
         if os.path.exists(chart_info['path']):
@@ -785,16 +919,24 @@ class TelmiApp:
             with col2:
                 submit_button = st.form_submit_button("Send", use_container_width=True)
 
+            approximate = st.checkbox(
+                "≈ Approximate mode",
+                value=st.session_state.approximate_mode,
+                help="Answer large aggregate questions from a table sample, with confidence intervals"
+            )
+
             if submit_button and user_input.strip():
-                self._process_user_message(user_input.strip())
+                st.session_state.approximate_mode = approximate
+                self._process_user_message(user_input.strip(), approximate=approximate)
 
-    def _process_user_message(self, user_input: str):
+    def _process_user_message(self, user_input: str, approximate: bool = False):
         """FIXED: Process user input without infinite loops."""
         # Add user message immediately
         self._add_message('user', user_input)
 
         # FIXED: Set up processing states properly
         st.session_state.queued_message = user_input
+        st.session_state.queued_approximate = approximate
         st.session_state.processing_message = True
         st.session_state.show_thinking = True
 
@@ -827,70 +969,112 @@ class TelmiApp:
             st.session_state.current_session_id = str(uuid.uuid4())
             logger.info(f"📝 Created new session ID: {st.session_state.current_session_id}")
 
-    def _extract_attachments(self, response: str) -> Dict[str, Any]:
-        """Extract file attachments and data from agent response."""
+    def _attachments_from_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Attachments handed over by the agent: artifact references and the in-memory result rows."""
         attachments = {}
+        handed = result.get('attachments') or {}
+
+        for kind in ('csv', 'chart'):
+            item = handed.get(kind)
+            if item and item.get('path'):
+                attachments[kind] = {
+                    'filename': item.get('filename') or os.path.basename(item['path']),
+                    'path': item['path'],
+                    'size': item.get('size') or 'Unknown',
+                    'artifact_id': item.get('artifact_id')
+                }
 
-        try:
-            # Find the most recent CSV and chart files
-            csv_dir = "exports"
-            if os.path.exists(csv_dir):
-                csv_files = [f for f in os.listdir(csv_dir) if f.endswith('.csv')]
-                if csv_files:
-                    csv_files.sort(key=lambda x: os.path.getmtime(os.path.join(csv_dir, x)), reverse=True)
-                    latest_csv = csv_files[0]
-                    csv_path = os.path.join(csv_dir, latest_csv)
-
-                    stat = os.stat(csv_path)
-                    attachments['csv'] = {
-                        'filename': latest_csv,
-                        'path': csv_path,
-                        'size': f"{stat.st_size/1024:.1f} KB"
-                    }
+        # Exports and charts still being generated in the background are polled by job
+        if handed.get('pending_artifacts'):
+            attachments['pending_artifacts'] = dict(handed['pending_artifacts'])
+
+        # The table shows the rows already in memory; large results fetch further pages through the handle
+        query_result = result.get('result') or {}
+        if query_result.get('columns') and query_result.get('data'):
+            attachments['table_data'] = {
+                'columns': list(query_result['columns']),
+                'data': self._table_rows(query_result['data'])
+            }
+        handle = result.get('result_handle')
+        if handle and handle.get('has_more'):
+            attachments['result_handle'] = {'id': handle['id']}
+
+        return attachments
 
-                    # Find recent chart files (only from last 2 minutes to avoid old charts)
-                    chart_dir = "visualizations"
-                    if os.path.exists(chart_dir):
-                        import time
-                        current_time = time.time()
-
-                        chart_files = []
-                        for f in os.listdir(chart_dir):
-                            if f.endswith('.html'):
-                                file_path = os.path.join(chart_dir, f)
-                                file_age = current_time - os.path.getmtime(file_path)
-                                # Only include files created in the last 2 minutes
-                                if file_age <= 120:  # 2 minutes
-                                    chart_files.append(f)
-
-                        if chart_files:
-                            chart_files.sort(key=lambda x: os.path.getmtime(os.path.join(chart_dir, x)), reverse=True)
-                            latest_chart = chart_files[0]
-                            chart_path = os.path.join(chart_dir, latest_chart)
-
-                            stat = os.stat(chart_path)
-                            attachments['chart'] = {
-                                'filename': latest_chart,
-                                'path': chart_path,
-                                'size': f"{stat.st_size/1024:.1f} KB"
-                            }
-
-            # Extract table data from CSV for display
-            if 'csv' in attachments:
+    def _table_rows(self, rows: List[Any]) -> List[List[Any]]:
+        """Rows with JSON-friendly values, as saved in the session history."""
+        def convert(value):
+            if isinstance(value, Decimal):
+                return float(value)
+            if isinstance(value, datetime):
+                return value.strftime("%Y-%m-%d %H:%M:%S")
+            if isinstance(value, (date, dt_time)):
+                return value.isoformat()
+            return value
+        return [[convert(value) for value in row] for row in rows]
+
+    def _link_artifacts(self, attachments: Dict[str, Any]):
+        """Record the message's artifacts against the current session in the artifact index."""
+        session_id = st.session_state.get('current_session_id')
+        if not session_id:
+            return
+        from core.artifact_store import artifact_store
+        for kind in ('csv', 'chart'):
+            item = attachments.get(kind)
+            if item and item.get('artifact_id'):
                 try:
-                    import pandas as pd
-                    df = pd.read_csv(attachments['csv']['path'])
-                    attachments['table_data'] = {
-                        'columns': df.columns.tolist(),
-                        'data': df.values.tolist()
-                    }
+                    artifact_store.link(session_id, item['artifact_id'], item['filename'])
                 except Exception as e:
-                    logger.error(f"❌ Could not extract table data from CSV: {e}")
+                    logger.error(f"❌ Could not link artifact to session: {e}")
 
-        except Exception as e:
-            logger.error(f"❌ Error extracting attachments: {e}")
+    def _refresh_pending_artifacts(self) -> tuple:
+        """Resolve finished artifact jobs of the current messages: (some still pending, some resolved)."""
+        pending = resolved = False
+        for message in st.session_state.current_messages:
+            attachments = message.get('attachments') or {}
+            if not attachments.get('pending_artifacts'):
+                continue
+            before = len(attachments['pending_artifacts'])
+            pending |= self._resolve_pending_artifacts(attachments)
+            resolved |= len(attachments.get('pending_artifacts', {})) < before
+        return pending, resolved
+
+    def _resolve_pending_artifacts(self, attachments: Dict[str, Any]) -> bool:
+        """Move finished background artifacts into the attachments; True while some are still running."""
+        from core.artifact_jobs import artifact_jobs
+
+        pending = attachments['pending_artifacts']
+        for kind, job_id in list(pending.items()):
+            job = artifact_jobs.get(job_id)
+            if job is not None and not job.done:
+                continue
 
-        return attachments
+            # Finished, or unknown here (expired, or the session was saved by another process)
+            del pending[kind]
+            result = job.result if job is not None else None
+            if not result or not result.get('success'):
+                continue
+
+            if kind == 'csv':
+                attachments['csv'] = {
+                    'filename': result['filename'],
+                    'path': result['file_path'],
+                    'size': result.get('file_stats', {}).get('size_human', 'Unknown'),
+                    'artifact_id': result.get('artifact_id')
+                }
+            elif kind == 'chart':
+                file_stats = result.get('file_stats', {})
+                attachments['chart'] = {
+                    'filename': file_stats.get('filename', os.path.basename(result['html_file'])),
+                    'path': result['html_file'],
+                    'size': file_stats.get('size_human', 'Unknown'),
+                    'artifact_id': result.get('artifact_id')
+                }
+
+        self._link_artifacts(attachments)
+        if not pending:
+            del attachments['pending_artifacts']
+        return bool(pending)
 
     def _save_session_to_history(self):
         """Save current session to chat history."""
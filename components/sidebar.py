@@ -47,6 +47,12 @@ class SidebarManager:
             # Section 2: System Status
             self._render_system_status_section()
 
+            # Section 2b: Slow queries recorded by the execution layer
+            self._render_slow_queries_section()
+
+            # Section 2c: Admission control queues
+            self._render_database_load_section()
+
             # Section 3: Avatar Button (replaces Account Settings dropdown)
             self._render_avatar_button()
 
@@ -521,6 +527,7 @@ class SidebarManager:
                     # Remove the conversation permanently
                     if conversation_id in all_sessions:
                         del all_sessions[conversation_id]
+                        self._unlink_artifacts(conversation_id)
 
                         # Write back to file immediately
                         with open(self.sessions_file, 'w') as f:
@@ -674,6 +681,50 @@ class SidebarManager:
                 except Exception as e:
                     st.error(f"❌ Status check failed: {e}")
 
+    def _render_slow_queries_section(self):
+        """Render the slow queries section, ranked by total time."""
+        with st.expander("🐢 Slow Queries", expanded=False):
+            try:
+                from src.database.slow_query_log import slow_query_log
+                offenders = slow_query_log.top_offenders(limit=10)
+            except Exception as e:
+                st.error(f"❌ Slow query log unavailable: {e}")
+                return
+
+            if not offenders:
+                st.caption(f"No query above {slow_query_log.threshold_ms:.0f} ms")
+                return
+
+            for offender in offenders:
+                st.markdown(
+                    f"**{offender['total_ms'] / 1000:.1f}s total** · {offender['occurrences']}× · "
+                    f"max {offender['max_ms']:.0f} ms"
+                )
+                st.caption(offender['normalized_sql'][:120])
+                if offender['plans']:
+                    record = slow_query_log.latest(offender['fingerprint'])
+                    if st.checkbox("Show plan", key=f"slow_plan_{offender['fingerprint']}"):
+                        st.code(record['plan'], language="text")
+
+    def _render_database_load_section(self):
+        """Render slot usage, queue depth and wait times per workload class."""
+        with st.expander("🚦 Database Load", expanded=False):
+            try:
+                from src.database.admission import workload_manager
+                metrics = workload_manager.metrics()
+            except Exception as e:
+                st.error(f"❌ Admission metrics unavailable: {e}")
+                return
+
+            for name, m in metrics.items():
+                st.markdown(
+                    f"**{name.title()}** · {m['running']}/{m['slots']} running · {m['queue_depth']} queued"
+                )
+                st.caption(
+                    f"wait avg {m['avg_wait_ms']:.0f} ms · p95 {m['p95_wait_ms']:.0f} ms · "
+                    f"max {m['max_wait_ms']:.0f} ms · {m['rejected']} rejected"
+                )
+
     def _render_sidebar_footer(self):
         """Render the sidebar footer with stats."""
         st.markdown("---")
@@ -730,6 +781,14 @@ class SidebarManager:
         except Exception as e:
             st.error(f"❌ Error deleting account: {e}")
 
+    def _unlink_artifacts(self, session_id: str):
+        """Drop a deleted conversation from the artifact index (files are left to the retention policy)."""
+        try:
+            from core.artifact_store import artifact_store
+            artifact_store.unlink_session(session_id)
+        except Exception:
+            pass
+
     def _delete_all_user_sessions(self, username: str):
         """Delete all chat sessions for a specific user."""
         try:
@@ -746,6 +805,8 @@ class SidebarManager:
                 for session_id, session_data in all_sessions.items()
                 if session_data.get('user') != username
             }
+            for session_id in all_sessions.keys() - remaining_sessions.keys():
+                self._unlink_artifacts(session_id)
 
             with open(self.sessions_file, 'w') as f:
                 json.dump(remaining_sessions, f, indent=2)
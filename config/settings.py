@@ -7,9 +7,11 @@ from typing import Optional
 
 class DatabaseConfig(BaseModel):
     """Generic database configuration."""
-    db_type: str = "sqlite"
+    db_type: str = "sqlite"  # "sqlite" (row store) or "duckdb" (columnar, files queried in place)
     db_path: str = "user_data/database.db"
     csv_directory: str = "database/csv_files"
+    data_directory: str = "data/csv"  # CSV/Parquet files read in place by the duckdb backend
+    duckdb_path: str = ":memory:"
     auto_import_csv: bool = True
     backup_enabled: bool = True
     backup_directory: str = "user_data/backups"
@@ -21,6 +23,7 @@ class DatabaseConfig(BaseModel):
             "db_type": self.db_type,
             "db_path": self.db_path,
             "csv_directory": self.csv_directory,
+            "data_directory": self.data_directory,
             "auto_import_csv": self.auto_import_csv
         }
 
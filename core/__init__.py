@@ -12,7 +12,7 @@ This module contains the main agent architecture:
 from .agent import ClickHouseAgent, ClickHouseGraphAgent
 from .state import ClickHouseAgentState
 from .router import smart_router_node, route_condition
-from .tool_nodes import execute_query_node, export_csv_node, format_response_node, smart_schema_node, create_visualization_node
+from .tool_nodes import execute_query_node, aexecute_query_node, export_csv_node, format_response_node, smart_schema_node, create_visualization_node
 from .graph_builder import create_clickhouse_graph
 
 __all__ = [
@@ -22,6 +22,7 @@ __all__ = [
     'smart_router_node',
     'route_condition',
     'execute_query_node',
+    'aexecute_query_node',
     'export_csv_node',
     'format_response_node',
     'smart_schema_node',
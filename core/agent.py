@@ -201,16 +201,38 @@ class GenericSQLGraphAgent:
         self.verbose = verbose
         self.graph = create_generic_sql_graph(verbose=verbose)
 
-    def process_question(self, user_question: str) -> str:
+    def process_question(self, user_question: str, approximate: bool = False,
+                         request_id: str = "", username: str = "") -> str:
         """
         Process a user question through the complete LangGraph workflow.
 
         Args:
             user_question: The user's natural language question
+            approximate: Answer large aggregate scans from a table sample
+            request_id: Identifier the UI uses to poll the query preview and cancel the query
+            username: Requesting user, for fair admission to the database
 
         Returns:
             Formatted response string
         """
+        return self.answer_question(user_question, approximate, request_id, username)["response"]
+
+    def answer_question(self, user_question: str, approximate: bool = False,
+                        request_id: str = "", username: str = "") -> Dict[str, Any]:
+        """
+        Process a user question and hand over everything the UI renders.
+
+        Args:
+            user_question: The user's natural language question
+            approximate: Answer large aggregate scans from a table sample
+            request_id: Identifier the UI uses to poll the query preview and cancel the query
+            username: Requesting user, for fair admission to the database
+
+        Returns:
+            Dict with the formatted response, the artifact references (CSV,
+            chart, pending jobs) and the in-memory query result (None when the
+            question ran no query)
+        """
         if self.verbose:
             print(f"\n{'='*80}")
             print(f"🚀 LANGGRAPH WORKFLOW: Starting execution")
@@ -219,7 +241,60 @@ class GenericSQLGraphAgent:
             print(f"{'='*80}")
 
         # Initialize state
-        initial_state = GenericSQLAgentState(
+        initial_state = self._build_initial_state(user_question, approximate, request_id, username)
+
+        try:
+            # Execute the LangGraph workflow
+            final_state = self.graph.invoke(initial_state)
+            return self._handoff(final_state)
+
+        except Exception as e:
+            logger.error(f"LangGraph execution failed: {e}")
+            return self._failed_handoff(e)
+
+    async def aprocess_question(self, user_question: str, approximate: bool = False,
+                                request_id: str = "", username: str = "") -> str:
+        """
+        Process a user question through the workflow without blocking the event loop.
+
+        Query execution awaits the async database engine while the other nodes
+        run in the graph's executor, so one process can serve many concurrent
+        sessions and overlap database work with LLM calls.
+
+        Args:
+            user_question: The user's natural language question
+            approximate: Answer large aggregate scans from a table sample
+            request_id: Identifier the UI uses to poll the query preview
+            username: Requesting user, for fair admission to the database
+
+        Returns:
+            Formatted response string
+        """
+        return (await self.aanswer_question(user_question, approximate, request_id, username))["response"]
+
+    async def aanswer_question(self, user_question: str, approximate: bool = False,
+                               request_id: str = "", username: str = "") -> Dict[str, Any]:
+        """Async counterpart of answer_question."""
+        if self.verbose:
+            print(f"\n{'='*80}")
+            print(f"🚀 LANGGRAPH WORKFLOW (async): Starting execution")
+            print(f"   📝 Question: '{user_question}'")
+            print(f"{'='*80}")
+
+        initial_state = self._build_initial_state(user_question, approximate, request_id, username)
+
+        try:
+            final_state = await self.graph.ainvoke(initial_state)
+            return self._handoff(final_state)
+
+        except Exception as e:
+            logger.error(f"LangGraph async execution failed: {e}")
+            return self._failed_handoff(e)
+
+    def _build_initial_state(self, user_question: str, approximate: bool = False,
+                             request_id: str = "", username: str = "") -> GenericSQLAgentState:
+        """Create the initial workflow state for a question."""
+        return GenericSQLAgentState(
             messages=[HumanMessage(content=user_question)],
             user_question=user_question,
             query_type="data_query",  # Will be overridden by smart router
@@ -229,35 +304,55 @@ class GenericSQLGraphAgent:
             csv_export={},
             visualization={},  # Added visualization field
             final_response="",
+            attachments={},
             next_action="",
             verbose=self.verbose,
+            approximate=approximate,
+            request_id=request_id,
+            username=username,
             error_occurred=False,
             error_message=""
         )
 
-        try:
-            # Execute the LangGraph workflow
-            final_state = self.graph.invoke(initial_state)
-            response = final_state.get("final_response", "No response generated")
+    def _finalize_response(self, final_state: GenericSQLAgentState) -> str:
+        """Extract the final response from the completed workflow state."""
+        response = final_state.get("final_response", "No response generated")
 
-            if self.verbose:
-                print(f"\n🎯 LANGGRAPH WORKFLOW: Execution complete")
-                if final_state.get("error_occurred"):
-                    print(f"   ⚠️  Completed with errors: {final_state.get('error_message', 'Unknown error')}")
-                else:
-                    print(f"   ✅ Completed successfully")
-                    # Show visualization info if available
-                    viz_result = final_state.get("visualization", {})
-                    if viz_result.get("success"):
-                        viz_file = viz_result.get("file_stats", {}).get("filename", "unknown")
-                        print(f"   📈 Visualization created: {viz_file}")
-                print(f"{'='*80}")
-
-            return response
+        if self.verbose:
+            print(f"\n🎯 LANGGRAPH WORKFLOW: Execution complete")
+            if final_state.get("error_occurred"):
+                print(f"   ⚠️  Completed with errors: {final_state.get('error_message', 'Unknown error')}")
+            else:
+                print(f"   ✅ Completed successfully")
+                # Show visualization info if available
+                viz_result = final_state.get("visualization", {})
+                if viz_result.get("success"):
+                    viz_file = viz_result.get("file_stats", {}).get("filename", "unknown")
+                    print(f"   📈 Visualization created: {viz_file}")
+                elif viz_result.get("job_id"):
+                    print(f"   📈 Visualization job {viz_result['job_id']}: {viz_result.get('status')}")
+            print(f"{'='*80}")
 
-        except Exception as e:
-            logger.error(f"LangGraph execution failed: {e}")
-            return f"❌ **Error:** An error occurred while processing your question: {str(e)}"
+        return response
+
+    def _handoff(self, final_state: GenericSQLAgentState) -> Dict[str, Any]:
+        """Response plus the artifact references and in-memory result, so the UI needs no file lookups."""
+        query_execution = final_state.get("query_execution") or {}
+        succeeded = query_execution.get("success", False)
+        return {
+            "response": self._finalize_response(final_state),
+            "attachments": final_state.get("attachments") or {},
+            "result": query_execution.get("result") if succeeded else None,
+            "result_handle": query_execution.get("result_handle") if succeeded else None,
+        }
+
+    def _failed_handoff(self, error: Exception) -> Dict[str, Any]:
+        return {
+            "response": f"❌ **Error:** An error occurred while processing your question: {str(error)}",
+            "attachments": {},
+            "result": None,
+            "result_handle": None,
+        }
 
 # Backward compatibility aliases
 ClickHouseAgent = GenericSQLAgent
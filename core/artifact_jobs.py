@@ -0,0 +1,149 @@
+"""
+Artifact Jobs - Background generation of CSV exports and charts
+
+Exports and charts are not needed to answer the question, so they are kept off
+the critical path: the tool nodes submit them to a small thread pool and
+store a job reference in the state, the response is formatted straight away,
+and the UI polls (or waits on) the jobs to show downloads and charts once they
+are ready. Each job records its status and its queue and run times.
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+ASYNC_ARTIFACTS = os.getenv("ASYNC_ARTIFACTS", "true").lower() == "true"
+ARTIFACT_WORKERS = int(os.getenv("ARTIFACT_WORKERS", "4"))
+ARTIFACT_JOB_TTL = float(os.getenv("ARTIFACT_JOB_TTL", "3600"))
+
+
+class ArtifactJob:
+    """One artifact being generated in the background."""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "pending"
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.future = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def run(self, func: Callable[..., Dict[str, Any]], *args, **kwargs) -> Dict[str, Any]:
+        self.started_at = time.time()
+        self.status = "running"
+        try:
+            self.result = func(*args, **kwargs)
+            self.status = "done"
+        except Exception as e:
+            logger.error(f"Artifact job {self.kind} {self.id} failed: {e}")
+            self.error = str(e)
+            self.result = {"success": False, "error": str(e)}
+            self.status = "failed"
+        finally:
+            self.finished_at = time.time()
+        return self.result
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Block until the job is finished (or the timeout expires) and return its result."""
+        try:
+            return self.future.result(timeout=timeout)
+        except FutureTimeout:
+            return None
+
+    def describe(self) -> Dict[str, Any]:
+        """Serializable reference and status, stored in the graph state."""
+        queued_until = self.started_at or time.time()
+        running_until = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "queue_ms": round((queued_until - self.submitted_at) * 1000, 1),
+            "run_ms": round((running_until - self.started_at) * 1000, 1) if self.started_at else None,
+            "error": self.error,
+        }
+
+
+class ArtifactJobManager:
+    """Thread pool running artifact jobs, plus a bounded registry to poll them by id."""
+
+    def __init__(self, max_workers: int = ARTIFACT_WORKERS, max_jobs: int = 1000,
+                 ttl: float = ARTIFACT_JOB_TTL):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: "OrderedDict[str, ArtifactJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, func: Callable[..., Dict[str, Any]], *args, **kwargs) -> ArtifactJob:
+        job = ArtifactJob(kind)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="artifact-job")
+            self._expire()
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            job.future = self._executor.submit(job.run, func, *args, **kwargs)
+        return job
+
+    def get(self, job_id: str) -> Optional[ArtifactJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_ids: Iterable[str], timeout: Optional[float] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Results of several jobs, waiting at most `timeout` seconds overall (None for unfinished jobs)."""
+        deadline = None if timeout is None else time.time() + timeout
+        results = {}
+        for job_id in job_ids:
+            job = self.get(job_id)
+            if job is None:
+                results[job_id] = None
+                continue
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            results[job_id] = job.wait(remaining)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Job counts by status and mean queue/run times by kind."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        by_status: Dict[str, int] = {}
+        timings: Dict[str, Dict[str, Any]] = {}
+        for job in jobs:
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+            if job.finished_at is None:
+                continue
+            entry = timings.setdefault(job.kind, {"jobs": 0, "queue_ms": 0.0, "run_ms": 0.0})
+            entry["jobs"] += 1
+            entry["queue_ms"] += (job.started_at - job.submitted_at) * 1000
+            entry["run_ms"] += (job.finished_at - job.started_at) * 1000
+        for entry in timings.values():
+            entry["queue_ms"] = round(entry["queue_ms"] / entry["jobs"], 1)
+            entry["run_ms"] = round(entry["run_ms"] / entry["jobs"], 1)
+        return {"jobs": len(jobs), "by_status": by_status, "timings": timings}
+
+    def _expire(self) -> None:
+        now = time.time()
+        for job_id in [j for j, job in self._jobs.items() if job.done and now - job.finished_at > self.ttl]:
+            del self._jobs[job_id]
+
+
+# Global instance
+artifact_jobs = ArtifactJobManager()
@@ -0,0 +1,294 @@
+"""
+Artifact Store - Content-addressed CSV exports and charts
+
+Every export or chart is stored under the hash of its content
+(`exports/<sha256>.csv`, `visualizations/<sha256>.html`), so an identical result
+reuses the file already on disk instead of adding a new timestamped copy. A
+SQLite index records each artifact (kind, path, download name, size, creation
+and last access) and which chat sessions use it, which replaces listing and
+sorting the directories.
+
+A background thread applies the retention policy every ARTIFACT_GC_INTERVAL
+seconds: artifacts not accessed for ARTIFACT_MAX_AGE_HOURS are removed, then the
+least recently used ones until the store fits in ARTIFACT_MAX_BYTES. Artifacts
+accessed within the last ARTIFACT_GC_GRACE seconds are never collected.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_INDEX_PATH = os.getenv("ARTIFACT_INDEX_PATH", "users_data/artifacts.db")
+ARTIFACT_MAX_AGE_HOURS = float(os.getenv("ARTIFACT_MAX_AGE_HOURS", "168"))
+ARTIFACT_MAX_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", str(1024 ** 3)))
+ARTIFACT_GC_INTERVAL = float(os.getenv("ARTIFACT_GC_INTERVAL", "600"))
+ARTIFACT_GC_GRACE = float(os.getenv("ARTIFACT_GC_GRACE", "300"))
+
+_HASH_CHUNK = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    artifact_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_kind_access ON artifacts (kind, last_access);
+CREATE INDEX IF NOT EXISTS artifacts_access ON artifacts (last_access);
+CREATE TABLE IF NOT EXISTS session_artifacts (
+    session_id TEXT NOT NULL,
+    artifact_id TEXT NOT NULL REFERENCES artifacts (artifact_id) ON DELETE CASCADE,
+    filename TEXT NOT NULL,
+    linked_at REAL NOT NULL,
+    PRIMARY KEY (session_id, artifact_id)
+);
+CREATE INDEX IF NOT EXISTS session_artifacts_artifact ON session_artifacts (artifact_id);
+"""
+
+
+class ArtifactStore:
+    """Content-addressed artifact files with a SQLite index and retention-based garbage collection."""
+
+    def __init__(self, index_path: str = ARTIFACT_INDEX_PATH, max_age_hours: float = ARTIFACT_MAX_AGE_HOURS,
+                 max_bytes: int = ARTIFACT_MAX_BYTES, gc_interval: float = ARTIFACT_GC_INTERVAL,
+                 gc_grace: float = ARTIFACT_GC_GRACE):
+        self.index_path = index_path
+        self.max_age_hours = max_age_hours
+        self.max_bytes = max_bytes
+        self.gc_interval = gc_interval
+        self.gc_grace = gc_grace
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._gc_thread: Optional[threading.Thread] = None
+        self._gc_stop = threading.Event()
+
+    # ----- storing -----
+
+    def put_file(self, kind: str, file_path: str, suffix: str) -> Dict[str, Any]:
+        """Store a freshly written file under its content hash, in the same directory.
+
+        The file's current name is kept as the name offered for download. If the
+        same content is already stored, the new file is dropped and the existing
+        one is reused.
+        """
+        name = os.path.basename(file_path)
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+                digest.update(chunk)
+        artifact_id = digest.hexdigest()
+        target = os.path.join(os.path.dirname(file_path), artifact_id + suffix)
+
+        with self._lock:
+            existing = self._existing(artifact_id, name)
+            if existing is not None:
+                os.remove(file_path)
+                return existing
+            os.replace(file_path, target)
+            return self._insert(artifact_id, kind, target, name)
+
+    def put_bytes(self, kind: str, content: bytes, directory: str, suffix: str, name: str) -> Dict[str, Any]:
+        """Store content under its hash in `directory`, writing it only if it is not stored yet."""
+        artifact_id = hashlib.sha256(content).hexdigest()
+        target = os.path.join(directory, artifact_id + suffix)
+
+        with self._lock:
+            existing = self._existing(artifact_id, name)
+            if existing is not None:
+                return existing
+            tmp_path = os.path.join(directory, f".{artifact_id}{suffix}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, target)
+            return self._insert(artifact_id, kind, target, name)
+
+    def _existing(self, artifact_id: str, name: str) -> Optional[Dict[str, Any]]:
+        """Indexed artifact whose file is still on disk, marked as accessed under its latest name."""
+        record = self.get(artifact_id)
+        if record is not None:
+            with self._connect() as connection:
+                connection.execute("UPDATE artifacts SET name = ? WHERE artifact_id = ?", (name, artifact_id))
+            record.update(name=name, reused=True)
+        return record
+
+    def _insert(self, artifact_id: str, kind: str, path: str, name: str) -> Dict[str, Any]:
+        now = time.time()
+        size = os.path.getsize(path)
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (artifact_id, kind, path, name, size, now, now),
+            )
+        self.start_gc()
+        return {"artifact_id": artifact_id, "kind": kind, "path": path, "name": name, "size_bytes": size,
+                "created_at": now, "last_access": now, "reused": False}
+
+    # ----- lookups -----
+
+    def get(self, artifact_id: str, touch: bool = True) -> Optional[Dict[str, Any]]:
+        """Artifact by id (None if unknown or its file is gone), marked as accessed unless touch=False."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT * FROM artifacts WHERE artifact_id = ?", (artifact_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if not os.path.exists(row["path"]):
+                self._forget([artifact_id])
+                return None
+            record = dict(row)
+            if touch:
+                record["last_access"] = time.time()
+                with self._connect() as connection:
+                    connection.execute("UPDATE artifacts SET last_access = ? WHERE artifact_id = ?",
+                                       (record["last_access"], artifact_id))
+            return record
+
+    def latest(self, kind: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Most recently stored or reused artifact of a kind, optionally no older than max_age seconds."""
+        since = time.time() - max_age if max_age is not None else 0
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT artifact_id FROM artifacts WHERE kind = ? AND last_access >= ? "
+                "ORDER BY last_access DESC LIMIT 1", (kind, since)
+            ).fetchone()
+        return self.get(row["artifact_id"], touch=False) if row else None
+
+    def list_artifacts(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Indexed artifacts, most recently accessed first."""
+        query = "SELECT * FROM artifacts"
+        params: tuple = ()
+        if kind is not None:
+            query += " WHERE kind = ?"
+            params = (kind,)
+        with self._lock:
+            rows = self._connect().execute(query + " ORDER BY last_access DESC", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def remove(self, artifact_id: str) -> bool:
+        """Delete an artifact's file and index entry."""
+        with self._lock:
+            record = self.get(artifact_id, touch=False)
+            if record is None:
+                return False
+            os.remove(record["path"])
+            self._forget([artifact_id])
+        return True
+
+    # ----- sessions -----
+
+    def link(self, session_id: str, artifact_id: str, filename: str) -> None:
+        """Record that a chat session shows an artifact, under the file name offered for download."""
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO session_artifacts VALUES (?, ?, ?, ?)",
+                (session_id, artifact_id, filename, time.time()),
+            )
+
+    def session_artifacts(self, session_id: str) -> List[Dict[str, Any]]:
+        """Artifacts of a chat session, in the order they were linked."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT a.*, s.filename FROM session_artifacts s JOIN artifacts a USING (artifact_id) "
+                "WHERE s.session_id = ? ORDER BY s.linked_at", (session_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def unlink_session(self, session_id: str) -> None:
+        """Forget a deleted chat session; its artifacts are left to the retention policy."""
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM session_artifacts WHERE session_id = ?", (session_id,))
+
+    # ----- retention -----
+
+    def gc(self) -> Dict[str, Any]:
+        """Apply the retention policy: expired artifacts first, then least recently used over the size budget."""
+        now = time.time()
+        protected_since = now - self.gc_grace
+        expired_before = now - self.max_age_hours * 3600
+
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT artifact_id, path, size_bytes, last_access FROM artifacts ORDER BY last_access"
+            ).fetchall()
+            total = sum(row["size_bytes"] for row in rows)
+            victims = []
+            for row in rows:
+                if row["last_access"] >= protected_since:
+                    break
+                if row["last_access"] < expired_before or total > self.max_bytes or not os.path.exists(row["path"]):
+                    victims.append(row)
+                    total -= row["size_bytes"]
+
+            freed = 0
+            for row in victims:
+                try:
+                    os.remove(row["path"])
+                    freed += row["size_bytes"]
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.error(f"Failed to delete artifact {row['path']}: {e}")
+            self._forget([row["artifact_id"] for row in victims])
+
+        if victims:
+            logger.info(f"Artifact GC removed {len(victims)} artifacts ({freed} bytes), {total} bytes kept")
+        return {"deleted": len(victims), "freed_bytes": freed, "remaining_bytes": total}
+
+    def start_gc(self) -> None:
+        """Start the background garbage collector (once)."""
+        if self._gc_thread is not None or self.gc_interval <= 0:
+            return
+        self._gc_thread = threading.Thread(target=self._gc_loop, name="artifact-gc", daemon=True)
+        self._gc_thread.start()
+
+    def stop_gc(self) -> None:
+        self._gc_stop.set()
+
+    def _gc_loop(self) -> None:
+        while not self._gc_stop.wait(self.gc_interval):
+            try:
+                self.gc()
+            except Exception as e:
+                logger.error(f"Artifact GC failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Artifact counts and bytes by kind."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT kind, COUNT(*) AS artifacts, SUM(size_bytes) AS size_bytes FROM artifacts GROUP BY kind"
+            ).fetchall()
+        return {row["kind"]: {"artifacts": row["artifacts"], "size_bytes": row["size_bytes"]} for row in rows}
+
+    # ----- index -----
+
+    def _forget(self, artifact_ids: List[str]) -> None:
+        with self._connect() as connection:
+            connection.executemany("DELETE FROM artifacts WHERE artifact_id = ?", [(a,) for a in artifact_ids])
+
+    def _connect(self) -> sqlite3.Connection:
+        """Shared index connection, opened on first use (callers hold the lock)."""
+        if self._connection is None:
+            directory = os.path.dirname(self.index_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.index_path, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+
+# Global instance
+artifact_store = ArtifactStore()
@@ -3,9 +3,10 @@ Graph Builder - Constructs the LangGraph workflow with Smart Schema Tool and Vis
 """
 
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
 from core.state import GenericSQLAgentState
 from core.router import smart_router_node, route_condition
-from core.tool_nodes import execute_query_node, export_csv_node, format_response_node, smart_schema_node, create_visualization_node
+from core.tool_nodes import execute_query_node, aexecute_query_node, export_csv_node, format_response_node, smart_schema_node, create_visualization_node
 
 def create_generic_sql_graph(verbose: bool = True) -> StateGraph:
     """
@@ -49,7 +50,8 @@ def create_generic_sql_graph(verbose: bool = True) -> StateGraph:
     workflow.add_node("agent_sql_generation", agent.generate_sql)
 
     # Tool nodes (execution and processing)
-    workflow.add_node("execute_query", execute_query_node)
+    # invoke() runs the sync executor, ainvoke() awaits the async engine
+    workflow.add_node("execute_query", RunnableLambda(execute_query_node, afunc=aexecute_query_node))
     workflow.add_node("export_csv", export_csv_node)
     workflow.add_node("create_visualization", create_visualization_node)
     workflow.add_node("format_response", format_response_node)
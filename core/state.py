@@ -32,10 +32,14 @@ class GenericSQLAgentState(TypedDict):
 
     # Final output
     final_response: str
+    attachments: Dict[str, Any]         # Artifact references for the UI (CSV, chart, pending jobs)
 
     # Workflow control
     next_action: str                    # What the agent should do next
     verbose: bool                       # Control detailed logging
+    approximate: bool                   # Opt-in: answer large aggregates from a table sample
+    request_id: str                     # Set by the UI: keys query previews and cancellation
+    username: str                       # Requesting user, for fair admission to the database
 
     # Error handling
     error_occurred: bool
@@ -5,6 +5,7 @@ Tool Nodes - Structured tool execution for the LangGraph workflow
 from typing import Dict, Any
 import logging
 from core.state import GenericSQLAgentState
+from core.artifact_jobs import artifact_jobs, ASYNC_ARTIFACTS
 
 logger = logging.getLogger(__name__)
 
@@ -15,66 +16,140 @@ def execute_query_node(state: GenericSQLAgentState) -> GenericSQLAgentState:
     This node takes the generated SQL and executes it safely,
     returning structured results for further processing.
     """
-    if state.get("verbose", False):
-        print(f"\n⚡ TOOL NODE: Query Executor")
-        print(f"   🎯 Task: Execute SQL against database")
-        print(f"   🔒 Safety: Validation and limits applied")
+    _log_execute_query_start(state)
+    request_id = state.get("request_id")
 
     try:
         from tools.query_execution_tool import QueryExecutionTool
+        from src.database.speculative import speculative_executor
         tool = QueryExecutionTool()
 
-        sql_query = state["sql_generation"].get("sql_query", "")
+        sql_query = _get_sql_to_execute(state)
 
-        if not sql_query:
-            raise ValueError("No SQL query to execute")
+        # Speculative preview on the preview pool while the full query runs
+        cancel_token = None
+        if request_id:
+            cancel_token = speculative_executor.start(request_id)
+            _launch_preview(state, speculative_executor, request_id, sql_query)
 
-        if state.get("verbose", False):
-            print(f"   ⚡ EXECUTING: Running query against database")
+        try:
+            result = tool._run(sql_query, approximate=state.get("approximate", False), cancel_token=cancel_token,
+                               username=state.get("username") or "unknown")
+        finally:
+            if request_id:
+                speculative_executor.complete(request_id)
+        _apply_query_execution_result(state, result)
 
-        result = tool._run(sql_query)
-        state["query_execution"] = result
+    except Exception as e:
+        _apply_query_execution_error(state, e)
 
-        # Determine next action based on results
-        if result.get("success") and result.get("result", {}).get("data"):
-            state["next_action"] = "export_csv"
-            if state.get("verbose", False):
-                row_count = result.get("result", {}).get("row_count", 0)
-                print(f"   ✅ SUCCESS: {row_count} rows returned")
-                print(f"   ➡️  NEXT: Export results to CSV")
-        else:
-            state["next_action"] = "format_response"
-            if state.get("verbose", False):
-                if result.get("success"):
-                    print(f"   ✅ SUCCESS: Query executed but no data returned")
-                else:
-                    print(f"   ❌ FAILED: {result.get('error', 'Unknown error')}")
-                print(f"   ➡️  NEXT: Format response (skip CSV export)")
+    return state
+
+async def aexecute_query_node(state: GenericSQLAgentState) -> GenericSQLAgentState:
+    """
+    Tool Node (async): Execute SQL query on the async database engine.
+
+    Used when the graph runs through ainvoke, so the query does not hold a
+    thread while PostgreSQL works and other sessions can make progress.
+    """
+    _log_execute_query_start(state)
+    request_id = state.get("request_id")
+
+    try:
+        from tools.query_execution_tool import QueryExecutionTool
+        from src.database.speculative import speculative_executor
+        tool = QueryExecutionTool()
+
+        sql_query = _get_sql_to_execute(state)
+
+        # Cancellation on this path is task cancellation; the preview still runs on its own pool
+        if request_id:
+            _launch_preview(state, speculative_executor, request_id, sql_query)
+
+        try:
+            result = await tool._arun(sql_query, approximate=state.get("approximate", False),
+                                      username=state.get("username") or "unknown")
+        finally:
+            if request_id:
+                speculative_executor.complete(request_id)
+        _apply_query_execution_result(state, result)
 
     except Exception as e:
-        logger.error(f"Query execution tool error: {e}")
-        state["query_execution"] = {
-            "success": False,
-            "error": str(e),
-            "message": "Query execution failed"
-        }
-        state["next_action"] = "format_response"
-        state["error_occurred"] = True
-        state["error_message"] = str(e)
+        _apply_query_execution_error(state, e)
 
     return state
 
+def _log_execute_query_start(state: GenericSQLAgentState) -> None:
+    """Verbose banner shared by the sync and async query executor nodes."""
+    if state.get("verbose", False):
+        print(f"\n⚡ TOOL NODE: Query Executor")
+        print(f"   🎯 Task: Execute SQL against database")
+        print(f"   🔒 Safety: Validation and limits applied")
+
+def _launch_preview(state: GenericSQLAgentState, executor, request_id: str, sql_query: str) -> None:
+    """Start the cheap preview variant of the query; never fails the node."""
+    try:
+        if executor.launch_preview(request_id, sql_query) and state.get("verbose", False):
+            print(f"   🔮 PREVIEW: Fast preview launched in parallel")
+    except Exception as e:
+        logger.warning(f"Preview launch failed: {e}")
+
+def _get_sql_to_execute(state: GenericSQLAgentState) -> str:
+    """Extract the generated SQL from the state."""
+    sql_query = state["sql_generation"].get("sql_query", "")
+
+    if not sql_query:
+        raise ValueError("No SQL query to execute")
+
+    if state.get("verbose", False):
+        print(f"   ⚡ EXECUTING: Running query against database")
+
+    return sql_query
+
+def _apply_query_execution_result(state: GenericSQLAgentState, result: Dict[str, Any]) -> None:
+    """Store the execution result and decide the next action."""
+    state["query_execution"] = result
+
+    # Determine next action based on results
+    if result.get("success") and result.get("result", {}).get("data"):
+        state["next_action"] = "export_csv"
+        if state.get("verbose", False):
+            row_count = result.get("result", {}).get("row_count", 0)
+            print(f"   ✅ SUCCESS: {row_count} rows returned")
+            print(f"   ➡️  NEXT: Export results to CSV")
+    else:
+        state["next_action"] = "format_response"
+        if state.get("verbose", False):
+            if result.get("success"):
+                print(f"   ✅ SUCCESS: Query executed but no data returned")
+            else:
+                print(f"   ❌ FAILED: {result.get('error', 'Unknown error')}")
+            print(f"   ➡️  NEXT: Format response (skip CSV export)")
+
+def _apply_query_execution_error(state: GenericSQLAgentState, error: Exception) -> None:
+    """Record an unexpected executor failure in the state."""
+    logger.error(f"Query execution tool error: {error}")
+    state["query_execution"] = {
+        "success": False,
+        "error": str(error),
+        "message": "Query execution failed"
+    }
+    state["next_action"] = "format_response"
+    state["error_occurred"] = True
+    state["error_message"] = str(error)
+
 def export_csv_node(state: GenericSQLAgentState) -> GenericSQLAgentState:
     """
     Tool Node: Export query results to CSV file.
 
     This node takes successful query results and creates a downloadable
-    CSV file for the user.
+    CSV file for the user. With ASYNC_ARTIFACTS the export runs as a
+    background job and the state only keeps its reference.
     """
     if state.get("verbose", False):
         print(f"\n📊 TOOL NODE: CSV Exporter")
         print(f"   🎯 Task: Export query results to CSV file")
-        print(f"   📁 Output: Timestamped file in exports/ directory")
+        print(f"   📁 Output: Content-addressed file in exports/ directory")
 
     try:
         from tools.csv_export_tool import CsvExportTool
@@ -87,19 +162,24 @@ def export_csv_node(state: GenericSQLAgentState) -> GenericSQLAgentState:
         if (query_result.get("success") and
                 query_result.get("result", {}).get("data")):
 
-            if state.get("verbose", False):
-                print(f"   📊 PROCESSING: Creating CSV from query results")
-
-            result = tool._run(query_result, user_question)
-
-            if result.get("success"):
+            if ASYNC_ARTIFACTS:
+                job = artifact_jobs.submit("csv", tool._run, query_result, user_question)
+                result = job.describe()
                 if state.get("verbose", False):
-                    filename = result.get("filename", "unknown")
-                    size = result.get("file_stats", {}).get("size_human", "unknown")
-                    print(f"   ✅ SUCCESS: Created '{filename}' ({size})")
+                    print(f"   🚀 SUBMITTED: CSV export running in background (job {job.id})")
             else:
                 if state.get("verbose", False):
-                    print(f"   ❌ FAILED: {result.get('error', 'CSV creation failed')}")
+                    print(f"   📊 PROCESSING: Creating CSV from query results")
+                result = tool._run(query_result, user_question)
+
+                if result.get("success"):
+                    if state.get("verbose", False):
+                        filename = result.get("filename", "unknown")
+                        size = result.get("file_stats", {}).get("size_human", "unknown")
+                        print(f"   ✅ SUCCESS: Created '{filename}' ({size})")
+                else:
+                    if state.get("verbose", False):
+                        print(f"   ❌ FAILED: {result.get('error', 'CSV creation failed')}")
         else:
             # No data to export
             result = {
@@ -130,6 +210,7 @@ def create_visualization_node(state: GenericSQLAgentState) -> GenericSQLAgentSta
     """
     Tool Node: Create modern interactive visualizations from query results.
     Now supports user chart type preferences from intent analysis.
+    With ASYNC_ARTIFACTS the chart is created by a background job.
     """
     if state.get("verbose", False):
         print(f"\n📈 TOOL NODE: Modern Visualization Creator")
@@ -159,18 +240,25 @@ def create_visualization_node(state: GenericSQLAgentState) -> GenericSQLAgentSta
                     print(f"   🎯 USER PREFERENCE: {user_requested} chart requested")
 
             # ✅ Pass intent_analysis to the tool
-            result = tool._run(query_result, user_question, csv_result, intent_analysis)
-
-            if result.get("success"):
+            if ASYNC_ARTIFACTS:
+                job = artifact_jobs.submit("chart", tool._run, query_result, user_question, csv_result,
+                                           intent_analysis)
+                result = job.describe()
                 if state.get("verbose", False):
-                    viz_type = result.get("visualization_type", "unknown")
-                    filename = result.get("file_stats", {}).get("filename", "unknown")
-                    file_size = result.get("file_stats", {}).get("size_human", "unknown")
-                    print(f"   ✅ SUCCESS: Created {viz_type} chart → '{filename}' ({file_size})")
+                    print(f"   🚀 SUBMITTED: Chart running in background (job {job.id})")
             else:
-                if state.get("verbose", False):
-                    reason = result.get("reason", result.get("error", "Unknown reason"))
-                    print(f"   ⏩ SKIPPED: {reason}")
+                result = tool._run(query_result, user_question, csv_result, intent_analysis)
+
+                if result.get("success"):
+                    if state.get("verbose", False):
+                        viz_type = result.get("visualization_type", "unknown")
+                        filename = result.get("file_stats", {}).get("filename", "unknown")
+                        file_size = result.get("file_stats", {}).get("size_human", "unknown")
+                        print(f"   ✅ SUCCESS: Created {viz_type} chart → '{filename}' ({file_size})")
+                else:
+                    if state.get("verbose", False):
+                        reason = result.get("reason", result.get("error", "Unknown reason"))
+                        print(f"   ⏩ SKIPPED: {reason}")
         else:
             # No data to visualize
             result = {
@@ -286,6 +374,7 @@ def format_response_node(state: GenericSQLAgentState) -> GenericSQLAgentState:
             # Enhanced formatting with visualization info
             format_result = tool._run(query_result, state["user_question"], "query", csv_result, visualization_result)
             state["final_response"] = format_result.get("formatted_response", "No response generated")
+            state["attachments"] = format_result.get("attachments", {})
 
         if state.get("verbose", False):
             response_length = len(state["final_response"])
@@ -0,0 +1,232 @@
+"""
+Columnar analytic backend: DuckDB querying CSV and Parquet files in place
+
+Every CSV or Parquet file of the data directory (and every sub-directory of
+Parquet files, read with hive partitioning) is exposed as a view, so nothing
+is copied into a row store: scans are vectorized, run on all cores and only
+read the columns a query touches. Parquet wins over a CSV of the same name.
+
+Same interface as GenericDatabaseConnection; select it with
+DatabaseConfig.db_type = "duckdb".
+"""
+
+import os
+import logging
+import threading
+from typing import Dict, Any, List
+from pathlib import Path
+
+# DuckDB is only needed when this backend is selected
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", str(os.cpu_count() or 1)))
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT")  # e.g. "4GB"; DuckDB default otherwise
+
+class ColumnarDatabaseConnection:
+    """Manages an embedded DuckDB database whose tables are views over CSV/Parquet files."""
+
+    def __init__(self, data_directory: str = "data/csv", db_path: str = ":memory:"):
+        self.data_directory = Path(data_directory)
+        self.db_path = db_path
+        self.connection = None
+        self._is_connected = False
+        # DuckDB connections are not thread-safe: each thread gets its own cursor
+        self._local = threading.local()
+        self._sources: Dict[str, str] = {}
+
+    def connect(self) -> None:
+        """Open the DuckDB database and register the data files as views."""
+        if self._is_connected and self.connection:
+            return
+
+        if not DUCKDB_AVAILABLE:
+            raise ImportError("The duckdb backend needs the duckdb package: pip install duckdb")
+
+        try:
+            config = {"threads": DUCKDB_THREADS}
+            if DUCKDB_MEMORY_LIMIT:
+                config["memory_limit"] = DUCKDB_MEMORY_LIMIT
+            self.connection = duckdb.connect(database=self.db_path, config=config)
+            self._is_connected = True
+            self.register_directory(self.data_directory)
+            logger.info(f"Successfully opened DuckDB over {self.data_directory} ({len(self._sources)} tables)")
+        except Exception as e:
+            logger.error(f"Failed to open DuckDB database: {e}")
+            self._is_connected = False
+            raise
+
+    def disconnect(self) -> None:
+        """Close the database connection."""
+        if self.connection:
+            try:
+                self.connection.close()
+                logger.info("DuckDB connection closed")
+            except Exception as e:
+                logger.error(f"Error closing connection: {e}")
+            finally:
+                self.connection = None
+                self._is_connected = False
+                self._local = threading.local()
+
+    def _cursor(self):
+        """Cursor of the calling thread (shares the catalog, so every view is visible)."""
+        if not self._is_connected:
+            self.connect()
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self.connection.cursor()
+            self._local.cursor = cursor
+        return cursor
+
+    # ----- data files -----
+
+    def register_directory(self, directory: Path) -> int:
+        """Expose every CSV/Parquet file (or Parquet sub-directory) of a directory as a view."""
+        directory = Path(directory)
+        if not directory.exists():
+            logger.warning(f"Data directory {directory} does not exist")
+            return 0
+
+        sources = {path.stem: path for path in sorted(directory.glob("*.csv"))}
+        # Parquet files replace CSVs of the same name
+        sources.update({path.stem: path for path in sorted(directory.glob("*.parquet"))})
+        sources.update({path.name: path for path in sorted(directory.iterdir())
+                        if path.is_dir() and any(path.rglob("*.parquet"))})
+
+        for table_name, path in sources.items():
+            self.register_file(str(path), table_name)
+        return len(sources)
+
+    def register_file(self, file_path: str, table_name: str) -> None:
+        """Create (or replace) the view of a table over its file, read in place."""
+        path = Path(file_path)
+        if path.is_dir():
+            source = f"read_parquet('{(path / '**' / '*.parquet').as_posix()}', hive_partitioning = true)"
+        elif path.suffix == ".parquet":
+            source = f"read_parquet('{path.as_posix()}')"
+        else:
+            source = f"read_csv_auto('{path.as_posix()}', header = true)"
+
+        self.connection.execute(f'CREATE OR REPLACE VIEW "{table_name}" AS SELECT * FROM {source}')
+        self._sources[table_name] = str(path)
+        logger.info(f"Registered {path} as table {table_name}")
+
+    # ----- GenericDatabaseConnection interface -----
+
+    def execute_query_with_names(self, query: str) -> Dict[str, Any]:
+        """Execute query and return results with column names."""
+        try:
+            logger.info(f"Executing query: {query}")
+
+            cursor = self._cursor()
+            cursor.execute(query)
+
+            description = cursor.description or []
+            columns = [d[0] for d in description]
+            rows = cursor.fetchall() if description else []
+            data = [list(row) for row in rows]
+            types = [str(d[1]) for d in description]
+
+            logger.info(f"Query executed successfully, returned {len(data)} rows")
+
+            return {
+                "columns": columns,
+                "data": data,
+                "types": types
+            }
+
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            raise
+
+    def import_csv_to_table(self, csv_file_path: str, table_name: str,
+                            if_exists: str = 'replace') -> bool:
+        """Expose a CSV (or Parquet) file as a table; the file is queried in place, not copied."""
+        try:
+            if not self._is_connected:
+                self.connect()
+            if if_exists == 'fail' and table_name in self._sources:
+                raise ValueError(f"Table {table_name} already exists")
+
+            self.register_file(csv_file_path, table_name)
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to register {csv_file_path}: {e}")
+            return False
+
+    def get_table_schema(self, table_name: str) -> Dict[str, Any]:
+        """Get schema information for a table."""
+        try:
+            cursor = self._cursor()
+            cursor.execute(f'DESCRIBE "{table_name}"')
+
+            columns = {}
+            for column_name, column_type, null, _key, default, *_extra in cursor.fetchall():
+                columns[column_name] = {
+                    'type': column_type,
+                    'nullable': null == 'YES',
+                    'default': default
+                }
+
+            return {
+                'table_name': table_name,
+                'columns': columns,
+                'source': self._sources.get(table_name)
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to get schema for table {table_name}: {e}")
+            return {}
+
+    def list_tables(self) -> List[str]:
+        """List all tables in the database."""
+        try:
+            cursor = self._cursor()
+            cursor.execute(
+                "SELECT table_name FROM information_schema.tables "
+                "WHERE table_schema = 'main' ORDER BY table_name"
+            )
+
+            tables = [row[0] for row in cursor.fetchall()]
+            logger.info(f"Found {len(tables)} tables: {tables}")
+
+            return tables
+
+        except Exception as e:
+            logger.error(f"Failed to list tables: {e}")
+            return []
+
+    def test_connection(self) -> bool:
+        """Test if connection is working."""
+        try:
+            self._cursor().execute("SELECT 1").fetchall()
+            return True
+        except Exception as e:
+            logger.error(f"Connection test failed: {e}")
+            self._is_connected = False
+        return False
+
+    def initialize_from_csv_directory(self, csv_directory: str) -> bool:
+        """Initialize database from a directory of CSV/Parquet files (registered in place)."""
+        try:
+            if not self._is_connected:
+                self.connect()
+
+            count = self.register_directory(Path(csv_directory))
+            if not count:
+                logger.warning(f"No CSV or Parquet files found in {csv_directory}")
+                return False
+
+            logger.info(f"Successfully initialized database with {count} tables")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to initialize from CSV directory: {e}")
+            return False
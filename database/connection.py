@@ -1,23 +1,46 @@
 """
 Generic SQL Database Connection using SQLite with CSV import capability
+
+In high-performance mode (SQLITE_HIGH_PERF, on by default) the database runs
+in WAL journaling so readers never block the writer, and every thread gets
+its own read-only query connection with mmap I/O, a large page cache and
+in-memory temp storage (closed once the thread has exited, when the next
+thread opens its own). The single shared connection is kept for imports
+and DDL. Locked databases are waited on (busy_timeout) and retried with
+backoff before failing.
 """
 
 import sqlite3
-import pandas as pd
 import os
+import time
 import logging
+import threading
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 
+from config.settings import DATABASE_CONFIG, DatabaseConfig
+from .csv_import import ChunkedCSVImporter
+
 logger = logging.getLogger(__name__)
 
+SQLITE_HIGH_PERF = os.getenv("SQLITE_HIGH_PERF", "true").lower() in ("1", "true", "yes")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_BUSY_RETRIES = int(os.getenv("SQLITE_BUSY_RETRIES", "3"))
+
 class GenericDatabaseConnection:
     """Manages generic SQL database connections using SQLite with CSV import."""
 
-    def __init__(self, db_path: str = "data/database.db"):
+    def __init__(self, db_path: str = "data/database.db", high_performance: bool = SQLITE_HIGH_PERF):
         self.db_path = db_path
+        self.high_performance = high_performance
         self.connection: Optional[sqlite3.Connection] = None
         self._is_connected = False
+        # Per-thread read-only connections (high-performance mode)
+        self._local = threading.local()
+        self._read_connections: Dict[int, sqlite3.Connection] = {}  # thread id -> connection
+        self._pool_lock = threading.Lock()
         self._ensure_data_directory()
 
     def _ensure_data_directory(self):
@@ -30,8 +53,15 @@ class GenericDatabaseConnection:
             return
 
         try:
-            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.connection = sqlite3.connect(
+                self.db_path, check_same_thread=False, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000
+            )
             self.connection.row_factory = sqlite3.Row  # Enable column access by name
+            if self.high_performance:
+                # WAL is persistent in the file: set once by the writer
+                self.connection.execute("PRAGMA journal_mode=WAL")
+                self.connection.execute("PRAGMA synchronous=NORMAL")
+                self._apply_performance_pragmas(self.connection)
             self._is_connected = True
             logger.info(f"Successfully connected to database: {self.db_path}")
         except Exception as e:
@@ -39,8 +69,61 @@ class GenericDatabaseConnection:
             self._is_connected = False
             raise
 
+    def _apply_performance_pragmas(self, connection: sqlite3.Connection) -> None:
+        """Per-connection settings: mmap I/O, page cache, temp storage and lock waits."""
+        connection.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        connection.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+        connection.execute("PRAGMA temp_store=MEMORY")
+        connection.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+
+    def get_read_connection(self) -> sqlite3.Connection:
+        """Read-only query connection of the calling thread (the shared one outside high-performance mode)."""
+        if not self._is_connected:
+            self.connect()
+        if not self.high_performance:
+            return self.connection
+
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+            # Only this thread runs queries on it; disconnect() may close it from another
+            connection = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                         timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+            self._apply_performance_pragmas(connection)
+            connection.execute("PRAGMA query_only=ON")
+            self._local.connection = connection
+            thread_id = threading.get_ident()
+            with self._pool_lock:
+                stale = self._prune_read_connections()
+                # A dead thread's id can be reused by a new thread
+                previous = self._read_connections.pop(thread_id, None)
+                if previous is not None:
+                    stale.append(previous)
+                self._read_connections[thread_id] = connection
+            self._close_read_connections(stale)
+        return connection
+
+    def _prune_read_connections(self) -> List[sqlite3.Connection]:
+        """Unregister the connections of threads that have exited (caller holds the pool lock)."""
+        live = {thread.ident for thread in threading.enumerate()}
+        return [self._read_connections.pop(thread_id)
+                for thread_id in list(self._read_connections) if thread_id not in live]
+
+    def _close_read_connections(self, connections: List[sqlite3.Connection]) -> None:
+        for connection in connections:
+            try:
+                connection.close()
+            except Exception as e:
+                logger.error(f"Error closing read connection: {e}")
+
     def disconnect(self) -> None:
         """Close the database connection."""
+        with self._pool_lock:
+            read_connections, self._read_connections = list(self._read_connections.values()), {}
+        self._close_read_connections(read_connections)
+        # Threads reopen their read connection on next use
+        self._local = threading.local()
+
         if self.connection:
             try:
                 self.connection.close()
@@ -62,14 +145,24 @@ class GenericDatabaseConnection:
         try:
             logger.info(f"Executing query: {query}")
 
-            cursor = self.connection.cursor()
-            cursor.execute(query)
+            connection = self.get_read_connection()
+            for attempt in range(SQLITE_BUSY_RETRIES + 1):
+                try:
+                    cursor = connection.cursor()
+                    cursor.execute(query)
 
-            # Get column names
-            columns = [description[0] for description in cursor.description] if cursor.description else []
+                    # Get column names
+                    columns = [description[0] for description in cursor.description] if cursor.description else []
+
+                    # Get data
+                    rows = cursor.fetchall()
+                    break
+                except sqlite3.OperationalError as e:
+                    # busy_timeout already waited; back off a little more before giving up
+                    if "locked" not in str(e).lower() or attempt == SQLITE_BUSY_RETRIES:
+                        raise
+                    time.sleep(0.05 * 2 ** attempt)
 
-            # Get data
-            rows = cursor.fetchall()
             data = [list(row) for row in rows] if rows else []
 
             # Get column types (simplified)
@@ -89,19 +182,12 @@ class GenericDatabaseConnection:
 
     def import_csv_to_table(self, csv_file_path: str, table_name: str,
                            if_exists: str = 'replace') -> bool:
-        """Import CSV file to database table."""
+        """Import CSV (or Parquet) file to database table (streamed in chunks, bounded memory)."""
         try:
-            if not self._is_connected:
-                self.connect()
-
-            # Read CSV file
-            df = pd.read_csv(csv_file_path)
-
-            # Import to SQLite
-            df.to_sql(table_name, self.connection, if_exists=if_exists, index=False)
+            stats = ChunkedCSVImporter(self).import_file(csv_file_path, table_name, if_exists=if_exists)
 
             logger.info(f"Successfully imported {csv_file_path} to table {table_name}")
-            logger.info(f"Table {table_name} now has {len(df)} rows and {len(df.columns)} columns")
+            logger.info(f"Table {table_name} now has {stats['rows']} rows and {stats['columns']} columns")
 
             return True
 
@@ -115,7 +201,7 @@ class GenericDatabaseConnection:
             if not self._is_connected:
                 self.connect()
 
-            cursor = self.connection.cursor()
+            cursor = self.get_read_connection().cursor()
             cursor.execute(f"PRAGMA table_info({table_name})")
 
             columns = {}
@@ -143,7 +229,7 @@ class GenericDatabaseConnection:
             if not self._is_connected:
                 self.connect()
 
-            cursor = self.connection.cursor()
+            cursor = self.get_read_connection().cursor()
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
 
             tables = [row[0] for row in cursor.fetchall()]
@@ -170,19 +256,22 @@ class GenericDatabaseConnection:
         return False
 
     def initialize_from_csv_directory(self, csv_directory: str) -> bool:
-        """Initialize database from a directory of CSV files."""
+        """Initialize database from a directory of CSV (or Parquet) files."""
         try:
             csv_dir = Path(csv_directory)
             if not csv_dir.exists():
                 logger.error(f"CSV directory {csv_directory} does not exist")
                 return False
 
-            csv_files = list(csv_dir.glob("*.csv"))
+            # A Parquet file replaces the CSV of the same name
+            sources = {path.stem: path for path in csv_dir.glob("*.csv")}
+            sources.update({path.stem: path for path in csv_dir.glob("*.parquet")})
+            csv_files = list(sources.values())
             if not csv_files:
                 logger.warning(f"No CSV files found in {csv_directory}")
                 return False
 
-            logger.info(f"Found {len(csv_files)} CSV files to import")
+            logger.info(f"Found {len(csv_files)} CSV/Parquet files to import")
 
             for csv_file in csv_files:
                 table_name = csv_file.stem  # Use filename without extension as table name
@@ -198,5 +287,15 @@ class GenericDatabaseConnection:
             logger.error(f"Failed to initialize from CSV directory: {e}")
             return False
 
-# Global connection instance
-generic_db_connection = GenericDatabaseConnection()
\ No newline at end of file
+def create_database_connection(config: DatabaseConfig = DATABASE_CONFIG):
+    """Connection for the backend selected by DatabaseConfig.db_type."""
+    if config.db_type == "duckdb":
+        from .columnar_connection import ColumnarDatabaseConnection
+        return ColumnarDatabaseConnection(config.data_directory, config.duckdb_path)
+    if config.db_type == "sqlite":
+        return GenericDatabaseConnection(config.db_path)
+    raise ValueError(f"Unknown db_type: {config.db_type}")
+
+# Global connection instance (the duckdb backend when selected in DATABASE_CONFIG)
+generic_db_connection = (create_database_connection() if DATABASE_CONFIG.db_type == "duckdb"
+                         else GenericDatabaseConnection())
\ No newline at end of file
@@ -0,0 +1,361 @@
+"""
+Chunked, bounded-memory CSV import into SQLite
+
+The file is streamed with the csv module in fixed-size chunks, so memory use
+stays flat whatever the file size:
+
+- column types (INTEGER / REAL / TEXT) are inferred once from a stratified
+  sample (rows read at evenly spaced offsets across the file, not just its
+  head) and then kept for the whole file; values that do not fit are stored
+  as text, which SQLite accepts;
+- each chunk is inserted with executemany inside an explicit transaction;
+- during the load the writer connection runs with synchronous=OFF and
+  journal_mode=OFF (WAL is kept if read connections are open), and both are
+  restored afterwards;
+- with if_exists='replace' the rows go into a new table that replaces the old
+  one at the end, so a failed import leaves the old data untouched;
+- indexes (the old table's, plus any requested) are built after the data is in.
+
+Parquet files go through the same path: their column types come from the file
+schema instead of a sample, and the rows are read memory-mapped, one record
+batch per chunk.
+"""
+
+import os
+import csv
+import time
+import logging
+import sqlite3
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# pyarrow is only needed for Parquet files
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_ROWS = 50000
+DEFAULT_SAMPLE_ROWS = 1000
+DEFAULT_SAMPLE_STRATA = 10
+
+_BOOLEANS = {"true": 1, "false": 0}
+
+
+def _is_int(value: str) -> bool:
+    try:
+        int(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _is_float(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _column_type(values: List[str]) -> str:
+    """SQLite type of a column from its sampled non-empty values."""
+    if not values:
+        return "TEXT"
+    if all(v.lower() in _BOOLEANS for v in values):
+        return "BOOLEAN"
+    if all(_is_int(v) for v in values):
+        return "INTEGER"
+    if all(_is_float(v) for v in values):
+        return "REAL"
+    return "TEXT"
+
+
+def is_parquet(file_path: str) -> bool:
+    return str(file_path).endswith(".parquet")
+
+
+def _require_pyarrow() -> None:
+    if not PYARROW_AVAILABLE:
+        raise ImportError("Reading Parquet files needs pyarrow: pip install pyarrow")
+
+
+def _arrow_column_type(arrow_type) -> str:
+    """SQLite type of an Arrow column type."""
+    if pa.types.is_boolean(arrow_type):
+        return "BOOLEAN"
+    if pa.types.is_integer(arrow_type):
+        return "INTEGER"
+    if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return "REAL"
+    return "TEXT"
+
+
+def parquet_schema(parquet_file_path: str) -> Dict[str, str]:
+    """Column name -> SQLite type, read from the Parquet footer (no row is read)."""
+    _require_pyarrow()
+    schema = pq.read_schema(parquet_file_path, memory_map=True)
+    return {field.name: _arrow_column_type(field.type) for field in schema}
+
+
+def stratified_sample(csv_file_path: str, sample_rows: int = DEFAULT_SAMPLE_ROWS,
+                      strata: int = DEFAULT_SAMPLE_STRATA) -> Tuple[List[str], List[List[str]]]:
+    """Header and up to sample_rows rows, taken in equal parts at evenly spaced offsets of the file.
+
+    Each stratum starts at the line following its byte offset. A stratum that
+    starts inside a quoted multi-line value yields rows of the wrong width,
+    which are dropped. Small files are simply read from the top.
+    """
+    size = os.path.getsize(csv_file_path)
+    per_stratum = max(sample_rows // strata, 1)
+
+    with open(csv_file_path, "rb") as f:
+        lines = (line.decode("utf-8", errors="replace") for line in iter(f.readline, b""))
+        reader = csv.reader(lines)
+        header = next(reader, [])
+        position = data_start = f.tell()
+
+        rows: List[List[str]] = []
+        for stratum in range(strata):
+            offset = data_start + (size - data_start) * stratum // strata
+            if offset > position:
+                f.seek(offset)
+                f.readline()
+            rows.extend(row for row in islice(reader, per_stratum) if len(row) == len(header))
+            position = f.tell()
+            if position >= size:
+                break
+    return header, rows
+
+
+def infer_schema(csv_file_path: str, sample_rows: int = DEFAULT_SAMPLE_ROWS) -> Dict[str, str]:
+    """Column name -> SQLite type, inferred from a stratified sample of rows (Parquet: from its schema)."""
+    if is_parquet(csv_file_path):
+        return parquet_schema(csv_file_path)
+    return sample_schema(*stratified_sample(csv_file_path, sample_rows))
+
+
+def sample_schema(header: List[str], rows: List[List[str]]) -> Dict[str, str]:
+    """Column name -> SQLite type, from sampled rows of a CSV."""
+    samples: List[List[str]] = [[] for _ in header]
+    for row in rows:
+        for i, value in enumerate(row):
+            if value != "":
+                samples[i].append(value)
+    return {name: _column_type(values) for name, values in zip(header, samples)}
+
+
+def count_rows(csv_file_path: str) -> int:
+    """Number of data rows, streamed (quoted newlines are handled by the csv module; Parquet: from its footer)."""
+    if is_parquet(csv_file_path):
+        _require_pyarrow()
+        return pq.read_metadata(csv_file_path).num_rows
+    with open(csv_file_path, newline="", encoding="utf-8") as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+
+def value_converter(column_type: str) -> Callable[[str], Any]:
+    """CSV text -> Python value for a column of the given SQLite type (empty -> None)."""
+    cast = {"INTEGER": int, "REAL": float}.get(column_type)
+
+    def convert(value: str):
+        if value == "":
+            return None
+        if column_type == "BOOLEAN":
+            return _BOOLEANS.get(value.lower(), value)
+        if cast is None:
+            return value
+        try:
+            return cast(value)
+        except ValueError:
+            return value
+
+    return convert
+
+
+class ChunkedCSVImporter:
+    """Streams CSV (or Parquet) files into SQLite tables through a GenericDatabaseConnection's writer connection."""
+
+    def __init__(self, db_connection, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                 sample_rows: int = DEFAULT_SAMPLE_ROWS):
+        self.db_connection = db_connection
+        self.chunk_rows = chunk_rows
+        self.sample_rows = sample_rows
+
+    def import_file(self, csv_file_path: str, table_name: str, if_exists: str = "replace",
+                    index_columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Import a CSV or Parquet file chunk by chunk; returns row count, duration and rows/s."""
+        if not self.db_connection._is_connected:
+            self.db_connection.connect()
+        connection = self.db_connection.connection
+
+        started = time.perf_counter()
+        schema = infer_schema(csv_file_path, self.sample_rows)
+        exists = self._table_exists(connection, table_name)
+        if exists and if_exists == "fail":
+            raise ValueError(f"Table {table_name} already exists")
+
+        replace = exists and if_exists == "replace"
+        target = f"{table_name}__import" if replace else table_name
+        previous_indexes = self._index_statements(connection, table_name) if replace else []
+        indexes = [
+            f'CREATE INDEX IF NOT EXISTS "idx_{table_name}_{column}" ON "{table_name}" ("{column}")'
+            for column in index_columns or []
+        ]
+
+        # The rollback journal is only turned off while filling a table created here;
+        # appending to an existing table keeps it
+        fresh = not exists or replace
+        previous = self._enter_load_mode(connection, journal_off=fresh)
+        try:
+            if fresh:
+                columns_sql = ", ".join(f'"{name}" {column_type}' for name, column_type in schema.items())
+                connection.execute(f'DROP TABLE IF EXISTS "{target}"')
+                connection.execute(f'CREATE TABLE "{target}" ({columns_sql})')
+
+            chunks = (self._parquet_chunks(csv_file_path, schema) if is_parquet(csv_file_path)
+                      else self._csv_chunks(csv_file_path, schema))
+            try:
+                rows = self._insert_chunks(connection, chunks, target, schema)
+            except Exception:
+                if fresh:
+                    connection.execute(f'DROP TABLE IF EXISTS "{target}"')
+                raise
+            finally:
+                # The swap below (and its rollback) needs the journal back
+                self._restore_journal(connection, previous)
+
+            connection.execute("BEGIN")
+            if replace:
+                connection.execute(f'DROP TABLE "{table_name}"')
+                connection.execute(f'ALTER TABLE "{target}" RENAME TO "{table_name}"')
+            for statement in previous_indexes:
+                try:
+                    connection.execute(statement)
+                except sqlite3.OperationalError as e:
+                    # The new file may no longer have the indexed columns
+                    logger.warning(f"Index not rebuilt on {table_name}: {e}")
+            for statement in indexes:
+                connection.execute(statement)
+            connection.execute("COMMIT")
+        except Exception:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            if replace:
+                connection.execute(f'DROP TABLE IF EXISTS "{target}"')
+            raise
+        finally:
+            self._exit_load_mode(connection, previous)
+
+        seconds = time.perf_counter() - started
+        stats = {
+            "table": table_name,
+            "rows": rows,
+            "columns": len(schema),
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(rows / seconds) if seconds > 0 else rows,
+        }
+        logger.info(f"Imported {rows} rows into {table_name} in {seconds:.2f}s "
+                    f"({stats['rows_per_second']} rows/s)")
+        return stats
+
+    def _insert_chunks(self, connection: sqlite3.Connection, chunks: Iterator[List[Any]],
+                       table_name: str, schema: Dict[str, str]) -> int:
+        columns = list(schema)
+        placeholders = ", ".join("?" for _ in columns)
+        column_list = ", ".join(f'"{name}"' for name in columns)
+        insert = f'INSERT INTO "{table_name}" ({column_list}) VALUES ({placeholders})'
+
+        rows = 0
+        for chunk in chunks:
+            connection.execute("BEGIN")
+            try:
+                connection.executemany(insert, chunk)
+            except Exception:
+                # ROLLBACK is undefined without a journal: keep the partial chunk, the caller drops the table
+                journal_mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+                connection.execute("COMMIT" if str(journal_mode).lower() == "off" else "ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+            rows += len(chunk)
+        return rows
+
+    def _csv_chunks(self, csv_file_path: str, schema: Dict[str, str]) -> Iterator[List[Any]]:
+        """Lists of at most chunk_rows converted rows."""
+        converters = [value_converter(schema[name]) for name in schema]
+        width = len(converters)
+
+        with open(csv_file_path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)
+            while True:
+                chunk = [
+                    [convert(value) for convert, value in zip(converters, row + [""] * (width - len(row)))]
+                    for row in islice(reader, self.chunk_rows)
+                ]
+                if not chunk:
+                    return
+                yield chunk
+
+    def _parquet_chunks(self, parquet_file_path: str, schema: Dict[str, str]) -> Iterator[List[Any]]:
+        """Rows of the memory-mapped file, one record batch of at most chunk_rows rows at a time."""
+        parquet_file = pq.ParquetFile(parquet_file_path, memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=self.chunk_rows, columns=list(schema)):
+            columns = []
+            for column in batch.columns:
+                # Dates and timestamps are stored as ISO text, like the CSV import leaves them
+                if pa.types.is_temporal(column.type):
+                    column = pc.cast(column, pa.string())
+                columns.append(column.to_pylist())
+            yield list(zip(*columns))
+
+    def _enter_load_mode(self, connection: sqlite3.Connection, journal_off: bool = True) -> Dict[str, Any]:
+        """Explicit transactions and no fsync for the duration of the load, and no rollback journal if journal_off."""
+        previous = {
+            "isolation_level": connection.isolation_level,
+            "synchronous": connection.execute("PRAGMA synchronous").fetchone()[0],
+            "journal_mode": connection.execute("PRAGMA journal_mode").fetchone()[0],
+        }
+        connection.isolation_level = None
+        connection.execute("PRAGMA synchronous=OFF")
+        if not journal_off:
+            return previous
+
+        # Leaving WAL needs exclusive access: with readers attached, stay in WAL rather than wait
+        busy_timeout = connection.execute("PRAGMA busy_timeout").fetchone()[0]
+        connection.execute("PRAGMA busy_timeout=0")
+        try:
+            mode = connection.execute("PRAGMA journal_mode=OFF").fetchone()[0]
+        except sqlite3.OperationalError:
+            mode = previous["journal_mode"]
+        finally:
+            connection.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        if str(mode).lower() != "off":
+            logger.info(f"journal_mode stays {mode} during the import")
+        return previous
+
+    def _restore_journal(self, connection: sqlite3.Connection, previous: Dict[str, Any]) -> None:
+        """Journal and fsync settings from before the load (run outside any transaction)."""
+        connection.execute(f"PRAGMA journal_mode={previous['journal_mode']}")
+        connection.execute(f"PRAGMA synchronous={previous['synchronous']}")
+
+    def _exit_load_mode(self, connection: sqlite3.Connection, previous: Dict[str, Any]) -> None:
+        self._restore_journal(connection, previous)
+        connection.isolation_level = previous["isolation_level"]
+
+    def _table_exists(self, connection: sqlite3.Connection, table_name: str) -> bool:
+        return connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+        ).fetchone() is not None
+
+    def _index_statements(self, connection: sqlite3.Connection, table_name: str) -> List[str]:
+        """CREATE INDEX statements of a table, to rebuild them on its replacement."""
+        return [row[0] for row in connection.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (table_name,)
+        ).fetchall()]
@@ -1,82 +1,224 @@
 """
 CSV Data Manager for handling CSV files and database initialization
+
+Parquet files are managed alongside the CSVs (and win over a CSV of the same
+name): their schema, row count and null counts come from the file footer, so
+discovering them reads no rows beyond a few sample values.
+
+Profiles are cached in a JSON schema manifest next to the files, keyed by
+path, size and modification time: at startup unchanged files are not opened
+at all, and only new or modified files are profiled (in a thread pool, from a
+stratified sample spread over the whole file).
 """
 
 import os
+import json
 import pandas as pd
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 
+from .csv_import import (
+    count_rows, parquet_schema, sample_schema, stratified_sample, value_converter,
+    DEFAULT_SAMPLE_ROWS, PYARROW_AVAILABLE
+)
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
 logger = logging.getLogger(__name__)
 
+SCHEMA_MANIFEST_NAME = ".schema_manifest.json"
+# Bumped whenever the profile format changes, so older manifests are ignored
+SCHEMA_MANIFEST_VERSION = 1
+PROFILE_WORKERS = int(os.getenv("CSV_PROFILE_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+
+def _parquet_head(parquet_file, limit: int) -> pd.DataFrame:
+    """First rows of a Parquet file (memory-mapped), dates as ISO text like a CSV read gives them."""
+    batch = next(pq.ParquetFile(parquet_file, memory_map=True).iter_batches(batch_size=limit), None)
+    if batch is None:
+        return pd.DataFrame()
+    columns = [column.cast(pa.string()) if pa.types.is_temporal(column.type) else column
+               for column in batch.columns]
+    return pa.Table.from_arrays(columns, names=batch.schema.names).to_pandas()
+
+
 class CSVDataManager:
     """Manages CSV data files and database initialization."""
 
-    def __init__(self, csv_directory: str = "database/csv_files"):
+    def __init__(self, csv_directory: str = "database/csv_files", workers: int = PROFILE_WORKERS):
         self.csv_directory = Path(csv_directory)
         self.csv_directory.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.csv_directory / SCHEMA_MANIFEST_NAME
+        self.workers = max(workers, 1)
         self.table_schemas = {}
+        self._manifest = {}
         self._discover_csv_files()
 
     def _discover_csv_files(self):
-        """Discover and analyze CSV files in the directory."""
+        """Discover CSV (and Parquet) files; profile only those the schema manifest does not cover."""
         try:
-            csv_files = list(self.csv_directory.glob("*.csv"))
-            logger.info(f"Discovered {len(csv_files)} CSV files")
+            files = {csv_file.stem: csv_file for csv_file in self.csv_directory.glob("*.csv")}
+            if PYARROW_AVAILABLE:
+                files.update({parquet_file.stem: parquet_file for parquet_file in self.csv_directory.glob("*.parquet")})
+
+            cached = self._load_manifest()
+            stale = []
+            for table_name, data_file in files.items():
+                stat = data_file.stat()
+                entry = cached.get(str(data_file))
+                if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                    self.table_schemas[table_name] = entry['schema']
+                    self._manifest[str(data_file)] = entry
+                else:
+                    stale.append((data_file, stat))
 
-            for csv_file in csv_files:
-                self._analyze_csv_file(csv_file)
+            if stale:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(stale))) as pool:
+                    profiles = pool.map(self._profile_file, [data_file for data_file, _ in stale])
+                    for (data_file, stat), schema in zip(stale, profiles):
+                        if schema is not None:
+                            self._store(data_file, schema, stat)
+
+            if stale or set(self._manifest) != set(cached):
+                self._save_manifest()
+            logger.info(f"Discovered {len(files)} data files: {len(files) - len(stale)} from the schema manifest, "
+                        f"{len(stale)} profiled")
 
         except Exception as e:
             logger.error(f"Error discovering CSV files: {e}")
 
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """Cached profiles by file path; empty if the manifest is missing, unreadable or outdated."""
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('version') != SCHEMA_MANIFEST_VERSION:
+            return {}
+        return manifest.get('files', {})
+
+    def _save_manifest(self):
+        """Write the manifest atomically (temporary file, then rename)."""
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({'version': SCHEMA_MANIFEST_VERSION, 'files': self._manifest}, f, default=str)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            logger.warning(f"Schema manifest not saved: {e}")
+
+    def _store(self, data_file: Path, schema: Dict[str, Any], stat: Optional[os.stat_result] = None):
+        """Register a profile, recording the size and mtime of the file it was taken from."""
+        stat = stat or data_file.stat()
+        self.table_schemas[data_file.stem] = schema
+        self._manifest[str(data_file)] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'schema': schema
+        }
+
+    def _profile_file(self, data_file: Path) -> Optional[Dict[str, Any]]:
+        if data_file.suffix == ".parquet":
+            return self._profile_parquet_file(data_file)
+        return self._profile_csv_file(data_file)
+
     def _analyze_csv_file(self, csv_file: Path):
         """Analyze a CSV file and extract schema information."""
+        schema = self._profile_csv_file(csv_file)
+        if schema is not None:
+            self._store(csv_file, schema)
+            self._save_manifest()
+
+    def _profile_csv_file(self, csv_file: Path) -> Optional[Dict[str, Any]]:
+        """Profile a CSV file from a stratified sample of its rows."""
         try:
-            # Read first few rows to analyze structure
-            df = pd.read_csv(csv_file, nrows=100)
+            # Same sample, hence same types, as the chunked importer gives the table
+            header, rows = stratified_sample(str(csv_file), DEFAULT_SAMPLE_ROWS)
+            inferred_types = sample_schema(header, rows)
+            converters = [value_converter(inferred_types.get(col_name, 'TEXT')) for col_name in header]
 
             table_name = csv_file.stem
             columns = {}
-
-            for col_name in df.columns:
-                col_data = df[col_name].dropna()
-
-                # Determine data type
-                if col_data.dtype == 'object':
-                    # Check if it's actually numeric
-                    try:
-                        pd.to_numeric(col_data.head(10))
-                        data_type = 'NUMERIC'
-                    except:
-                        data_type = 'TEXT'
-                elif col_data.dtype in ['int64', 'int32', 'int16', 'int8']:
-                    data_type = 'INTEGER'
-                elif col_data.dtype in ['float64', 'float32']:
-                    data_type = 'REAL'
-                else:
-                    data_type = 'TEXT'
+            for index, col_name in enumerate(header):
+                values = [converters[index](row[index]) for row in rows]
+                col_data = [value for value in values if value is not None]
 
                 columns[col_name] = {
-                    'type': data_type,
-                    'nullable': df[col_name].isnull().any(),
-                    'unique_values': len(col_data.unique()) if len(col_data) > 0 else 0,
-                    'sample_values': col_data.head(5).tolist() if len(col_data) > 0 else []
+                    'type': inferred_types.get(col_name, 'TEXT'),
+                    'nullable': len(col_data) < len(values),
+                    'unique_values': len(set(col_data)),
+                    'sample_values': col_data[:5]
                 }
 
-            self.table_schemas[table_name] = {
+            schema = {
                 'file_path': str(csv_file),
                 'table_name': table_name,
                 'columns': columns,
-                'row_count': len(df),
+                'row_count': count_rows(str(csv_file)),
                 'description': f"Data from {csv_file.name}"
             }
 
-            logger.info(f"Analyzed {csv_file.name}: {len(df)} rows, {len(columns)} columns")
+            logger.info(f"Analyzed {csv_file.name}: {schema['row_count']} rows, {len(columns)} columns")
+            return schema
 
         except Exception as e:
             logger.error(f"Error analyzing CSV file {csv_file}: {e}")
+            return None
+
+    def _analyze_parquet_file(self, parquet_file: Path):
+        """Extract schema information from a Parquet file's metadata."""
+        schema = self._profile_parquet_file(parquet_file)
+        if schema is not None:
+            self._store(parquet_file, schema)
+            self._save_manifest()
+
+    def _profile_parquet_file(self, parquet_file: Path) -> Optional[Dict[str, Any]]:
+        """Profile a Parquet file from its footer and first rows."""
+        try:
+            parquet = pq.ParquetFile(parquet_file, memory_map=True)
+            metadata = parquet.metadata
+            types = parquet_schema(str(parquet_file))
+
+            # A few sample values from the first rows; everything else is in the footer
+            samples = _parquet_head(parquet_file, 5)
+
+            table_name = parquet_file.stem
+            columns = {}
+            for index, col_name in enumerate(parquet.schema_arrow.names):
+                null_count, distinct_count = 0, 0
+                for row_group in range(metadata.num_row_groups):
+                    statistics = metadata.row_group(row_group).column(index).statistics
+                    if statistics is None or not statistics.has_null_count:
+                        null_count = None
+                        break
+                    null_count += statistics.null_count
+                    distinct_count = max(distinct_count, statistics.distinct_count or 0)
+
+                sample_values = samples[col_name].dropna().tolist() if col_name in samples else []
+                columns[col_name] = {
+                    'type': types.get(col_name, 'TEXT'),
+                    'nullable': bool(null_count) if null_count is not None else True,
+                    'unique_values': distinct_count or len(set(map(str, sample_values))),
+                    'sample_values': sample_values
+                }
+
+            logger.info(f"Analyzed {parquet_file.name} from metadata: {metadata.num_rows} rows, {len(columns)} columns")
+            return {
+                'file_path': str(parquet_file),
+                'table_name': table_name,
+                'columns': columns,
+                'row_count': metadata.num_rows,
+                'description': f"Data from {parquet_file.name}"
+            }
+
+        except Exception as e:
+            logger.error(f"Error analyzing Parquet file {parquet_file}: {e}")
+            return None
 
     def get_table_schema(self, table_name: str) -> Dict[str, Any]:
         """Get schema for a specific table."""
@@ -98,15 +240,19 @@ class CSVDataManager:
             if table_name is None:
                 table_name = source_path.stem
 
-            # Copy file to managed directory
-            dest_path = self.csv_directory / f"{table_name}.csv"
+            # Copy file to managed directory (Parquet files stay Parquet)
+            parquet = source_path.suffix == ".parquet"
+            dest_path = self.csv_directory / f"{table_name}{'.parquet' if parquet else '.csv'}"
 
             # Copy the file
             import shutil
             shutil.copy2(source_path, dest_path)
 
             # Analyze the new file
-            self._analyze_csv_file(dest_path)
+            if parquet:
+                self._analyze_parquet_file(dest_path)
+            else:
+                self._analyze_csv_file(dest_path)
 
             logger.info(f"Added CSV file {csv_file_path} as table {table_name}")
             return True
@@ -118,12 +264,15 @@ class CSVDataManager:
     def remove_csv_file(self, table_name: str) -> bool:
         """Remove a CSV file from the managed collection."""
         try:
-            csv_file = self.csv_directory / f"{table_name}.csv"
-            if csv_file.exists():
-                csv_file.unlink()
+            for suffix in (".csv", ".parquet"):
+                data_file = self.csv_directory / f"{table_name}{suffix}"
+                if data_file.exists():
+                    data_file.unlink()
+                self._manifest.pop(str(data_file), None)
 
             if table_name in self.table_schemas:
                 del self.table_schemas[table_name]
+            self._save_manifest()
 
             logger.info(f"Removed CSV file for table {table_name}")
             return True
@@ -144,7 +293,10 @@ class CSVDataManager:
                 return {}
 
             csv_file = self.table_schemas[table_name]['file_path']
-            df = pd.read_csv(csv_file, nrows=limit)
+            if csv_file.endswith(".parquet"):
+                df = _parquet_head(csv_file, limit)
+            else:
+                df = pd.read_csv(csv_file, nrows=limit)
 
             return {
                 'columns': df.columns.tolist(),
@@ -153,8 +153,13 @@ class TelmiAgentBridge:
                 'suggestion': 'Check PostgreSQL configuration and .env file'
             }
 
-    def process_question(self, user_question: str, username: str = "unknown") -> Dict[str, Any]:
-        """🔥 Process user question with SIMPLE global token tracking."""
+    def process_question(self, user_question: str, username: str = "unknown",
+                         approximate: bool = False, request_id: str = "") -> Dict[str, Any]:
+        """🔥 Process user question with SIMPLE global token tracking.
+
+        Besides the response, returns the artifact references ('attachments'), the
+        in-memory query result ('result') and its pagination handle ('result_handle').
+        """
         try:
             logger.info(f"🤔 Processing question: {user_question[:50]}...")
 
@@ -224,8 +229,16 @@ class TelmiAgentBridge:
             # Process question through LangGraph
             logger.info("🧠 Starting direct LangGraph processing...")
 
-            # Use the agent to process the question
-            response = self.agent.process_question(user_question)
+            # Use the agent to process the question; the UI renders the artifact
+            # references and in-memory result directly
+            answer = self.agent.answer_question(user_question, approximate=approximate,
+                                                request_id=request_id, username=username)
+            response = answer['response']
+            handoff = {
+                'attachments': answer['attachments'],
+                'result': answer['result'],
+                'result_handle': answer['result_handle']
+            }
 
             # 🔥 END TOKEN TRACKING AND GET SUMMARY
             if session_id:
@@ -238,6 +251,7 @@ class TelmiAgentBridge:
                     return {
                         'success': True,
                         'response': response,
+                        **handoff,
                         'token_usage': token_summary,
                         'token_report_file': csv_file
                     }
@@ -248,7 +262,8 @@ class TelmiAgentBridge:
             logger.info("✅ LangGraph processing completed")
             return {
                 'success': True,
-                'response': response
+                'response': response,
+                **handoff
             }
 
         except Exception as e:
@@ -285,6 +300,9 @@ class TelmiAgentBridge:
 
     def get_agent_status(self) -> Dict[str, Any]:
         """Get comprehensive status of the agent and database connection."""
+        from core.artifact_jobs import artifact_jobs
+        from core.artifact_store import artifact_store
+
         status = {
             'agent_initialized': self.agent is not None,
             'database_tested': self.connection_tested,
@@ -293,7 +311,9 @@ class TelmiAgentBridge:
             'project_structure_ok': self._check_project_structure(),
             'timestamp': datetime.now().isoformat(),
             'threading_disabled': True,
-            'mode': 'direct_execution'
+            'mode': 'direct_execution',
+            'artifact_jobs': artifact_jobs.stats(),
+            'artifact_store': artifact_store.stats()
         }
 
         # Test database connection if agent is initialized
@@ -0,0 +1,58 @@
+# scripts/advise_indexes.py
+import click
+from rich.console import Console
+from rich.table import Table
+from src.database.connection import database_connection
+from src.database.index_advisor import IndexAdvisor
+
+@click.command()
+@click.option('--top', default=50, help='Nombre de requêtes les plus coûteuses à analyser')
+@click.option('--min-calls', default=1, help='Nombre minimal d\'exécutions pour une requête')
+@click.option('--apply', 'apply_indexes', is_flag=True, help='Créer les index proposés')
+@click.option('--limit', default=10, help='Nombre maximal d\'index proposés')
+def main(top, min_calls, apply_indexes, limit):
+    """Proposer des index à partir de la charge de requêtes enregistrée"""
+    console = Console()
+    advisor = IndexAdvisor(database_connection)
+    candidates = advisor.propose(top=top, min_calls=min_calls)[:limit]
+
+    if not candidates:
+        console.print("Aucun index à proposer pour la charge enregistrée.")
+        return
+
+    table = Table(title="Index proposés")
+    table.add_column("Table")
+    table.add_column("Colonnes")
+    table.add_column("Usage")
+    table.add_column("Requêtes", justify="right")
+    table.add_column("Gain estimé (ms)", justify="right")
+    table.add_column("Réduction du coût", justify="right")
+    table.add_column("Méthode")
+
+    for candidate in candidates:
+        reduction = candidate['cost_reduction']
+        table.add_row(
+            candidate['table'],
+            ", ".join(candidate['columns']),
+            ", ".join(candidate['kinds']),
+            str(candidate['calls']),
+            f"{candidate['estimated_ms_saved']:.0f}",
+            f"{reduction:.0%}" if reduction is not None else "-",
+            candidate['method']
+        )
+
+    console.print(table)
+
+    if not apply_indexes:
+        for candidate in candidates:
+            console.print(f"{candidate['ddl']};")
+        return
+
+    for outcome in advisor.apply(candidates):
+        if outcome['success']:
+            console.print(f"✅ {outcome['index_name']} créé")
+        else:
+            console.print(f"❌ {outcome['index_name']}: {outcome['error']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# scripts/benchmark_sqlite.py
+import os
+import random
+import tempfile
+import threading
+import time
+import click
+from rich.console import Console
+from rich.table import Table
+from database.connection import GenericDatabaseConnection
+from database.csv_import import ChunkedCSVImporter
+from src.data_generator import FranceServicesDataGenerator
+
+CANAUX = ["physique", "telephone", "visio", "numerique"]
+N_MAISONS = 300
+
+QUERIES = [
+    "SELECT COUNT(*), AVG(duree_traitement) FROM demandes WHERE canal = '{canal}'",
+    "SELECT canal, COUNT(*) FROM demandes WHERE maison_fs_id = {maison} GROUP BY canal",
+    "SELECT * FROM demandes WHERE id = {id}",
+    "SELECT maison_fs_id, SUM(duree_traitement) FROM demandes GROUP BY maison_fs_id ORDER BY 2 DESC LIMIT 10",
+]
+
+# Mêmes index que ceux de la table demandes côté PostgreSQL (loader.create_indexes)
+INDEX_COLUMNS = ["date_demande", "maison_fs_id", "usager_id", "type_service"]
+
+def _build_database(db_path, csv_dir, rows):
+    """Générer la table demandes avec le générateur de l'application et l'importer comme l'application."""
+    generator = FranceServicesDataGenerator(seed=42, output_dir=csv_dir, n_demandes=rows, n_maisons=N_MAISONS)
+    generator.generate_demandes()
+
+    db = GenericDatabaseConnection(db_path)
+    db.connect()
+    try:
+        ChunkedCSVImporter(db).import_file(os.path.join(csv_dir, "demandes.csv"), "demandes",
+                                           index_columns=INDEX_COLUMNS)
+    finally:
+        db.disconnect()
+
+def _run(db, threads, queries, rows):
+    """Exécuter les requêtes en parallèle et retourner (requêtes/s, erreurs)."""
+    errors = []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(queries):
+            query = rng.choice(QUERIES).format(
+                canal=rng.choice(CANAUX),
+                maison=rng.randint(1, N_MAISONS),
+                id=rng.randint(1, rows)
+            )
+            try:
+                db.execute_query_with_names(query)
+            except Exception as e:
+                errors.append(e)
+
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return threads * queries / elapsed, len(errors)
+
+@click.command()
+@click.option('--threads', default=8, help='Nombre de threads lecteurs concurrents')
+@click.option('--queries', default=200, help='Requêtes par thread')
+@click.option('--rows', default=200000, help='Lignes de demandes générées')
+def main(threads, queries, rows):
+    """Mesurer le débit de lectures concurrentes SQLite (mode standard vs haute performance)"""
+    console = Console()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "benchmark.db")
+        console.print(f"🔧 Génération et import de la table demandes ({rows:,} lignes)...")
+        _build_database(db_path, os.path.join(tmp, "csv"), rows)
+
+        table = Table(title=f"Lectures concurrentes SQLite ({threads} threads × {queries} requêtes)")
+        table.add_column("Mode")
+        table.add_column("Requêtes/s", justify="right")
+        table.add_column("Erreurs", justify="right")
+
+        # Logging per query would dominate the measurement
+        import logging
+        logging.getLogger("database.connection").setLevel(logging.WARNING)
+
+        results = {}
+        for label, high_performance in [("Connexion partagée", False), ("WAL + connexions par thread", True)]:
+            db = GenericDatabaseConnection(db_path, high_performance=high_performance)
+            db.connect()
+            throughput, error_count = _run(db, threads, queries, rows)
+            db.disconnect()
+            results[label] = throughput
+            table.add_row(label, f"{throughput:,.0f}", str(error_count))
+
+        console.print(table)
+        baseline, optimized = results.values()
+        console.print(f"⚡ Gain: x{optimized / baseline:.2f}")
+
+if __name__ == "__main__":
+    main()
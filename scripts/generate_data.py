@@ -1,15 +1,37 @@
 # scripts/generate_data.py
 import click
-from src.data_generator import FranceServicesDataGenerator
+from src.data_generator import FranceServicesDataGenerator, GENERATION_WORKERS, SHARD_ROWS
+from src.generation_sinks import CsvSink, ParquetSink
 
 @click.command()
-@click.option('--maisons', default=300, help='Nombre de maisons France Services à générer')
-@click.option('--usagers', default=5000, help='Nombre d\'usagers à générer')
-@click.option('--demandes', default=15000, help='Nombre de demandes à générer')
-def main(maisons, usagers, demandes):
+@click.option('--scale-factor', '-s', default=1.0, type=float,
+              help='Facteur d\'échelle : 300 maisons, 5 000 usagers et 15 000 demandes par unité (1 à 1000)')
+@click.option('--maisons', default=None, type=int, help='Nombre de maisons France Services (remplace le facteur d\'échelle)')
+@click.option('--usagers', default=None, type=int, help='Nombre d\'usagers (remplace le facteur d\'échelle)')
+@click.option('--demandes', default=None, type=int, help='Nombre de demandes (remplace le facteur d\'échelle)')
+@click.option('--seed', default=None, type=int, help='Graine du générateur (données reproductibles)')
+@click.option('--workers', default=GENERATION_WORKERS, show_default=True, help='Processus de génération en parallèle')
+@click.option('--shard-rows', default=SHARD_ROWS, show_default=True, help='Lignes par shard')
+@click.option('--realistic', is_flag=True,
+              help='Distributions réalistes : popularité Zipf, saisonnalité, conseillers de la maison, attentes corrélées')
+@click.option('--format', 'output_format', type=click.Choice(['csv', 'parquet', 'postgres']), default='csv',
+              show_default=True, help='Destination : fichiers CSV, fichiers Parquet ou COPY direct dans PostgreSQL')
+@click.option('--partitioned/--no-partitioned', default=None,
+              help='Avec --format postgres : tables de faits partitionnées par mois')
+def main(scale_factor, maisons, usagers, demandes, seed, workers, shard_rows, realistic, output_format, partitioned):
     """Générer les données CSV pour la démonstration"""
-    generator = FranceServicesDataGenerator()
-    generator.generate_all_data()
+    generator = FranceServicesDataGenerator(
+        seed=seed, scale_factor=scale_factor, workers=workers, shard_rows=shard_rows,
+        n_maisons=maisons, n_usagers=usagers, n_demandes=demandes, realistic=realistic
+    )
+
+    if output_format == 'postgres':
+        from src.database.loader import DatabaseLoader
+        DatabaseLoader(partitioned=partitioned).initialize_from_generator(generator)
+    elif output_format == 'parquet':
+        generator.generate_all_data(sink=ParquetSink(generator.output_dir))
+    else:
+        generator.generate_all_data(sink=CsvSink(generator.output_dir))
 
 if __name__ == "__main__":
     main()
@@ -3,10 +3,19 @@ import click
 from src.database.loader import DatabaseLoader
 
 @click.command()
-def main():
+@click.option('--partitioned/--no-partitioned', default=None,
+              help='Partitionner demandes, plannings et incidents_techniques par mois (index BRIN)')
+@click.option('--workers', type=int, default=None,
+              help='Processus de chargement parallèles (1 = séquentiel, défaut : nombre de cœurs)')
+@click.option('--incremental', is_flag=True,
+              help='Ne charger que les fichiers CSV modifiés (ou leurs nouvelles lignes) depuis le dernier chargement')
+def main(partitioned, workers, incremental):
     """Initialiser la base de données PostgreSQL"""
-    loader = DatabaseLoader()
-    loader.initialize_database()
+    loader = DatabaseLoader(partitioned=partitioned, workers=workers)
+    if incremental:
+        loader.refresh_incremental()
+    else:
+        loader.initialize_database()
 
 if __name__ == "__main__":
     main()
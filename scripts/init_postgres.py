@@ -1,7 +1,10 @@
 import psycopg2
-import pandas as pd
 from sqlalchemy import create_engine
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.database.bulk_load import CopyLoader
 
 
 class PostgreSQLLoader:
@@ -111,28 +114,14 @@ class PostgreSQLLoader:
         print("✓ Tables créées")
 
     def load_csv_to_postgres(self, csv_file, table_name):
-        """Charger un CSV dans PostgreSQL"""
+        """Charger un CSV dans PostgreSQL (COPY en flux, types convertis côté serveur)"""
         if not os.path.exists(csv_file):
             print(f"❌ Fichier {csv_file} non trouvé")
             return
 
-        df = pd.read_csv(csv_file)
-
-        # Traitement spécifique pour certaines tables
-        if table_name == 'demandes':
-            df['date_demande'] = pd.to_datetime(df['date_demande'])
-        elif table_name == 'performances_mensuelles':
-            df['mois'] = pd.to_datetime(df['mois'])
-        elif table_name in ['maisons_france_services', 'usagers', 'conseillers']:
-            if 'date_ouverture' in df.columns:
-                df['date_ouverture'] = pd.to_datetime(df['date_ouverture'])
-            if 'date_inscription' in df.columns:
-                df['date_inscription'] = pd.to_datetime(df['date_inscription'])
-            if 'date_embauche' in df.columns:
-                df['date_embauche'] = pd.to_datetime(df['date_embauche'])
-
-        df.to_sql(table_name, self.engine, if_exists='append', index=False)
-        print(f"✓ {csv_file} chargé dans {table_name} ({len(df)} lignes)")
+        stats = CopyLoader(self.engine).load(csv_file, table_name)
+        print(f"✓ {csv_file} chargé dans {table_name} ({stats['rows']:,} lignes, "
+              f"{stats['rows_per_second']:,} lignes/s)")
 
     def load_all_data(self):
         """Charger tous les CSV dans PostgreSQL"""
@@ -0,0 +1,29 @@
+# scripts/refresh_rollups.py
+import click
+from rich.console import Console
+from rich.table import Table
+from src.database.rollups import rollup_manager
+
+@click.command()
+@click.option('--status', 'status_only', is_flag=True, help='Afficher la fraîcheur des agrégats sans les reconstruire')
+def main(status_only):
+    """Reconstruire les agrégats pré-calculés sur la table demandes"""
+    console = Console()
+
+    if not status_only:
+        for name, info in rollup_manager.refresh_all().items():
+            console.print(f"✅ {name}: {info['row_count']} lignes en {info['build_seconds']:.2f}s")
+
+    table = Table(title="Agrégats pré-calculés")
+    table.add_column("Agrégat")
+    table.add_column("À jour")
+    table.add_column("Lignes", justify="right")
+    table.add_column("Reconstruit le")
+
+    for name, info in rollup_manager.get_status().items():
+        table.add_row(name, "✅" if info['fresh'] else "❌ périmé", str(info['row_count']), str(info['refreshed_at']))
+
+    console.print(table)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# scripts/slow_queries.py
+from datetime import datetime
+import click
+from rich.console import Console
+from rich.table import Table
+from src.database.slow_query_log import slow_query_log
+
+@click.command()
+@click.option('--top', default=20, help='Nombre de requêtes à afficher')
+@click.option('--plan', 'fingerprint', default=None, help='Afficher le plan capturé pour une empreinte')
+@click.option('--clear', is_flag=True, help='Vider le journal des requêtes lentes')
+def main(top, fingerprint, clear):
+    """Afficher les requêtes lentes classées par temps total"""
+    console = Console()
+
+    if clear:
+        slow_query_log.clear()
+        console.print("✅ Journal des requêtes lentes vidé")
+        return
+
+    if fingerprint:
+        record = slow_query_log.latest(fingerprint)
+        if record is None:
+            console.print(f"❌ Aucune requête lente pour l'empreinte {fingerprint}")
+            return
+        console.print(f"[bold]SQL:[/bold] {record['sql']}")
+        if record['params']:
+            console.print(f"[bold]Paramètres:[/bold] {record['params']}")
+        console.print(f"[bold]Durée:[/bold] {record['duration_ms']:.0f} ms — {record['row_count']} lignes")
+        console.print(f"[bold]Plan ({record['plan_source'] or 'non capturé'}):[/bold]")
+        console.print(record['plan'] or "Aucun plan capturé (échantillonnage)")
+        return
+
+    table = Table(title=f"Requêtes lentes (seuil {slow_query_log.threshold_ms:.0f} ms)")
+    table.add_column("Empreinte")
+    table.add_column("Requête")
+    table.add_column("Occurrences", justify="right")
+    table.add_column("Total (ms)", justify="right")
+    table.add_column("Moyenne (ms)", justify="right")
+    table.add_column("Max (ms)", justify="right")
+    table.add_column("Plans", justify="right")
+    table.add_column("Dernière")
+
+    for offender in slow_query_log.top_offenders(limit=top):
+        table.add_row(
+            offender['fingerprint'],
+            offender['normalized_sql'][:80],
+            str(offender['occurrences']),
+            f"{offender['total_ms']:.0f}",
+            f"{offender['mean_ms']:.0f}",
+            f"{offender['max_ms']:.0f}",
+            str(offender['plans']),
+            datetime.fromtimestamp(offender['last_seen']).strftime('%Y-%m-%d %H:%M')
+        )
+
+    console.print(table)
+
+if __name__ == "__main__":
+    main()
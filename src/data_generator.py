@@ -1,17 +1,159 @@
-# src/data_generator.py
+import os
+import time
+import zlib
+from collections import deque
 import pandas as pd
 import numpy as np
 from faker import Faker
-import random
 from datetime import datetime, timedelta
-import os
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from .generation_sinks import CsvSink
+
+# Nombre de valeurs Faker tirées une fois par fournisseur (villes, codes postaux, noms...)
+FAKER_POOL_SIZE = 2000
+
+# Taille fixe des shards : le découpage, donc les graines, ne dépend pas du nombre de processus
+SHARD_ROWS = int(os.getenv("GENERATION_SHARD_ROWS", "250000"))
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", str(os.cpu_count() or 1)))
+
+# Volumes au facteur d'échelle 1 ; toutes les tables en dérivent
+BASE_SIZES = {'maisons': 300, 'usagers': 5000, 'demandes': 15000}
+CONSEILLERS_PER_MAISON = 5
+
+# Ordre des tables : la position d'une table entre dans la graine de ses shards
+TABLES = [
+    'maisons_france_services', 'usagers', 'demandes', 'conseillers', 'plannings',
+    'statistiques_mensuelles', 'temps_attente', 'services_details', 'incidents_techniques'
+]
+
+# Colonnes de type DATE (sans heure) : stockées en date32 dans les fichiers Parquet
+DATE_COLUMNS = {
+    'maisons_france_services': ['date_ouverture'],
+    'usagers': ['date_inscription'],
+    'conseillers': ['date_embauche'],
+    'plannings': ['date']
+}
+
+TABLE_LABELS = {
+    'maisons_france_services': "📍 Maisons France Services",
+    'usagers': "👥 Usagers",
+    'demandes': "📄 Demandes",
+    'conseillers': "👨‍💼 Conseillers",
+    'plannings': "📅 Plannings",
+    'statistiques_mensuelles': "📊 Statistiques mensuelles",
+    'temps_attente': "⏱️ Temps d'attente",
+    'services_details': "🔧 Services détaillés",
+    'incidents_techniques': "⚠️ Incidents techniques"
+}
+
+# Mode réaliste : popularité Zipf des maisons et des usagers (exposant > 1 : forte asymétrie)
+ZIPF_EXPONENT = float(os.getenv("GENERATION_ZIPF_EXPONENT", "1.1"))
+# Part des demandes d'un usager faites dans sa maison habituelle
+HOME_MAISON_SHARE = 0.85
+# Saisonnalité (la même que dans les statistiques mensuelles), semaine du lundi au dimanche, heures d'ouverture
+SEASONAL_FACTORS = {1: 1.3, 2: 1.3, 3: 1.3, 7: 0.7, 8: 0.7}
+WEEKDAY_WEIGHTS = [1.25, 1.1, 1.0, 1.05, 0.9, 0.3, 0.0]
+HOURLY_WEIGHTS = {8: 0.4, 9: 1.1, 10: 1.5, 11: 1.3, 12: 0.6, 13: 0.7, 14: 1.2, 15: 1.3, 16: 1.0, 17: 0.6}
+# Temps d'attente : facteur du canal (le numérique n'attend presque pas)
+CANAL_WAIT_FACTORS = {'physique': 1.0, 'telephone': 0.8, 'visio': 0.6, 'numerique': 0.3}
+JOURS_SEMAINE = np.array(['lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche'], dtype=object)
+
+# Historique des plannings (semaines) et des statistiques (mois)
+PLANNING_WEEKS = 12
+STATISTICS_MONTHS = 12
+
+SERVICES_DETAILS = [
+    {'service': 'emploi', 'sous_service': 'inscription_pole_emploi', 'complexite': 'simple'},
+    {'service': 'emploi', 'sous_service': 'actualisation_situation', 'complexite': 'simple'},
+    {'service': 'emploi', 'sous_service': 'recherche_formation', 'complexite': 'moyen'},
+    {'service': 'retraite', 'sous_service': 'simulation_retraite', 'complexite': 'moyen'},
+    {'service': 'retraite', 'sous_service': 'dossier_retraite', 'complexite': 'complexe'},
+    {'service': 'famille', 'sous_service': 'caf_allocations', 'complexite': 'moyen'},
+    {'service': 'famille', 'sous_service': 'prime_naissance', 'complexite': 'simple'},
+    {'service': 'social', 'sous_service': 'rsa', 'complexite': 'complexe'},
+    {'service': 'social', 'sous_service': 'aide_logement', 'complexite': 'moyen'},
+    {'service': 'sante', 'sous_service': 'carte_vitale', 'complexite': 'simple'},
+    {'service': 'sante', 'sous_service': 'remboursement_soins', 'complexite': 'moyen'},
+    {'service': 'logement', 'sous_service': 'demande_HLM', 'complexite': 'complexe'},
+    {'service': 'energie', 'sous_service': 'cheque_energie', 'complexite': 'simple'},
+    {'service': 'services_postaux', 'sous_service': 'colis_recommande', 'complexite': 'simple'},
+    {'service': 'acces_droit', 'sous_service': 'aide_juridictionnelle', 'complexite': 'complexe'}
+]
+
+# Générateur conservé par chaque processus de travail d'un shard à l'autre
+_worker_generator = None
+
+
+def _encode_shard_worker(settings, *task):
+    """Générer et sérialiser un shard dans un processus de travail"""
+    global _worker_generator
+    if _worker_generator is None or _worker_generator.settings != settings:
+        _worker_generator = FranceServicesDataGenerator(**settings)
+    return _worker_generator.encode_shard(*task)
 
 
 class FranceServicesDataGenerator:
-    def __init__(self, locale='fr_FR'):
+    """Génère les tables France Services colonne par colonne avec NumPy.
+
+    Les colonnes catégorielles, entières et temporelles sont tirées en un seul
+    appel vectorisé d'un Generator NumPy ; les valeurs Faker (villes, codes
+    postaux, adresses, noms) sont tirées une fois dans des réservoirs puis
+    indexées par des tableaux d'entiers. Les schémas et les distributions sont
+    ceux de la génération ligne par ligne d'origine.
+
+    Le facteur d'échelle multiplie maisons, usagers et demandes (300, 5 000 et
+    15 000 à l'échelle 1), et toutes les autres tables suivent. Chaque table
+    est découpée en shards de `shard_rows` lignes, générés et sérialisés en
+    parallèle par `workers` processus, puis écrits dans l'ordre dans un sink
+    (CSV, Parquet ou COPY PostgreSQL, voir generation_sinks.py) : la mémoire
+    reste bornée quel que soit le facteur d'échelle. Chaque shard tire ses
+    valeurs d'une graine dérivée de la graine racine, de la table et de son
+    numéro : à graine égale, les fichiers sont identiques quel que soit le
+    nombre de processus.
+
+    Avec `realistic=True`, les demandes suivent des distributions réalistes
+    plutôt qu'uniformes : popularité Zipf des maisons et des usagers (chaque
+    usager a une maison habituelle), conseiller tiré parmi ceux de la maison,
+    horodatages saisonniers concentrés sur les jours et heures d'ouverture, et
+    temps d'attente corrélés à l'heure, à la fréquentation de la maison et au
+    canal de la demande correspondante.
+    """
+
+    def __init__(self, locale='fr_FR', seed=None, scale_factor=1, workers=1,
+                 shard_rows=SHARD_ROWS, output_dir="data/csv", now=None,
+                 n_maisons=None, n_usagers=None, n_demandes=None, pool_size=FAKER_POOL_SIZE,
+                 realistic=False):
+        # Graine racine tirée une fois si absente, puis transmise telle quelle aux processus
+        self.seed = seed if seed is not None else int(np.random.SeedSequence().entropy)
+        self.scale_factor = scale_factor
+        self.workers = workers
+        self.shard_rows = shard_rows
+        self.now = now or datetime.now()
+        self.n_maisons = n_maisons or max(1, round(BASE_SIZES['maisons'] * scale_factor))
+        self.n_usagers = n_usagers or max(1, round(BASE_SIZES['usagers'] * scale_factor))
+        self.n_demandes = n_demandes or max(1, round(BASE_SIZES['demandes'] * scale_factor))
+        self.n_conseillers_ref = CONSEILLERS_PER_MAISON * self.n_maisons
+        self.realistic = realistic
+
+        # Ce qu'il faut à un processus de travail pour reconstruire le même générateur
+        self.settings = {
+            'locale': locale, 'seed': self.seed, 'scale_factor': scale_factor,
+            'shard_rows': shard_rows, 'output_dir': str(output_dir), 'now': self.now,
+            'n_maisons': self.n_maisons, 'n_usagers': self.n_usagers,
+            'n_demandes': self.n_demandes, 'pool_size': pool_size, 'realistic': realistic
+        }
+
         self.fake = Faker(locale)
-        self.output_dir = Path("data/csv")
+        self.rng = np.random.default_rng(self.seed)
+        self.pool_size = pool_size
+        self._pools = {}
+        self._counts = {}
+        self._cache = {}
+        self.stats = []
+
+        self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
         # Données de référence
@@ -28,350 +170,594 @@ class FranceServicesDataGenerator:
 
         self.types_structure = ['collectivite', 'association', 'entreprise', 'gip']
 
-    def generate_maisons_france_services(self, n_maisons=300):
-        """Générer les données des maisons France Services"""
-        data = []
-
-        for i in range(n_maisons):
-            services_disponibles = '|'.join(
-                random.sample(self.services_base, random.randint(5, 9))
-            )
-
-            data.append({
-                'id': i + 1,
-                'nom': f"France Services {self.fake.city()}",
-                'adresse': self.fake.address().replace('\n', ' '),
-                'code_postal': self.fake.postcode(),
-                'ville': self.fake.city(),
-                'departement': self.fake.department_name(),
-                'region': random.choice(self.regions),
-                'latitude': float(self.fake.latitude()),
-                'longitude': float(self.fake.longitude()),
-                'type_structure': random.choice(self.types_structure),
-                'date_ouverture': self.fake.date_between(start_date='-5y', end_date='today'),
-                'nb_conseillers': random.randint(1, 8),
-                'services_disponibles': services_disponibles,
-                'population_desservie': random.randint(5000, 50000),
-                'statut': 'active'
-            })
-
-        df = pd.DataFrame(data)
-        df.to_csv(self.output_dir / 'maisons_france_services.csv', index=False)
-        return df
-
-    def generate_usagers(self, n_usagers=5000):
-        """Générer les données des usagers"""
-        data = []
+    # ----- graines dérivées -----
+
+    def _derived_rng(self, *key):
+        """Generator dont la graine dérive de la graine racine et d'une clé (table, shard...)"""
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=key))
+
+    def _shard_rng(self, table, shard):
+        return self._derived_rng(TABLES.index(table), shard + 1)
+
+    def _per_maison_counts(self, table, low, high):
+        """Nombre de lignes par maison (conseillers, incidents), identique dans tous les processus"""
+        if table not in self._counts:
+            rng = self._derived_rng(TABLES.index(table), 0)
+            self._counts[table] = rng.integers(low, high + 1, self.n_maisons)
+        return self._counts[table]
+
+    def _popularity(self, name, n_ids):
+        """Probabilités Zipf (1/rang^s) des ids 1..n_ids, rangs attribués dans un ordre aléatoire fixe"""
+        key = ('popularity', name)
+        if key not in self._cache:
+            rng = self._derived_rng(len(TABLES) + 1, zlib.crc32(name.encode()))
+            weights = 1.0 / np.arange(1, n_ids + 1) ** ZIPF_EXPONENT
+            weights = weights[rng.permutation(n_ids)]
+            self._cache[key] = weights / weights.sum()
+        return self._cache[key]
+
+    def _zipf_ids(self, name, n_ids, n):
+        """n ids tirés selon la popularité Zipf (échantillonnage par CDF inverse)"""
+        key = ('cdf', name)
+        if key not in self._cache:
+            self._cache[key] = np.cumsum(self._popularity(name, n_ids))
+        ids = np.searchsorted(self._cache[key], self.rng.random(n), side='right') + 1
+        return np.minimum(ids, n_ids)
+
+    def _home_maisons(self):
+        """Maison habituelle de chaque usager, tirée selon la popularité des maisons"""
+        key = ('home_maisons',)
+        if key not in self._cache:
+            rng, self.rng = self.rng, self._derived_rng(len(TABLES) + 2, 0)
+            try:
+                self._cache[key] = self._zipf_ids('maisons', self.n_maisons, self.n_usagers)
+            finally:
+                self.rng = rng
+        return self._cache[key]
+
+    def _seasonal_datetimes(self, n):
+        """Horodatages de l'année écoulée : saison, jour de semaine et heure d'ouverture pondérés"""
+        key = ('days',)
+        if key not in self._cache:
+            first_day = np.datetime64((self.now - timedelta(days=365)).date(), 'D')
+            days = first_day + np.arange(365).astype('timedelta64[D]')
+            months = days.astype('datetime64[M]').astype(int) % 12 + 1
+            weekdays = (days.astype(np.int64) + 3) % 7
+            weights = (np.array([SEASONAL_FACTORS.get(m, 1.0) for m in months])
+                       * np.array(WEEKDAY_WEIGHTS)[weekdays])
+            self._cache[key] = (days, np.cumsum(weights / weights.sum()))
+        days, day_cdf = self._cache[key]
+
+        day_index = np.minimum(np.searchsorted(day_cdf, self.rng.random(n), side='right'), len(days) - 1)
+        hours = np.array(list(HOURLY_WEIGHTS))
+        hour_weights = np.array(list(HOURLY_WEIGHTS.values()))
+        hour = self.rng.choice(hours, n, p=hour_weights / hour_weights.sum())
+        offset_us = hour * 3_600_000_000 + self.rng.integers(0, 3_600_000_000, n)
+        return days[day_index].astype('datetime64[us]') + offset_us.astype('timedelta64[us]')
+
+    def _matching_demandes(self, start, stop):
+        """Demandes [start, stop) régénérées à l'identique : leurs shards coïncident avec ceux des temps d'attente"""
+        rng = self.rng
+        try:
+            return self.build_shard('demandes', start // self.shard_rows, start, stop)
+        finally:
+            self.rng = rng
+
+    # ----- tirages vectorisés -----
+
+    def _pool(self, provider):
+        """Réservoir de valeurs d'un fournisseur Faker, tiré une seule fois"""
+        if provider not in self._pools:
+            # Graine propre au fournisseur : le réservoir ne dépend pas de l'ordre des tirages
+            pool_key = zlib.crc32(provider.encode())
+            self.fake.seed_instance(int(self._derived_rng(len(TABLES), pool_key).integers(2 ** 63)))
+            if provider == 'address':
+                values = [self.fake.address().replace('\n', ' ') for _ in range(self.pool_size)]
+            else:
+                method = getattr(self.fake, provider)
+                values = [method() for _ in range(self.pool_size)]
+            self._pools[provider] = np.array(values, dtype=object)
+        return self._pools[provider]
+
+    def _faker(self, provider, n):
+        """n valeurs Faker, indexées dans le réservoir du fournisseur"""
+        pool = self._pool(provider)
+        return pool[self.rng.integers(0, len(pool), n)]
+
+    def _choice(self, values, n):
+        """Équivalent vectorisé de random.choice"""
+        return np.asarray(values, dtype=object)[self.rng.integers(0, len(values), n)]
+
+    def _randint(self, low, high, n):
+        """Équivalent vectorisé de random.randint (bornes incluses)"""
+        return self.rng.integers(low, high + 1, n)
+
+    def _booleans(self, n, p=0.5):
+        return self.rng.random(n) < p
+
+    def _dates_between(self, start, end, n):
+        """Dates uniformes entre start et end inclus (Faker.date_between)"""
+        start = np.datetime64(start.date(), 'D')
+        days = (np.datetime64(end.date(), 'D') - start).astype(int)
+        return start + self.rng.integers(0, days + 1, n).astype('timedelta64[D]')
+
+    def _datetimes_between(self, start, end, n):
+        """Horodatages uniformes à la microseconde entre start et end (Faker.date_time_between)"""
+        start = np.datetime64(start, 'us')
+        span = (np.datetime64(end, 'us') - start).astype(np.int64)
+        return start + self.rng.integers(0, span, n).astype('timedelta64[us]')
+
+    def _service_subsets(self, n, min_size=5):
+        """random.sample vectorisé : de min_size à 9 services distincts, joints par '|'"""
+        services = np.asarray(self.services_base, dtype=object)
+        shuffled = services[np.argsort(self.rng.random((n, len(services))), axis=1)]
+        sizes = self._randint(min_size, len(services), n)
+
+        joined = shuffled[:, 0].copy()
+        for k in range(1, len(services)):
+            longer = sizes > k
+            joined[longer] = joined[longer] + '|' + shuffled[longer, k]
+        return joined
+
+    # ----- shards -----
+
+    def _table_rows(self, table):
+        """Nombre total de lignes d'une table au facteur d'échelle courant"""
+        return {
+            'maisons_france_services': self.n_maisons,
+            'usagers': self.n_usagers,
+            'demandes': self.n_demandes,
+            'conseillers': int(self._per_maison_counts('conseillers', 2, 8).sum()),
+            'plannings': PLANNING_WEEKS * self.n_maisons * 5,
+            'statistiques_mensuelles': STATISTICS_MONTHS * self.n_maisons,
+            'temps_attente': self.n_demandes,
+            'services_details': len(SERVICES_DETAILS),
+            'incidents_techniques': int(self._per_maison_counts('incidents_techniques', 0, 5).sum())
+        }[table]
+
+    def _shards(self, table):
+        """Découpage d'une table en (numéro, première ligne, fin) ; au moins un shard"""
+        total = self._table_rows(table)
+        starts = range(0, total, self.shard_rows) or [0]
+        return [(shard, start, min(start + self.shard_rows, total)) for shard, start in enumerate(starts)]
+
+    def build_shard(self, table, shard, start, stop):
+        """Lignes [start, stop) d'une table, tirées avec la graine dérivée du shard"""
+        self.rng = self._shard_rng(table, shard)
+        return getattr(self, f'_rows_{table}')(start, stop)
+
+    def iter_chunks(self, table):
+        """Chunks successifs d'une table (DataFrames d'au plus shard_rows lignes)"""
+        for shard, start, stop in self._shards(table):
+            yield self.build_shard(table, shard, start, stop)
+
+    def encode_shard(self, sink_class, table, shard, start, stop):
+        """Générer un shard et le sérialiser pour le sink (dans le processus qui le génère)"""
+        started = time.perf_counter()
+        df = self.build_shard(table, shard, start, stop)
+        payload = sink_class.encode(table, df, shard == 0)
+        return {'table': table, 'shard': shard, 'rows': len(df),
+                'seconds': time.perf_counter() - started, 'payload': payload}
+
+    def _encoded_shards(self, tasks, sink_class):
+        """Shards encodés, dans l'ordre des tâches ; au plus 2 par processus en vol"""
+        if self.workers <= 1:
+            for task in tasks:
+                yield self.encode_shard(sink_class, *task)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            tasks = iter(tasks)
+            pending = deque()
+
+            def submit_next():
+                task = next(tasks, None)
+                if task is not None:
+                    pending.append(pool.submit(_encode_shard_worker, self.settings, sink_class, *task))
+
+            for _ in range(2 * self.workers):
+                submit_next()
+            while pending:
+                result = pending.popleft().result()
+                # Une tâche entre quand un résultat sort : la mémoire reste bornée
+                submit_next()
+                yield result
+
+    def generate_tables(self, tables=None, sink=None, on_table_done=None):
+        """Générer des tables chunk par chunk dans un sink (CSV par défaut) ; retourne le débit par table"""
+        tables = tables or TABLES
+        sink = sink or CsvSink(self.output_dir)
+        shards = {table: self._shards(table) for table in tables}
+        tasks = [(table, shard, start, stop) for table in tables for shard, start, stop in shards[table]]
+
+        stats = []
+        current = None
+        try:
+            for result in self._encoded_shards(tasks, type(sink)):
+                table = result['table']
+                if result['shard'] == 0:
+                    sink.open(table)
+                    current = {'table': table, 'rows': 0, 'shards': len(shards[table]), 'seconds': 0.0}
+
+                started = time.perf_counter()
+                sink.write(table, result['payload'])
+                # Temps cumulé des shards : le débit d'un processus, indépendant du parallélisme
+                current['rows'] += result['rows']
+                current['seconds'] += result['seconds'] + time.perf_counter() - started
+
+                if result['shard'] == current['shards'] - 1:
+                    sink.close(table)
+                    current['rows_per_second'] = (round(current['rows'] / current['seconds'])
+                                                  if current['seconds'] > 0 else current['rows'])
+                    stats.append(current)
+                    if on_table_done:
+                        on_table_done(current)
+                    current = None
+        except BaseException:
+            if current is not None:
+                sink.abort(current['table'])
+            raise
+
+        self.stats.extend(stats)
+        return stats
+
+    # ----- tables -----
+
+    def _rows_maisons_france_services(self, start, stop):
+        """Lignes [start, stop) des maisons France Services"""
+        n = stop - start
+
+        return pd.DataFrame({
+            'id': np.arange(start + 1, stop + 1),
+            'nom': 'France Services ' + self._faker('city', n),
+            'adresse': self._faker('address', n),
+            'code_postal': self._faker('postcode', n),
+            'ville': self._faker('city', n),
+            'departement': self._faker('department_name', n),
+            'region': self._choice(self.regions, n),
+            'latitude': np.round(self.rng.uniform(-90, 90, n), 6),
+            'longitude': np.round(self.rng.uniform(-180, 180, n), 6),
+            'type_structure': self._choice(self.types_structure, n),
+            'date_ouverture': self._dates_between(self.now - timedelta(days=5 * 365), self.now, n),
+            'nb_conseillers': self._randint(1, 8, n),
+            'services_disponibles': self._service_subsets(n),
+            'population_desservie': self._randint(5000, 50000, n),
+            'statut': 'active'
+        })
+
+    def _rows_usagers(self, start, stop):
+        """Lignes [start, stop) des usagers"""
+        n = stop - start
 
         situations_familiales = ['celibataire', 'marie', 'divorce', 'veuf', 'concubinage']
         niveaux_numeriques = ['debutant', 'intermediaire', 'avance']
         frequences_visite = ['regulier', 'occasionnel', 'nouveau']
 
-        for i in range(n_usagers):
-            data.append({
-                'id': i + 1,
-                'age': random.randint(18, 85),
-                'genre': random.choice(['M', 'F']),
-                'situation_familiale': random.choice(situations_familiales),
-                'niveau_numerique': random.choice(niveaux_numeriques),
-                'code_postal': self.fake.postcode(),
-                'ville': self.fake.city(),
-                'date_inscription': self.fake.date_between(start_date='-2y', end_date='today'),
-                'frequence_visite': random.choice(frequences_visite)
-            })
-
-        df = pd.DataFrame(data)
-        df.to_csv(self.output_dir / 'usagers.csv', index=False)
-        return df
-
-    def generate_demandes(self, n_demandes=15000, n_usagers=5000, n_maisons=300):
-        """Générer les données des demandes"""
-        data = []
+        return pd.DataFrame({
+            'id': np.arange(start + 1, stop + 1),
+            'age': self._randint(18, 85, n),
+            'genre': self._choice(['M', 'F'], n),
+            'situation_familiale': self._choice(situations_familiales, n),
+            'niveau_numerique': self._choice(niveaux_numeriques, n),
+            'code_postal': self._faker('postcode', n),
+            'ville': self._faker('city', n),
+            'date_inscription': self._dates_between(self.now - timedelta(days=2 * 365), self.now, n),
+            'frequence_visite': self._choice(frequences_visite, n)
+        })
+
+    def _rows_demandes(self, start, stop):
+        """Lignes [start, stop) des demandes"""
+        n = stop - start
 
         organismes = ['pole_emploi', 'caf', 'cnav', 'cpam', 'ants', 'msa', 'la_poste', 'justice']
         canaux = ['physique', 'telephone', 'visio', 'numerique']
         complexites = ['simple', 'moyen', 'complexe']
 
-        for i in range(n_demandes):
-            data.append({
-                'id': i + 1,
-                'usager_id': random.randint(1, n_usagers),
-                'maison_fs_id': random.randint(1, n_maisons),
-                'date_demande': self.fake.date_time_between(start_date='-1y', end_date='now'),
-                'type_service': random.choice(self.services_base),
-                'organisme_concerne': random.choice(organismes),
-                'canal': random.choice(canaux),
-                'duree_traitement': random.randint(15, 120),
-                'satisfaction_score': random.randint(1, 5),
-                'resolu': random.choice([True, False]),
-                'conseiller_id': random.randint(1, 1500),
-                'complexite': random.choice(complexites),
-                'suivi_necessaire': random.choice([True, False])
-            })
-
-        df = pd.DataFrame(data)
-        df.to_csv(self.output_dir / 'demandes.csv', index=False)
-        return df
-        
-    def generate_conseillers(self, n_maisons=300):
-        """Générer les données des conseillers"""
-        data = []
-        conseiller_id = 1
-        
+        if self.realistic:
+            # Usagers et maisons Zipf ; la plupart des demandes dans la maison habituelle de l'usager
+            usager_id = self._zipf_ids('usagers', self.n_usagers, n)
+            maison_fs_id = np.where(self._booleans(n, HOME_MAISON_SHARE),
+                                    self._home_maisons()[usager_id - 1],
+                                    self._zipf_ids('maisons', self.n_maisons, n))
+            date_demande = self._seasonal_datetimes(n)
+            # Conseiller tiré parmi ceux de la maison (ids contigus par maison)
+            counts = self._per_maison_counts('conseillers', 2, 8)
+            first_ids = np.cumsum(counts) - counts + 1
+            conseiller_id = (first_ids[maison_fs_id - 1]
+                             + (self.rng.random(n) * counts[maison_fs_id - 1]).astype(np.int64))
+        else:
+            usager_id = self._randint(1, self.n_usagers, n)
+            maison_fs_id = self._randint(1, self.n_maisons, n)
+            date_demande = self._datetimes_between(self.now - timedelta(days=365), self.now, n)
+            # Tiré à sa place dans la ligne, pour garder la suite des tirages du mode uniforme
+            conseiller_id = None
+
+        return pd.DataFrame({
+            'id': np.arange(start + 1, stop + 1),
+            'usager_id': usager_id,
+            'maison_fs_id': maison_fs_id,
+            'date_demande': date_demande,
+            'type_service': self._choice(self.services_base, n),
+            'organisme_concerne': self._choice(organismes, n),
+            'canal': self._choice(canaux, n),
+            'duree_traitement': self._randint(15, 120, n),
+            'satisfaction_score': self._randint(1, 5, n),
+            'resolu': self._booleans(n),
+            'conseiller_id': (conseiller_id if conseiller_id is not None
+                              else self._randint(1, self.n_conseillers_ref, n)),
+            'complexite': self._choice(complexites, n),
+            'suivi_necessaire': self._booleans(n)
+        })
+
+    def _rows_conseillers(self, start, stop):
+        """Lignes [start, stop) des conseillers"""
+        n = stop - start
+
         # Spécialités possibles
         specialites = ['emploi', 'retraite', 'famille', 'social', 'sante', 'logement', 'energie', 'juridique']
-        
-        for maison_id in range(1, n_maisons + 1):
-            # Nombre de conseillers par maison (cohérent avec les maisons)
-            nb_conseillers = random.randint(2, 8)
-            
-            for _ in range(nb_conseillers):
-                data.append({
-                    'id': conseiller_id,
-                    'nom': self.fake.last_name(),
-                    'prenom': self.fake.first_name(),
-                    'maison_fs_id': maison_id,
-                    'specialite': random.choice(specialites),
-                    'date_embauche': self.fake.date_between(start_date='-5y', end_date='today'),
-                    'temps_travail': random.choice(['temps_plein', 'temps_partiel']),
-                    'niveau_experience': random.choice(['junior', 'senior', 'expert']),
-                    'statut': 'actif'
-                })
-                conseiller_id += 1
-        
-        df = pd.DataFrame(data)
-        df.to_csv(self.output_dir / 'conseillers.csv', index=False)
-        return df
-        
-    def generate_plannings(self, n_maisons=300):
-        """Générer les données de planning hebdomadaire"""
-        data = []
-        
-        # Générer pour les 12 dernières semaines
-        start_date = datetime.now() - timedelta(weeks=12)
-        
-        for week in range(12):
-            week_start = start_date + timedelta(weeks=week)
-            
-            for maison_id in range(1, n_maisons + 1):
-                # Heures d'ouverture par jour (lundi à vendredi)
-                for day in range(5):  # 0-4 pour lundi-vendredi
-                    current_date = week_start + timedelta(days=day)
-                    
-                    # Variations d'horaires
-                    if day in [0, 1, 2, 3]:  # Lundi à jeudi
-                        heures_ouverture = random.choice([8, 9, 8.5])
-                        heures_fermeture = random.choice([17, 18, 17.5])
-                    else:  # Vendredi
-                        heures_ouverture = random.choice([8, 9])
-                        heures_fermeture = random.choice([16, 17])
-                    
-                    data.append({
-                        'id': len(data) + 1,
-                        'maison_fs_id': maison_id,
-                        'date': current_date.date(),
-                        'jour_semaine': current_date.strftime('%A'),
-                        'heure_ouverture': heures_ouverture,
-                        'heure_fermeture': heures_fermeture,
-                        'nb_conseillers_prevus': random.randint(1, 5),
-                        'nb_conseillers_presents': random.randint(1, 5),
-                        'fermeture_exceptionnelle': random.choice([True, False]) if random.random() < 0.05 else False
-                    })
-        
-        df = pd.DataFrame(data)
-        df.to_csv(self.output_dir / 'plannings.csv', index=False)
-        return df
-
-    def generate_statistiques_mensuelles(self, n_maisons=300):
-        """Générer les statistiques mensuelles par maison"""
-        data = []
-        
-        # Générer pour les 12 derniers mois
-        for month_offset in range(12):
-            date_stat = datetime.now() - timedelta(days=30 * month_offset)
-            
-            for maison_id in range(1, n_maisons + 1):
-                # Variations saisonnières
-                facteur_saison = 1.0
-                if date_stat.month in [1, 2, 3]:  # Début d'année, plus de demandes
-                    facteur_saison = 1.3
-                elif date_stat.month in [7, 8]:  # Été, moins de demandes
-                    facteur_saison = 0.7
-                
-                base_demandes = random.randint(100, 500)
-                nb_demandes = int(base_demandes * facteur_saison)
-                
-                data.append({
-                    'id': len(data) + 1,
-                    'maison_fs_id': maison_id,
-                    'mois': date_stat.month,
-                    'annee': date_stat.year,
-                    'nb_demandes': nb_demandes,
-                    'nb_demandes_resolues': int(nb_demandes * random.uniform(0.8, 0.95)),
-                    'temps_moyen_resolution': random.randint(20, 90),
-                    'satisfaction_moyenne': round(random.uniform(3.5, 4.8), 2),
-                    'nb_usagers_uniques': random.randint(80, 300),
-                    'nb_nouveaux_usagers': random.randint(10, 50),
-                    'taux_retour_usagers': round(random.uniform(0.3, 0.7), 2)
-                })
-        
-        df = pd.DataFrame(data)
-        df.to_csv(self.output_dir / 'statistiques_mensuelles.csv', index=False)
-        return df
-
-    def generate_temps_attente(self, n_demandes=15000):
-        """Générer les données de temps d'attente"""
-        data = []
-        
-        for demande_id in range(1, n_demandes + 1):
-            # Temps d'attente varie selon le canal et l'heure
-            heure_demande = random.randint(8, 18)
-            
-            if heure_demande in [12, 13, 14]:  # Pause déjeuner
-                temps_attente = random.randint(15, 45)
-            elif heure_demande in [9, 10, 11]:  # Matin chargé
-                temps_attente = random.randint(5, 25)
-            else:  # Après-midi
-                temps_attente = random.randint(3, 20)
-            
-            data.append({
-                'id': len(data) + 1,
-                'demande_id': demande_id,
-                'temps_attente_minutes': temps_attente,
-                'heure_demande': heure_demande,
-                'jour_semaine': random.choice(['lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi']),
-                'canal_utilise': random.choice(['physique', 'telephone', 'visio', 'numerique']),
-                'priorite': random.choice(['normale', 'urgente', 'faible'])
-            })
-        
-        df = pd.DataFrame(data)
-        df.to_csv(self.output_dir / 'temps_attente.csv', index=False)
-        return df
 
-    def generate_services_details(self):
-        """Générer les détails des services avec volumes"""
-        data = []
-        
-        services_details = [
-            {'service': 'emploi', 'sous_service': 'inscription_pole_emploi', 'complexite': 'simple'},
-            {'service': 'emploi', 'sous_service': 'actualisation_situation', 'complexite': 'simple'},
-            {'service': 'emploi', 'sous_service': 'recherche_formation', 'complexite': 'moyen'},
-            {'service': 'retraite', 'sous_service': 'simulation_retraite', 'complexite': 'moyen'},
-            {'service': 'retraite', 'sous_service': 'dossier_retraite', 'complexite': 'complexe'},
-            {'service': 'famille', 'sous_service': 'caf_allocations', 'complexite': 'moyen'},
-            {'service': 'famille', 'sous_service': 'prime_naissance', 'complexite': 'simple'},
-            {'service': 'social', 'sous_service': 'rsa', 'complexite': 'complexe'},
-            {'service': 'social', 'sous_service': 'aide_logement', 'complexite': 'moyen'},
-            {'service': 'sante', 'sous_service': 'carte_vitale', 'complexite': 'simple'},
-            {'service': 'sante', 'sous_service': 'remboursement_soins', 'complexite': 'moyen'},
-            {'service': 'logement', 'sous_service': 'demande_HLM', 'complexite': 'complexe'},
-            {'service': 'energie', 'sous_service': 'cheque_energie', 'complexite': 'simple'},
-            {'service': 'services_postaux', 'sous_service': 'colis_recommande', 'complexite': 'simple'},
-            {'service': 'acces_droit', 'sous_service': 'aide_juridictionnelle', 'complexite': 'complexe'}
-        ]
-        
-        for i, service_detail in enumerate(services_details):
+        # Nombre de conseillers par maison (cohérent avec les maisons) : la ligne i appartient
+        # à la maison dont l'intervalle cumulé la contient
+        ends = np.cumsum(self._per_maison_counts('conseillers', 2, 8))
+        maison_fs_id = np.searchsorted(ends, np.arange(start, stop), side='right') + 1
+
+        return pd.DataFrame({
+            'id': np.arange(start + 1, stop + 1),
+            'nom': self._faker('last_name', n),
+            'prenom': self._faker('first_name', n),
+            'maison_fs_id': maison_fs_id,
+            'specialite': self._choice(specialites, n),
+            'date_embauche': self._dates_between(self.now - timedelta(days=5 * 365), self.now, n),
+            'temps_travail': self._choice(['temps_plein', 'temps_partiel'], n),
+            'niveau_experience': self._choice(['junior', 'senior', 'expert'], n),
+            'statut': 'actif'
+        })
+
+    def _rows_plannings(self, start, stop):
+        """Lignes [start, stop) du planning hebdomadaire des 12 dernières semaines"""
+        n = stop - start
+
+        # Une ligne par semaine, maison et jour (lundi à vendredi), dans cet ordre
+        index = np.arange(start, stop)
+        week = index // (self.n_maisons * 5)
+        maison_fs_id = (index // 5) % self.n_maisons + 1
+        day = index % 5
+
+        start_date = np.datetime64((self.now - timedelta(weeks=PLANNING_WEEKS)).date(), 'D')
+        dates = start_date + (week * 7 + day).astype('timedelta64[D]')
+        # Le 1er janvier 1970 était un jeudi
+        weekdays = (dates.astype(np.int64) + 3) % 7
+        day_names = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+                             dtype=object)
+
+        # Variations d'horaires : lundi à jeudi, puis vendredi
+        early_days = day < 4
+        heures_ouverture = np.where(early_days, self._choice([8.0, 9.0, 8.5], n), self._choice([8.0, 9.0], n))
+        heures_fermeture = np.where(early_days, self._choice([17.0, 18.0, 17.5], n), self._choice([16.0, 17.0], n))
+
+        return pd.DataFrame({
+            'id': np.arange(start + 1, stop + 1),
+            'maison_fs_id': maison_fs_id,
+            'date': dates,
+            'jour_semaine': day_names[weekdays],
+            'heure_ouverture': heures_ouverture.astype(float),
+            'heure_fermeture': heures_fermeture.astype(float),
+            'nb_conseillers_prevus': self._randint(1, 5, n),
+            'nb_conseillers_presents': self._randint(1, 5, n),
+            # 5 % des jours tirent au sort une fermeture exceptionnelle
+            'fermeture_exceptionnelle': self._booleans(n, 0.05) & self._booleans(n)
+        })
+
+    def _rows_statistiques_mensuelles(self, start, stop):
+        """Lignes [start, stop) des statistiques mensuelles par maison"""
+        n = stop - start
+
+        # Une ligne par mois (du plus récent au plus ancien) et par maison
+        index = np.arange(start, stop)
+        month_offset = index // self.n_maisons
+        month_dates = [self.now - timedelta(days=30 * offset) for offset in range(STATISTICS_MONTHS)]
+        mois = np.array([d.month for d in month_dates])[month_offset]
+        annee = np.array([d.year for d in month_dates])[month_offset]
+
+        # Variations saisonnières : plus de demandes en début d'année, moins l'été
+        facteur_saison = np.select([np.isin(mois, [1, 2, 3]), np.isin(mois, [7, 8])], [1.3, 0.7], 1.0)
+        nb_demandes = (self._randint(100, 500, n) * facteur_saison).astype(int)
+
+        return pd.DataFrame({
+            'id': np.arange(start + 1, stop + 1),
+            'maison_fs_id': index % self.n_maisons + 1,
+            'mois': mois,
+            'annee': annee,
+            'nb_demandes': nb_demandes,
+            'nb_demandes_resolues': (nb_demandes * self.rng.uniform(0.8, 0.95, n)).astype(int),
+            'temps_moyen_resolution': self._randint(20, 90, n),
+            'satisfaction_moyenne': np.round(self.rng.uniform(3.5, 4.8, n), 2),
+            'nb_usagers_uniques': self._randint(80, 300, n),
+            'nb_nouveaux_usagers': self._randint(10, 50, n),
+            'taux_retour_usagers': np.round(self.rng.uniform(0.3, 0.7, n), 2)
+        })
+
+    def _rows_temps_attente(self, start, stop):
+        """Lignes [start, stop) des temps d'attente (une par demande)"""
+        n = stop - start
+        if self.realistic:
+            return self._correlated_temps_attente(start, stop)
+
+        # Temps d'attente varie selon l'heure : pause déjeuner, matin chargé, après-midi
+        heure_demande = self._randint(8, 18, n)
+        temps_attente = np.select(
+            [np.isin(heure_demande, [12, 13, 14]), np.isin(heure_demande, [9, 10, 11])],
+            [self._randint(15, 45, n), self._randint(5, 25, n)],
+            self._randint(3, 20, n)
+        )
+
+        return pd.DataFrame({
+            'id': np.arange(start + 1, stop + 1),
+            'demande_id': np.arange(start + 1, stop + 1),
+            'temps_attente_minutes': temps_attente,
+            'heure_demande': heure_demande,
+            'jour_semaine': self._choice(['lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi'], n),
+            'canal_utilise': self._choice(['physique', 'telephone', 'visio', 'numerique'], n),
+            'priorite': self._choice(['normale', 'urgente', 'faible'], n)
+        })
+
+    def _correlated_temps_attente(self, start, stop):
+        """Temps d'attente tirés de la demande correspondante : heure, jour, canal et fréquentation de la maison"""
+        n = stop - start
+        demandes = self._matching_demandes(start, stop)
+
+        timestamps = demandes['date_demande'].to_numpy()
+        days = timestamps.astype('datetime64[D]')
+        heure_demande = (timestamps - days).astype('timedelta64[h]').astype(int)
+        weekdays = (days.astype(np.int64) + 3) % 7
+
+        # Attente moyenne selon l'heure (pause déjeuner, matin chargé, après-midi), comme en mode uniforme
+        base = np.select([np.isin(heure_demande, [12, 13, 14]), np.isin(heure_demande, [9, 10, 11])],
+                         [30.0, 15.0], 11.5)
+        # Les maisons les plus fréquentées font attendre plus longtemps
+        load = self._popularity('maisons', self.n_maisons)[demandes['maison_fs_id'].to_numpy() - 1] * self.n_maisons
+        canal = demandes['canal'].to_numpy()
+        canal_factor = pd.Series(canal).map(CANAL_WAIT_FACTORS).to_numpy()
+        minutes = base * np.sqrt(np.clip(load, 0.25, 16)) * canal_factor * self.rng.lognormal(0, 0.4, n)
+
+        return pd.DataFrame({
+            'id': np.arange(start + 1, stop + 1),
+            'demande_id': demandes['id'].to_numpy(),
+            'temps_attente_minutes': np.clip(np.rint(minutes), 1, 240).astype(int),
+            'heure_demande': heure_demande,
+            'jour_semaine': JOURS_SEMAINE[weekdays],
+            'canal_utilise': canal,
+            'priorite': self._choice(['normale', 'urgente', 'faible'], n)
+        })
+
+    def _rows_services_details(self, start, stop):
+        """Lignes [start, stop) des détails des services avec volumes"""
+        n = stop - start
+        services_details = pd.DataFrame(SERVICES_DETAILS[start:stop])
+
+        return pd.DataFrame({
+            'id': np.arange(start + 1, stop + 1),
+            'service': services_details['service'],
+            'sous_service': services_details['sous_service'],
+            'complexite': services_details['complexite'],
             # Volume mensuel moyen pour chaque service
-            volume_base = random.randint(50, 500)
-            
-            data.append({
-                'id': i + 1,
-                'service': service_detail['service'],
-                'sous_service': service_detail['sous_service'],
-                'complexite': service_detail['complexite'],
-                'volume_mensuel_moyen': volume_base,
-                'duree_moyenne_traitement': random.randint(15, 120),
-                'taux_resolution': round(random.uniform(0.7, 0.95), 2),
-                'satisfaction_moyenne': round(random.uniform(3.2, 4.7), 2),
-                'formation_requise': random.choice(['base', 'intermediaire', 'avancee'])
-            })
-        
-        df = pd.DataFrame(data)
-        df.to_csv(self.output_dir / 'services_details.csv', index=False)
-        return df
-
-    def generate_incidents_techniques(self, n_maisons=300):
-        """Générer les incidents techniques"""
-        data = []
-        
+            'volume_mensuel_moyen': self._randint(50, 500, n),
+            'duree_moyenne_traitement': self._randint(15, 120, n),
+            'taux_resolution': np.round(self.rng.uniform(0.7, 0.95, n), 2),
+            'satisfaction_moyenne': np.round(self.rng.uniform(3.2, 4.7, n), 2),
+            'formation_requise': self._choice(['base', 'intermediaire', 'avancee'], n)
+        })
+
+    def _rows_incidents_techniques(self, start, stop):
+        """Lignes [start, stop) des incidents techniques des 6 derniers mois"""
+        n = stop - start
+
         types_incidents = [
             'panne_internet', 'probleme_materiel', 'logiciel_indisponible',
             'coupure_electricite', 'probleme_telephonie', 'maintenance_programmee'
         ]
-        
-        # Générer des incidents sur les 6 derniers mois
-        start_date = datetime.now() - timedelta(days=180)
-        
-        for maison_id in range(1, n_maisons + 1):
-            # Nombre d'incidents par maison (0 à 5)
-            nb_incidents = random.randint(0, 5)
-            
-            for _ in range(nb_incidents):
-                incident_start = self.fake.date_time_between(start_date=start_date, end_date='now')
-                duree = random.randint(30, 480)  # 30 min à 8h
-                
-                data.append({
-                    'id': len(data) + 1,
-                    'maison_fs_id': maison_id,
-                    'type_incident': random.choice(types_incidents),
-                    'date_debut': incident_start,
-                    'duree_minutes': duree,
-                    'impact_usagers': random.randint(0, 50),
-                    'resolu': True,
-                    'gravite': random.choice(['faible', 'moyenne', 'haute'])
-                })
-        
-        df = pd.DataFrame(data)
-        df.to_csv(self.output_dir / 'incidents_techniques.csv', index=False)
-        return df
-
-    def generate_all_data(self):
-        """Générer tous les jeux de données (version enrichie)"""
-        from rich.console import Console
-        from rich.progress import Progress
 
-        console = Console()
+        # Nombre d'incidents par maison (0 à 5)
+        ends = np.cumsum(self._per_maison_counts('incidents_techniques', 0, 5))
+        maison_fs_id = np.searchsorted(ends, np.arange(start, stop), side='right') + 1
+
+        return pd.DataFrame({
+            'id': np.arange(start + 1, stop + 1),
+            'maison_fs_id': maison_fs_id,
+            'type_incident': self._choice(types_incidents, n),
+            'date_debut': self._datetimes_between(self.now - timedelta(days=180), self.now, n),
+            'duree_minutes': self._randint(30, 480, n),  # 30 min à 8h
+            'impact_usagers': self._randint(0, 50, n),
+            'resolu': True,
+            'gravite': self._choice(['faible', 'moyenne', 'haute'], n)
+        })
+
+    def generate_maisons_france_services(self):
+        """Générer les données des maisons France Services"""
+        return self.generate_tables(['maisons_france_services'])[0]
 
-        with Progress() as progress:
-            task = progress.add_task("[green]Génération des données...", total=8)
+    def generate_usagers(self):
+        """Générer les données des usagers"""
+        return self.generate_tables(['usagers'])[0]
 
-            # Données existantes
-            console.print("📍 Génération des maisons France Services...")
-            self.generate_maisons_france_services()
-            progress.update(task, advance=1)
+    def generate_demandes(self):
+        """Générer les données des demandes"""
+        return self.generate_tables(['demandes'])[0]
+
+    def generate_conseillers(self):
+        """Générer les données des conseillers"""
+        return self.generate_tables(['conseillers'])[0]
 
-            console.print("👥 Génération des usagers...")
-            self.generate_usagers()
-            progress.update(task, advance=1)
+    def generate_plannings(self):
+        """Générer les données de planning hebdomadaire"""
+        return self.generate_tables(['plannings'])[0]
 
-            console.print("📄 Génération des demandes...")
-            self.generate_demandes()
-            progress.update(task, advance=1)
+    def generate_statistiques_mensuelles(self):
+        """Générer les statistiques mensuelles par maison"""
+        return self.generate_tables(['statistiques_mensuelles'])[0]
 
-            # Nouvelles données
-            console.print("👨‍💼 Génération des conseillers...")
-            self.generate_conseillers()
-            progress.update(task, advance=1)
+    def generate_temps_attente(self):
+        """Générer les données de temps d'attente"""
+        return self.generate_tables(['temps_attente'])[0]
 
-            console.print("📅 Génération des plannings...")
-            self.generate_plannings()
-            progress.update(task, advance=1)
+    def generate_services_details(self):
+        """Générer les détails des services avec volumes"""
+        return self.generate_tables(['services_details'])[0]
 
-            console.print("📊 Génération des statistiques mensuelles...")
-            self.generate_statistiques_mensuelles()
-            progress.update(task, advance=1)
+    def generate_incidents_techniques(self):
+        """Générer les incidents techniques"""
+        return self.generate_tables(['incidents_techniques'])[0]
 
-            console.print("⏱️ Génération des temps d'attente...")
-            self.generate_temps_attente()
-            progress.update(task, advance=1)
+    def generate_all_data(self, sink=None):
+        """Générer tous les jeux de données (version enrichie) dans un sink (CSV par défaut)"""
+        from rich.console import Console
+        from rich.progress import Progress
 
-            console.print("🔧 Génération des services détaillés...")
-            self.generate_services_details()
-            progress.update(task, advance=1)
+        console = Console()
+        sink = sink or CsvSink(self.output_dir)
+        self.stats = []
 
-            console.print("⚠️ Génération des incidents techniques...")
-            self.generate_incidents_techniques()
-            progress.update(task, advance=1)
+        console.print(
+            f"⚙️  Facteur d'échelle {self.scale_factor} : {self.n_maisons:,} maisons, "
+            f"{self.n_usagers:,} usagers, {self.n_demandes:,} demandes "
+            f"({self.workers} processus, graine {self.seed}"
+            f"{', distributions réalistes' if self.realistic else ''})"
+        )
+        started = time.perf_counter()
 
-            console.print("✅ Tous les fichiers CSV ont été générés avec succès!")
-            console.print(f"📂 Fichiers sauvegardés dans : {self.output_dir}")
\ No newline at end of file
+        with Progress() as progress:
+            task = progress.add_task("[green]Génération des données...", total=len(TABLES))
+
+            def table_done(entry):
+                console.print(f"{TABLE_LABELS[entry['table']]} : {entry['rows']:,} lignes "
+                              f"({entry['shards']} shard{'s' if entry['shards'] > 1 else ''})")
+                progress.update(task, advance=1)
+
+            stats = self.generate_tables(TABLES, sink=sink, on_table_done=table_done)
+
+            console.print("✅ Toutes les données ont été générées avec succès!")
+            console.print(sink.label)
+
+        self._print_generation_summary(console, time.perf_counter() - started)
+        return stats
+
+    def _print_generation_summary(self, console, wall_seconds):
+        """Afficher le débit de génération par table"""
+        from rich.table import Table
+
+        table = Table(title="Génération vectorisée")
+        table.add_column("Table")
+        table.add_column("Lignes", justify="right")
+        table.add_column("Shards", justify="right")
+        table.add_column("Durée (s)", justify="right")
+        table.add_column("Lignes/s", justify="right")
+        for entry in sorted(self.stats, key=lambda e: TABLES.index(e['table'])):
+            table.add_row(entry['table'], f"{entry['rows']:,}", str(entry['shards']),
+                          f"{entry['seconds']:.2f}", f"{entry['rows_per_second']:,}")
+
+        # Le total rapporte le temps écoulé : c'est là que le parallélisme se voit
+        total_rows = sum(entry['rows'] for entry in self.stats)
+        table.add_row("[bold]Total (temps écoulé)[/bold]", f"{total_rows:,}",
+                      str(sum(entry['shards'] for entry in self.stats)), f"{wall_seconds:.2f}",
+                      f"{round(total_rows / wall_seconds) if wall_seconds else total_rows:,}")
+        console.print(table)
@@ -0,0 +1,217 @@
+# src/database/admission.py
+"""
+Admission control for LLM-generated queries.
+
+Every query is classified into a workload class from its EXPLAIN cost:
+
+- interactive: point lookups and small scans (many slots, short queue wait);
+- heavy: large joins and aggregates (few slots, longer queue wait).
+
+Each class has a fixed number of concurrency slots. When they are all taken,
+the request waits in the class queue for at most the class max wait and is
+rejected with `AdmissionRejected` after that. A freed slot goes to the waiting
+request whose user currently holds the fewest slots of that class (oldest
+first on ties), so one user firing heavy joins cannot starve the others.
+
+Queue depth, running queries and wait times are exposed by `metrics()`.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+from sqlalchemy import text
+
+from .connection import database_connection
+from .workload import fingerprint_query
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+HEAVY_COST_THRESHOLD = float(os.getenv("ADMISSION_HEAVY_COST", "100000"))
+
+WORKLOAD_CLASSES = {
+    "interactive": {
+        "slots": int(os.getenv("ADMISSION_INTERACTIVE_SLOTS", "8")),
+        "max_wait_s": float(os.getenv("ADMISSION_INTERACTIVE_MAX_WAIT_S", "10")),
+    },
+    "heavy": {
+        "slots": int(os.getenv("ADMISSION_HEAVY_SLOTS", "2")),
+        "max_wait_s": float(os.getenv("ADMISSION_HEAVY_MAX_WAIT_S", "60")),
+    },
+}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a query waited longer than its class allows for a slot."""
+
+
+class _Ticket:
+    """A request for a slot, waiting or admitted."""
+
+    def __init__(self, workload_class: str, user: str, cost: Optional[float]):
+        self.workload_class = workload_class
+        self.user = user
+        self.cost = cost
+        self.enqueued_at = time.perf_counter()
+        self.admitted = False
+        self.wait_ms = 0.0
+
+
+class WorkloadManager:
+    """Concurrency slots, fair queues and metrics per workload class."""
+
+    def __init__(self, db_connection, classes: Dict[str, Dict[str, float]] = None,
+                 heavy_cost: float = HEAVY_COST_THRESHOLD, cost_cache_size: int = 512):
+        self.db_connection = db_connection
+        self.classes = classes or WORKLOAD_CLASSES
+        self.heavy_cost = heavy_cost
+        self.cost_cache_size = cost_cache_size
+        self._cost_cache: "OrderedDict[str, Optional[float]]" = OrderedDict()
+        self._cost_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._running = {name: {} for name in self.classes}   # class -> {user: running count}
+        self._queues = {name: [] for name in self.classes}    # class -> waiting tickets
+        self._stats = {
+            name: {"admitted": 0, "rejected": 0, "waits_ms": deque(maxlen=1000), "max_wait_ms": 0.0}
+            for name in self.classes
+        }
+
+    # ----- classification -----
+
+    def classify(self, sql: str) -> Dict[str, Any]:
+        """Workload class of a query from its planner cost (cached per fingerprint)."""
+        cost = self._plan_cost(sql)
+        workload_class = "heavy" if cost is not None and cost >= self.heavy_cost else "interactive"
+        return {"class": workload_class, "cost": cost}
+
+    def _plan_cost(self, sql: str) -> Optional[float]:
+        fingerprint = fingerprint_query(sql)
+        with self._cost_lock:
+            if fingerprint in self._cost_cache:
+                self._cost_cache.move_to_end(fingerprint)
+                return self._cost_cache[fingerprint]
+
+        try:
+            with self.db_connection.engine.connect() as connection:
+                plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql.strip().rstrip(';')}")).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            cost = float(plan[0]["Plan"]["Total Cost"])
+        except Exception as e:
+            # The query itself will report the error; admit it as interactive
+            logger.debug(f"EXPLAIN failed during admission: {e}")
+            cost = None
+
+        with self._cost_lock:
+            self._cost_cache[fingerprint] = cost
+            if len(self._cost_cache) > self.cost_cache_size:
+                self._cost_cache.popitem(last=False)
+        return cost
+
+    # ----- admission -----
+
+    @contextmanager
+    def admit(self, sql: str, user: str = "unknown"):
+        """Hold a slot of the query's workload class for the duration of the block."""
+        ticket = self.acquire(sql, user)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def acquire(self, sql: str, user: str = "unknown") -> Optional[_Ticket]:
+        """Wait for a slot; None when admission control is disabled."""
+        if not ADMISSION_ENABLED:
+            return None
+
+        classification = self.classify(sql)
+        ticket = _Ticket(classification["class"], user or "unknown", classification["cost"])
+        config = self.classes[ticket.workload_class]
+        deadline = ticket.enqueued_at + config["max_wait_s"]
+
+        with self._condition:
+            queue = self._queues[ticket.workload_class]
+            queue.append(ticket)
+            try:
+                while not self._grant(ticket):
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._stats[ticket.workload_class]["rejected"] += 1
+                        raise AdmissionRejected(
+                            f"Database busy: no {ticket.workload_class} slot freed within "
+                            f"{config['max_wait_s']:g}s ({len(queue)} queries queued)"
+                        )
+                    self._condition.wait(remaining)
+            finally:
+                if ticket in queue:
+                    queue.remove(ticket)
+                # Someone else may now be first in line
+                self._condition.notify_all()
+
+            ticket.wait_ms = round((time.perf_counter() - ticket.enqueued_at) * 1000, 1)
+            stats = self._stats[ticket.workload_class]
+            stats["admitted"] += 1
+            stats["waits_ms"].append(ticket.wait_ms)
+            stats["max_wait_ms"] = max(stats["max_wait_ms"], ticket.wait_ms)
+
+        if ticket.wait_ms > 100:
+            logger.info(f"Admitted {ticket.workload_class} query for {ticket.user} after {ticket.wait_ms:.0f} ms")
+        return ticket
+
+    def _grant(self, ticket: _Ticket) -> bool:
+        """Give the ticket a slot if one is free and it is next in fair order (lock held)."""
+        running = self._running[ticket.workload_class]
+        if sum(running.values()) >= self.classes[ticket.workload_class]["slots"]:
+            return False
+
+        # Fair order: fewest running queries for the user, then arrival
+        queue = self._queues[ticket.workload_class]
+        first = min(queue, key=lambda t: (running.get(t.user, 0), t.enqueued_at))
+        if first is not ticket:
+            return False
+
+        running[ticket.user] = running.get(ticket.user, 0) + 1
+        ticket.admitted = True
+        return True
+
+    def release(self, ticket: Optional[_Ticket]) -> None:
+        if ticket is None or not ticket.admitted:
+            return
+        with self._condition:
+            running = self._running[ticket.workload_class]
+            running[ticket.user] -= 1
+            if running[ticket.user] <= 0:
+                del running[ticket.user]
+            ticket.admitted = False
+            self._condition.notify_all()
+
+    # ----- metrics -----
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Queue depth, running queries and wait times per workload class."""
+        with self._condition:
+            report = {}
+            for name, config in self.classes.items():
+                stats = self._stats[name]
+                waits = sorted(stats["waits_ms"])
+                report[name] = {
+                    "slots": config["slots"],
+                    "running": sum(self._running[name].values()),
+                    "queue_depth": len(self._queues[name]),
+                    "admitted": stats["admitted"],
+                    "rejected": stats["rejected"],
+                    "avg_wait_ms": round(sum(waits) / len(waits), 1) if waits else 0.0,
+                    "p95_wait_ms": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                    "max_wait_ms": stats["max_wait_ms"],
+                }
+            return report
+
+
+# Global instance shared by every session of the app
+workload_manager = WorkloadManager(database_connection)
@@ -0,0 +1,338 @@
+# src/database/bulk_load.py
+"""
+COPY-based bulk loading of CSV files into PostgreSQL.
+
+Each CSV file is streamed as-is into `COPY ... FROM STDIN`: nothing is parsed
+in Python. By default the rows first land in an UNLOGGED staging table of
+TEXT columns (no WAL, no type errors mid-stream), and are then cast
+server-side to the target column types with a single INSERT ... SELECT.
+Integer columns go through numeric, so "12.0" written by pandas still loads.
+
+With `replace=True` the new rows are built in a shadow copy of the table and
+swapped in by renaming, in one transaction, so readers see either the old or
+the new data. Tables that other tables reference through foreign keys cannot
+be renamed away (nor truncated): their rows are merged on `id` (upsert, then
+delete the ids that disappeared) in one transaction. Partitioned tables are
+truncated and refilled in one transaction.
+
+`start_offset` loads only the bytes of the file after that offset (the tail
+appended since the last load); the header line is still read from the top.
+
+Without staging, rows are copied straight into the target table. This is the
+fastest path, but the CSV has to be clean for the column types.
+
+Parquet files are read memory-mapped and re-encoded to CSV one record batch at
+a time as COPY pulls from them, so they take the same path with bounded
+memory. They are always loaded whole (no `start_offset`).
+"""
+
+import io
+import csv
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+# pyarrow is only needed for Parquet files
+try:
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_INTEGER_TYPES = ("smallint", "integer", "bigint")
+
+
+class CopyLoader:
+    """Streams CSV files into PostgreSQL tables with COPY."""
+
+    def __init__(self, engine, staging: bool = True, unlogged: bool = True):
+        self.engine = engine
+        self.staging = staging
+        self.unlogged = unlogged
+
+    def load(self, csv_path: str, table_name: str, replace: bool = False,
+             order_by: Optional[str] = None,
+             before_insert: Optional[Callable[[Any, str], None]] = None,
+             start_offset: int = 0) -> Dict[str, Any]:
+        """Load one CSV file into a table; returns row count, duration and rows/s.
+
+        `order_by` sorts rows on the way from staging into the table (e.g. the
+        time column for BRIN indexes). `before_insert(conn, staging_table)` runs
+        on a SQLAlchemy connection once staging is filled, e.g. to create the
+        partitions the rows need.
+        """
+        started = time.perf_counter()
+        if start_offset and str(csv_path).endswith(".parquet"):
+            raise ValueError("start_offset is not supported for Parquet files")
+        columns = self._read_header(csv_path)
+
+        if not self.staging:
+            if replace or before_insert or order_by:
+                raise ValueError("replace, order_by and before_insert need a staging table")
+            rows = self._copy(csv_path, table_name, columns, start_offset)
+            mode = "direct"
+        else:
+            staging_table = f"{table_name}__staging"
+            self._create_staging(staging_table, columns)
+            try:
+                self._copy(csv_path, staging_table, columns, start_offset)
+                if before_insert is not None:
+                    with self.engine.connect() as conn:
+                        before_insert(conn, staging_table)
+                        conn.commit()
+                rows, mode = self._insert_from_staging(staging_table, table_name, columns, replace, order_by)
+            finally:
+                self._execute(f'DROP TABLE IF EXISTS "{staging_table}"')
+
+        if "id" in columns:
+            self._sync_sequence(table_name)
+
+        seconds = time.perf_counter() - started
+        stats = {
+            "table": table_name,
+            "rows": rows,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(rows / seconds) if seconds > 0 else rows,
+            "mode": f"{mode} (tail)" if start_offset else mode,
+        }
+        logger.info(f"Bulk loaded {rows} rows into {table_name} in {seconds:.2f}s ({mode})")
+        return stats
+
+    # ----- steps -----
+
+    def _read_header(self, csv_path: str) -> List[str]:
+        if str(csv_path).endswith(".parquet"):
+            if not PYARROW_AVAILABLE:
+                raise ImportError("Loading Parquet files needs pyarrow: pip install pyarrow")
+            return pq.read_schema(csv_path, memory_map=True).names
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            return next(csv.reader(f))
+
+    def _create_staging(self, staging_table: str, columns: List[str]) -> None:
+        kind = "UNLOGGED TABLE" if self.unlogged else "TABLE"
+        column_defs = ", ".join(f'"{c}" TEXT' for c in columns)
+        self._execute(f'DROP TABLE IF EXISTS "{staging_table}"', f'CREATE {kind} "{staging_table}" ({column_defs})')
+
+    def _copy(self, csv_path: str, table_name: str, columns: List[str], start_offset: int = 0) -> int:
+        """Stream the file (from start_offset) into COPY FROM STDIN; returns the number of rows copied."""
+        column_list = ", ".join(f'"{c}"' for c in columns)
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            copy = f'COPY "{table_name}" ({column_list}) FROM STDIN WITH (FORMAT csv, HEADER true)'
+            if str(csv_path).endswith(".parquet"):
+                cursor.copy_expert(copy, _ParquetCsvReader(csv_path, columns))
+            else:
+                with open(csv_path, "rb") as f:
+                    source = _TailReader(f, start_offset) if start_offset else f
+                    cursor.copy_expert(copy, source)
+            rows = cursor.rowcount
+            raw.commit()
+            return rows
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    def _insert_from_staging(self, staging_table: str, table_name: str, columns: List[str],
+                             replace: bool, order_by: Optional[str]) -> tuple:
+        """Cast staging rows into the table (directly, or via a swapped shadow table)."""
+        types = self._column_types(table_name)
+        column_list = ", ".join(f'"{c}"' for c in columns)
+        select_list = ", ".join(self._cast(c, types.get(c, "text")) for c in columns)
+        order_clause = f' ORDER BY NULLIF("{order_by}", \'\')::{types[order_by]}' if order_by else ""
+        select = f'SELECT {select_list} FROM "{staging_table}"{order_clause}'
+
+        with self.engine.connect() as conn:
+            if not replace:
+                rows = conn.execute(text(f'INSERT INTO "{table_name}" ({column_list}) {select}')).rowcount
+                conn.commit()
+                return rows, "staged append"
+
+            referenced, partitioned = self._table_kind(conn, table_name)
+            if not referenced and not partitioned:
+                shadow = f"{table_name}__new"
+                conn.execute(text(f'DROP TABLE IF EXISTS "{shadow}"'))
+                conn.execute(text(f'CREATE TABLE "{shadow}" (LIKE "{table_name}" INCLUDING ALL)'))
+                rows = conn.execute(text(f'INSERT INTO "{shadow}" ({column_list}) {select}')).rowcount
+
+                # LIKE does not copy foreign keys; the id sequence stays shared
+                for name, definition in conn.execute(text("""
+                    SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+                    WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'
+                """), {"table": table_name}).fetchall():
+                    conn.execute(text(f'ALTER TABLE "{shadow}" ADD CONSTRAINT "{name}" {definition}'))
+                sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"),
+                                        {"table": table_name}).scalar() if "id" in types else None
+                renames = self._index_renames(conn, table_name, shadow)
+                conn.commit()
+
+                # The swap itself only takes the lock for a few renames
+                conn.execute(text(f'ALTER TABLE "{table_name}" RENAME TO "{table_name}__old"'))
+                conn.execute(text(f'ALTER TABLE "{shadow}" RENAME TO "{table_name}"'))
+                if sequence:
+                    conn.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY "{table_name}"."id"'))
+                conn.execute(text(f'DROP TABLE "{table_name}__old"'))
+                # LIKE names the copied indexes after the shadow table: give back the original names
+                for copied, original, is_constraint in renames:
+                    if is_constraint:
+                        conn.execute(text(f'ALTER TABLE "{table_name}" RENAME CONSTRAINT "{copied}" TO "{original}"'))
+                    else:
+                        conn.execute(text(f'ALTER INDEX "{copied}" RENAME TO "{original}"'))
+                conn.commit()
+                return rows, "staged swap"
+
+            if referenced and "id" in columns:
+                # Referenced rows must keep existing: update in place, then drop the vanished ids
+                updates = ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in columns if c != "id")
+                rows = conn.execute(text(
+                    f'INSERT INTO "{table_name}" ({column_list}) {select} '
+                    f'ON CONFLICT (id) DO UPDATE SET {updates}'
+                )).rowcount
+                conn.execute(text(
+                    f'DELETE FROM "{table_name}" t WHERE NOT EXISTS ('
+                    f'SELECT 1 FROM "{staging_table}" s WHERE NULLIF(s."id", \'\')::numeric = t.id)'
+                ))
+                conn.commit()
+                return rows, "staged merge"
+
+            conn.execute(text(f'TRUNCATE "{table_name}"'))
+            rows = conn.execute(text(f'INSERT INTO "{table_name}" ({column_list}) {select}')).rowcount
+            conn.commit()
+            return rows, "staged replace"
+
+    def _index_renames(self, conn, table_name: str, shadow: str) -> List[tuple]:
+        """(shadow name, original name, is constraint) for each index LIKE copied under a generated name.
+
+        Indexes are paired on their definition after USING (method, columns,
+        predicate) plus uniqueness, in order when several definitions repeat.
+        """
+        query = text("""
+            SELECT COALESCE(con.conname, c.relname),
+                   i.indisunique, substring(pg_get_indexdef(i.indexrelid) from ' USING .*$'),
+                   con.conname IS NOT NULL
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            LEFT JOIN pg_constraint con ON con.conindid = i.indexrelid AND con.conrelid = i.indrelid
+            WHERE i.indrelid = CAST(:table AS regclass)
+            ORDER BY i.indexrelid
+        """)
+        originals: Dict[tuple, List[str]] = {}
+        for name, unique, definition, _ in conn.execute(query, {"table": table_name}):
+            originals.setdefault((unique, definition), []).append(name)
+
+        renames = []
+        for name, unique, definition, is_constraint in conn.execute(query, {"table": shadow}):
+            candidates = originals.get((unique, definition))
+            if candidates:
+                original = candidates.pop(0)
+                if original != name:
+                    renames.append((name, original, is_constraint))
+        return renames
+
+    def _cast(self, column: str, column_type: str) -> str:
+        value = f"NULLIF(\"{column}\", '')"
+        if column_type in _INTEGER_TYPES:
+            return f"{value}::numeric::{column_type}"
+        return f"{value}::{column_type}"
+
+    def _column_types(self, table_name: str) -> Dict[str, str]:
+        with self.engine.connect() as conn:
+            return {
+                row[0]: row[1] for row in conn.execute(text("""
+                    SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+                    FROM pg_attribute a
+                    WHERE a.attrelid = CAST(:table AS regclass) AND a.attnum > 0 AND NOT a.attisdropped
+                """), {"table": table_name})
+            }
+
+    def _table_kind(self, conn, table_name: str) -> tuple:
+        """(referenced by foreign keys, partitioned): either rules out the rename swap."""
+        return tuple(conn.execute(text("""
+            SELECT EXISTS (
+                SELECT 1 FROM pg_constraint
+                WHERE confrelid = CAST(:table AS regclass) AND contype = 'f'
+            ), EXISTS (
+                SELECT 1 FROM pg_class
+                WHERE oid = CAST(:table AS regclass) AND relkind = 'p'
+            )
+        """), {"table": table_name}).one())
+
+    def _sync_sequence(self, table_name: str) -> None:
+        """Move the id sequence past the loaded ids so later inserts do not collide."""
+        with self.engine.connect() as conn:
+            sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"),
+                                    {"table": table_name}).scalar()
+            if sequence:
+                conn.execute(text(
+                    f'SELECT setval(:sequence, COALESCE((SELECT MAX(id) FROM "{table_name}"), 0) + 1, false)'
+                ), {"sequence": sequence})
+                conn.commit()
+
+    def _execute(self, *statements: str) -> None:
+        with self.engine.connect() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.commit()
+
+
+class _TailReader:
+    """File-like view of a CSV: its header line, then the bytes after an offset."""
+
+    def __init__(self, f, offset: int):
+        self._header = f.readline()
+        self._file = f
+        self._file.seek(offset)
+
+    def read(self, size: int = -1) -> bytes:
+        if self._header:
+            chunk, self._header = self._header, b""
+            return chunk
+        return self._file.read(size)
+
+    def readline(self, size: int = -1) -> bytes:
+        if self._header:
+            chunk, self._header = self._header, b""
+            return chunk
+        return self._file.readline(size)
+
+
+class _ParquetCsvReader:
+    """File-like CSV view of a memory-mapped Parquet file, encoded one record batch at a time."""
+
+    def __init__(self, parquet_path: str, columns: List[str], batch_rows: int = 65536):
+        parquet_file = pq.ParquetFile(parquet_path, memory_map=True)
+        self._batches = parquet_file.iter_batches(batch_size=batch_rows, columns=columns)
+        self._buffer = self._encode(parquet_file.schema_arrow.empty_table().select(columns), header=True)
+
+    @staticmethod
+    def _encode(data, header: bool = False) -> bytes:
+        out = io.BytesIO()
+        pa_csv.write_csv(data, out, pa_csv.WriteOptions(include_header=header))
+        return out.getvalue()
+
+    def _fill(self, size: int) -> None:
+        while size < 0 or len(self._buffer) < size:
+            batch = next(self._batches, None)
+            if batch is None:
+                return
+            self._buffer += self._encode(batch)
+
+    def read(self, size: int = -1) -> bytes:
+        self._fill(size)
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readline(self, size: int = -1) -> bytes:
+        self._fill(1)
+        end = self._buffer.find(b"\n") + 1 or len(self._buffer)
+        chunk, self._buffer = self._buffer[:end], self._buffer[end:]
+        return chunk
@@ -2,8 +2,10 @@
 import os
 import sys
 import platform
+import time
 import logging
-from typing import Dict, Any, List, Optional
+import weakref
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from sqlalchemy import create_engine, text, inspect
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import OperationalError
@@ -11,12 +13,23 @@ from rich.console import Console
 from dotenv import load_dotenv
 import pandas as pd
 
+from .slow_query_log import slow_query_log
+
 # Load .env.local first (for host development), then .env (for Docker)
 if os.path.exists('.env.local'):
     load_dotenv('.env.local')
 else:
     load_dotenv()
 
+# The async execution path is optional: it needs SQLAlchemy's asyncio extension and asyncpg
+try:
+    import asyncio
+    import asyncpg  # noqa: F401
+    from sqlalchemy.ext.asyncio import create_async_engine
+    ASYNC_AVAILABLE = True
+except ImportError:
+    ASYNC_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 class DatabaseConnection:
@@ -35,10 +48,24 @@ class DatabaseConnection:
             f"{self.config['host']}:{self.config['port']}/{self.config['database']}"
         )
 
+        self.async_connection_string = (
+            f"postgresql+asyncpg://{self.config['user']}:{self.config['password']}@"
+            f"{self.config['host']}:{self.config['port']}/{self.config['database']}"
+        )
+        self.async_pool_size = int(os.getenv('DATABASE_ASYNC_POOL_SIZE', '10'))
+        self.async_max_overflow = int(os.getenv('DATABASE_ASYNC_MAX_OVERFLOW', '20'))
+        self.preview_pool_size = int(os.getenv('DATABASE_PREVIEW_POOL_SIZE', '2'))
+        self.preview_timeout_ms = int(os.getenv('QUERY_PREVIEW_TIMEOUT_MS', '3000'))
+
         # Create engine but don't test connection yet
         self.engine = create_engine(self.connection_string)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         self._is_connected = False
+        self._preview_engine = None
+
+        # asyncpg connections are bound to the event loop that opened them,
+        # so each running loop gets its own async engine (and pool)
+        self._async_engines = weakref.WeakKeyDictionary()
 
     def get_engine(self):
         """Get the SQLAlchemy engine, testing the connection first"""
@@ -108,41 +135,186 @@ class DatabaseConnection:
             self._is_connected = False
             return False
 
-    def execute_query_with_names(self, query: str) -> Dict[str, Any]:
-        """Execute query and return results with column names."""
+    def execute_query_with_names(self, query: str, params: Optional[Dict[str, Any]] = None,
+                                 cancel_token=None, engine=None) -> Dict[str, Any]:
+        """Execute query and return results with column names.
+
+        A cancel token is told the backend PID running the statement, so the
+        query can be cancelled from another thread. `engine` overrides the
+        default pool (e.g. the preview pool).
+        """
         if not self._is_connected:
             if not self.test_connection():
                 raise Exception("Database connection failed")
 
+        engine = engine or self.engine
         try:
             logger.info(f"Executing query: {query}")
+            started = time.perf_counter()
 
-            with self.engine.connect() as connection:
-                result = connection.execute(text(query))
+            with engine.connect() as connection:
+                if cancel_token is not None:
+                    cancel_token.attach(connection.execute(text("SELECT pg_backend_pid()")).scalar())
+                try:
+                    result = connection.execute(text(query), params or {})
+                finally:
+                    if cancel_token is not None:
+                        cancel_token.detach()
 
                 # Get column names
                 columns = list(result.keys()) if result.returns_rows else []
 
                 # Get data
                 rows = result.fetchall() if result.returns_rows else []
-                data = [list(row) for row in rows] if rows else []
-
-                # Get column types (simplified for PostgreSQL)
-                types = ['TEXT' for _ in columns] if columns else []
 
-            logger.info(f"Query executed successfully, returned {len(data)} rows")
+            duration_ms = (time.perf_counter() - started) * 1000
+            slow_query_log.observe(query, duration_ms, len(rows), params, engine=self.engine)
 
-            return {
-                "columns": columns,
-                "data": data,
-                "types": types,
-                "row_count": len(data)
-            }
+            return self._build_query_result(columns, rows)
 
         except Exception as e:
             logger.error(f"Query execution failed: {e}")
             raise
 
+    def iter_query_batches(self, query: str, params: Optional[Dict[str, Any]] = None,
+                           batch_rows: int = 5000) -> Iterator[Tuple[List[str], List[Any]]]:
+        """Stream a query's rows through a server-side cursor: (columns, rows) batch_rows at a time.
+
+        Only one batch is held in memory; a query that returns no row yields
+        one empty batch so the caller still gets the column names.
+        """
+        if not self._is_connected:
+            if not self.test_connection():
+                raise Exception("Database connection failed")
+
+        logger.info(f"Streaming query: {query}")
+        started = time.perf_counter()
+        rows = 0
+        with self.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, max_row_buffer=batch_rows).execute(
+                text(query), params or {}
+            )
+            columns = list(result.keys())
+            for batch in result.partitions(batch_rows):
+                rows += len(batch)
+                yield columns, batch
+            if not rows:
+                yield columns, []
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        slow_query_log.observe(query, duration_ms, rows, params, engine=self.engine)
+
+    def get_preview_engine(self):
+        """Small separate pool for speculative preview queries, with a short statement timeout."""
+        if self._preview_engine is None:
+            self._preview_engine = create_engine(
+                self.connection_string,
+                pool_size=self.preview_pool_size,
+                max_overflow=0,
+                pool_timeout=1,
+                connect_args={'options': f'-c statement_timeout={self.preview_timeout_ms}'}
+            )
+        return self._preview_engine
+
+    def cancel_backend(self, backend_pid: int) -> bool:
+        """Ask PostgreSQL to cancel the statement running on a backend."""
+        try:
+            with self.engine.connect() as connection:
+                cancelled = connection.execute(
+                    text("SELECT pg_cancel_backend(:pid)"), {"pid": backend_pid}
+                ).scalar()
+            logger.info(f"Cancel requested for backend {backend_pid}: {cancelled}")
+            return bool(cancelled)
+        except Exception as e:
+            logger.warning(f"Failed to cancel backend {backend_pid}: {e}")
+            return False
+
+    def _build_query_result(self, columns: List[str], rows: List[Any]) -> Dict[str, Any]:
+        """Shape fetched rows into the result dictionary shared by the sync and async paths."""
+        data = [list(row) for row in rows] if rows else []
+
+        # Get column types (simplified for PostgreSQL)
+        types = ['TEXT' for _ in columns] if columns else []
+
+        logger.info(f"Query executed successfully, returned {len(data)} rows")
+
+        return {
+            "columns": columns,
+            "data": data,
+            "types": types,
+            "row_count": len(data)
+        }
+
+    def get_async_engine(self):
+        """Get the async SQLAlchemy engine for the running event loop (created on first use)."""
+        if not ASYNC_AVAILABLE:
+            raise Exception(
+                "Async database execution requires asyncpg: "
+                "run `pip install asyncpg` or `poetry add asyncpg`"
+            )
+
+        loop = asyncio.get_running_loop()
+        engine = self._async_engines.get(loop)
+        if engine is None:
+            engine = create_async_engine(
+                self.async_connection_string,
+                pool_size=self.async_pool_size,
+                max_overflow=self.async_max_overflow,
+                pool_pre_ping=True
+            )
+            self._async_engines[loop] = engine
+            logger.info(f"Created async engine (pool_size={self.async_pool_size}, "
+                        f"max_overflow={self.async_max_overflow})")
+        return engine
+
+    async def test_connection_async(self) -> bool:
+        """Test the database connection through the async engine."""
+        try:
+            async with self.get_async_engine().connect() as connection:
+                await connection.execute(text("SELECT 1"))
+            return True
+        except Exception as e:
+            logger.error(f"Async connection test failed: {e}")
+            return False
+
+    async def execute_query_with_names_async(self, query: str,
+                                             params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Execute query on the async engine and return results with column names.
+
+        Same result shape as execute_query_with_names, but the calling event loop
+        stays free while PostgreSQL works, so database time can overlap with LLM
+        calls and with other sessions served by the same process.
+        """
+        try:
+            logger.info(f"Executing query (async): {query}")
+            started = time.perf_counter()
+
+            async with self.get_async_engine().connect() as connection:
+                result = await connection.execute(text(query), params or {})
+
+                columns = list(result.keys()) if result.returns_rows else []
+                rows = result.fetchall() if result.returns_rows else []
+
+            # Recording and plan capture run in the log's own worker thread, off the event loop
+            duration_ms = (time.perf_counter() - started) * 1000
+            slow_query_log.observe_in_background(query, duration_ms, len(rows), params, engine=self.engine)
+
+            return self._build_query_result(columns, rows)
+
+        except Exception as e:
+            logger.error(f"Async query execution failed: {e}")
+            raise
+
+    async def disconnect_async(self) -> None:
+        """Dispose the async engine bound to the running event loop."""
+        if not ASYNC_AVAILABLE:
+            return
+
+        engine = self._async_engines.pop(asyncio.get_running_loop(), None)
+        if engine is not None:
+            await engine.dispose()
+            logger.info("Async database engine disposed")
+
     def list_tables(self) -> List[str]:
         """List all tables in the database."""
         try:
@@ -152,10 +324,16 @@ class DatabaseConnection:
 
             with self.engine.connect() as connection:
                 # Query to get all table names from public schema
+                # (monthly partitions of partitioned tables are hidden behind their parent)
                 result = connection.execute(text("""
                     SELECT table_name 
                     FROM information_schema.tables 
                     WHERE table_schema = 'public'
+                      AND table_name NOT IN (
+                          SELECT c.relname
+                          FROM pg_inherits i
+                          JOIN pg_class c ON c.oid = i.inhrelid
+                      )
                     ORDER BY table_name
                 """))
 
@@ -0,0 +1,314 @@
+# src/database/index_advisor.py
+"""
+Workload-driven index advisor.
+
+Reads the most expensive fingerprints from the workload log, extracts the
+filtered and joined columns of each sample statement, and proposes single and
+two-column B-tree indexes that are not already covered by an existing index.
+
+The benefit of each candidate is estimated with hypothetical indexes
+(the `hypopg` extension) when it is installed: every affected statement is
+EXPLAINed with and without the hypothetical index, and the planner cost
+reduction is applied to the time the workload actually spent on it. Without
+hypopg the advisor falls back to a heuristic based on the column statistics
+in `pg_stats`.
+"""
+
+import re
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Set, Tuple
+from sqlalchemy import text
+
+from .workload import WorkloadLog, workload_log as default_workload_log
+
+logger = logging.getLogger(__name__)
+
+_SQL_KEYWORDS = {
+    "where", "join", "inner", "left", "right", "full", "cross", "on", "group", "order",
+    "limit", "having", "union", "as", "natural", "using", "lateral", "offset"
+}
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+(?:public\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_COMPARISON = re.compile(
+    r"(?<![\w.'])(?:(\w+)\.)?(\w+)\s*(=|<>|!=|>=|<=|>|<)\s*((?:\w+\.)?\w+|'(?:[^']|'')*'|-?\d+(?:\.\d+)?)",
+    re.IGNORECASE
+)
+_MEMBERSHIP = re.compile(
+    r"(?<![\w.'])(?:(\w+)\.)?(\w+)\s+(?:NOT\s+)?(IN\s*\(|BETWEEN\b|LIKE\s+'[^%_']|IS\s+(?:NOT\s+)?NULL)",
+    re.IGNORECASE
+)
+_RANGE_OPERATORS = {">", "<", ">=", "<=", "BETWEEN"}
+
+
+class IndexAdvisor:
+    """Proposes, evaluates and optionally applies indexes for the logged workload."""
+
+    def __init__(self, db_connection, workload: Optional[WorkloadLog] = None):
+        self.db_connection = db_connection
+        self.workload = workload or default_workload_log
+
+    @property
+    def engine(self):
+        return self.db_connection.engine
+
+    # ----- workload analysis -----
+
+    def analyze_query(self, sql: str, table_columns: Dict[str, Set[str]]) -> Dict[str, Any]:
+        """Extract filtered columns (equality / range) and join keys of a statement."""
+        aliases = {}
+        from_tables = []
+        for table, alias in _TABLE_REF.findall(sql):
+            table = table.lower()
+            if table not in table_columns:
+                continue
+            from_tables.append(table)
+            aliases[table] = table
+            if alias and alias.lower() not in _SQL_KEYWORDS:
+                aliases[alias.lower()] = table
+
+        def resolve(qualifier: Optional[str], column: str) -> Optional[Tuple[str, str]]:
+            column = column.lower()
+            if qualifier:
+                table = aliases.get(qualifier.lower())
+                return (table, column) if table and column in table_columns[table] else None
+            for table in from_tables:
+                if column in table_columns[table]:
+                    return table, column
+            return None
+
+        equality, ranges, joins = set(), set(), set()
+        for qualifier, column, operator, right in _COMPARISON.findall(sql):
+            left_ref = resolve(qualifier, column)
+            if not left_ref:
+                continue
+            right_match = re.fullmatch(r"(?:(\w+)\.)?(\w+)", right)
+            right_ref = resolve(*right_match.groups()) if right_match and not right.isdigit() else None
+            if right_ref and right_ref[0] != left_ref[0]:
+                joins.add(left_ref)
+                joins.add(right_ref)
+            elif operator.upper() in _RANGE_OPERATORS:
+                ranges.add(left_ref)
+            elif operator == "=":
+                equality.add(left_ref)
+
+        for qualifier, column, operator in _MEMBERSHIP.findall(sql):
+            ref = resolve(qualifier, column)
+            if not ref:
+                continue
+            if operator.upper().startswith("BETWEEN") or operator.upper().startswith("LIKE"):
+                ranges.add(ref)
+            else:
+                equality.add(ref)
+
+        return {"equality": equality, "ranges": ranges, "joins": joins}
+
+    def propose(self, top: int = 50, min_calls: int = 1) -> List[Dict[str, Any]]:
+        """Candidate indexes for the most expensive fingerprints, best first."""
+        workload = self.workload.top(limit=top, min_calls=min_calls)
+        if not workload:
+            return []
+
+        with self.engine.connect() as conn:
+            table_columns = self._get_table_columns(conn)
+            existing = self._get_existing_indexes(conn)
+            n_distinct = self._get_n_distinct(conn)
+
+            candidates: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]] = {}
+
+            def add(table: str, columns: Tuple[str, ...], kind: str, entry: Dict[str, Any]):
+                if self._is_covered(existing.get(table, []), columns):
+                    return
+                candidate = candidates.setdefault((table, columns), {
+                    "table": table,
+                    "columns": list(columns),
+                    "kinds": set(),
+                    "queries": [],
+                })
+                candidate["kinds"].add(kind)
+                candidate["queries"].append(entry)
+
+            for entry in workload:
+                analysis = self.analyze_query(entry["sample_sql"], table_columns)
+                for table, column in analysis["equality"]:
+                    add(table, (column,), "equality", entry)
+                for table, column in analysis["ranges"]:
+                    add(table, (column,), "range", entry)
+                for table, column in analysis["joins"]:
+                    add(table, (column,), "join", entry)
+                # Equality column first, then the range column of the same table
+                for eq_table, eq_column in analysis["equality"]:
+                    for range_table, range_column in analysis["ranges"]:
+                        if eq_table == range_table and eq_column != range_column:
+                            add(eq_table, (eq_column, range_column), "composite", entry)
+
+            if self._hypopg_available(conn):
+                for candidate in candidates.values():
+                    self._estimate_with_hypopg(conn, candidate)
+            else:
+                for candidate in candidates.values():
+                    self._estimate_heuristically(candidate, n_distinct)
+
+            partitioned_tables = self._get_partitioned_tables(conn)
+
+        results = []
+        for candidate in candidates.values():
+            candidate["kinds"] = sorted(candidate["kinds"])
+            candidate["query_count"] = len(candidate["queries"])
+            candidate["calls"] = sum(q["calls"] for q in candidate["queries"])
+            candidate["fingerprints"] = [q["fingerprint"] for q in candidate["queries"]]
+            del candidate["queries"]
+            candidate["index_name"] = self._index_name(candidate["table"], candidate["columns"])
+            candidate["ddl"] = self._index_ddl(candidate, concurrently=candidate["table"] not in partitioned_tables)
+            if candidate["estimated_ms_saved"] > 0:
+                results.append(candidate)
+
+        results.sort(key=lambda c: c["estimated_ms_saved"], reverse=True)
+        return results
+
+    # ----- benefit estimation -----
+
+    def _estimate_with_hypopg(self, conn, candidate: Dict[str, Any]) -> None:
+        """Planner cost with and without a hypothetical index, weighted by observed time."""
+        columns = ", ".join(candidate["columns"])
+        saved_ms, base_total, new_total = 0.0, 0.0, 0.0
+        try:
+            base_costs = [self._plan_cost(conn, q["sample_sql"]) for q in candidate["queries"]]
+            conn.execute(text("SELECT * FROM hypopg_create_index(:ddl)"),
+                         {"ddl": f"CREATE INDEX ON {candidate['table']} ({columns})"})
+            new_costs = [self._plan_cost(conn, q["sample_sql"]) for q in candidate["queries"]]
+        except Exception as e:
+            logger.warning(f"Hypothetical index evaluation failed for {candidate['table']}({columns}): {e}")
+            conn.rollback()
+            candidate.update({"method": "hypopg", "estimated_ms_saved": 0.0, "cost_reduction": 0.0})
+            return
+        finally:
+            try:
+                conn.execute(text("SELECT hypopg_reset()"))
+            except Exception:
+                pass
+
+        for query, base, new in zip(candidate["queries"], base_costs, new_costs):
+            if base and new is not None and new < base:
+                saved_ms += query["total_ms"] * (1 - new / base)
+            base_total += base or 0
+            new_total += new or 0
+
+        candidate.update({
+            "method": "hypopg",
+            "estimated_ms_saved": round(saved_ms, 1),
+            "cost_reduction": round(1 - new_total / base_total, 3) if base_total else 0.0,
+        })
+
+    def _estimate_heuristically(self, candidate: Dict[str, Any], n_distinct: Dict[Tuple[str, str], float]) -> None:
+        """Selectivity-weighted share of the workload time, without planner input."""
+        leading = (candidate["table"], candidate["columns"][0])
+        distinct = n_distinct.get(leading, 0)
+        # Negative n_distinct is a fraction of the row count: the column is close to unique
+        selectivity_gain = 0.95 if distinct < 0 else (1 - 1 / distinct if distinct > 1 else 0.0)
+        if "composite" in candidate["kinds"]:
+            selectivity_gain = max(selectivity_gain, 0.9)
+        elif "join" in candidate["kinds"]:
+            selectivity_gain = max(selectivity_gain, 0.8)
+        elif candidate["kinds"] == {"range"}:
+            selectivity_gain = 0.5
+
+        workload_ms = sum(q["total_ms"] for q in candidate["queries"])
+        candidate.update({
+            "method": "heuristic",
+            "estimated_ms_saved": round(workload_ms * selectivity_gain * 0.5, 1),
+            "cost_reduction": None,
+        })
+
+    def _plan_cost(self, conn, sql: str) -> Optional[float]:
+        try:
+            plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql.rstrip(';')}")).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return float(plan[0]["Plan"]["Total Cost"])
+        except Exception as e:
+            logger.debug(f"EXPLAIN failed for workload sample: {e}")
+            conn.rollback()
+            return None
+
+    # ----- applying -----
+
+    def apply(self, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create the given candidate indexes, then ANALYZE the affected tables."""
+        applied = []
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for candidate in candidates:
+                try:
+                    conn.execute(text(candidate["ddl"]))
+                    applied.append({"index_name": candidate["index_name"], "success": True})
+                    logger.info(f"Created index {candidate['index_name']}")
+                except Exception as e:
+                    applied.append({"index_name": candidate["index_name"], "success": False, "error": str(e)})
+                    logger.error(f"Failed to create index {candidate['index_name']}: {e}")
+
+            for table in sorted({c["table"] for c in candidates}):
+                conn.execute(text(f"ANALYZE {table}"))
+        return applied
+
+    # ----- catalog helpers -----
+
+    def _get_table_columns(self, conn) -> Dict[str, Set[str]]:
+        rows = conn.execute(text("""
+            SELECT table_name, column_name
+            FROM information_schema.columns
+            WHERE table_schema = 'public'
+        """)).fetchall()
+        columns = defaultdict(set)
+        for table, column in rows:
+            columns[table].add(column)
+        return dict(columns)
+
+    def _get_existing_indexes(self, conn) -> Dict[str, List[List[str]]]:
+        rows = conn.execute(text("""
+            SELECT t.relname, i.relname, array_agg(a.attname ORDER BY k.ord)
+            FROM pg_index x
+            JOIN pg_class t ON t.oid = x.indrelid
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            JOIN LATERAL unnest(x.indkey) WITH ORDINALITY AS k(attnum, ord) ON TRUE
+            JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+            WHERE n.nspname = 'public'
+            GROUP BY t.relname, i.relname
+        """)).fetchall()
+        indexes = defaultdict(list)
+        for table, _index, columns in rows:
+            indexes[table].append(list(columns))
+        return dict(indexes)
+
+    def _get_n_distinct(self, conn) -> Dict[Tuple[str, str], float]:
+        rows = conn.execute(text("""
+            SELECT tablename, attname, n_distinct
+            FROM pg_stats
+            WHERE schemaname = 'public'
+        """)).fetchall()
+        return {(table, column): float(value) for table, column, value in rows}
+
+    def _get_partitioned_tables(self, conn) -> Set[str]:
+        rows = conn.execute(text("SELECT relname FROM pg_class WHERE relkind = 'p'")).fetchall()
+        return {row[0] for row in rows}
+
+    def _hypopg_available(self, conn) -> bool:
+        try:
+            return conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'hypopg'")).scalar() == 1
+        except Exception:
+            conn.rollback()
+            return False
+
+    def _is_covered(self, table_indexes: List[List[str]], columns: Tuple[str, ...]) -> bool:
+        """An existing index whose leading columns match the candidate already serves it."""
+        return any(index[:len(columns)] == list(columns) for index in table_indexes)
+
+    def _index_name(self, table: str, columns: List[str]) -> str:
+        return f"idx_auto_{table}_{'_'.join(columns)}"[:63]
+
+    def _index_ddl(self, candidate: Dict[str, Any], concurrently: bool = True) -> str:
+        mode = "CONCURRENTLY " if concurrently else ""
+        columns = ", ".join(candidate["columns"])
+        return (f"CREATE INDEX {mode}IF NOT EXISTS {candidate['index_name']} "
+                f"ON {candidate['table']} ({columns})")
@@ -0,0 +1,135 @@
+# src/database/ingest_manifest.py
+"""
+Manifest of the loaded CSV files, for incremental ingestion.
+
+For every table, `ingestion.manifest` records the file it was loaded from:
+size, SHA-256 and row count. It lives outside `public`, like the rollups, so
+the schema tools never show it to the LLM. On the next refresh each file is
+scanned once and classified:
+
+- skip   : same size and hash, nothing to do;
+- append : the file grew and its first `size` bytes still hash to the recorded
+           value, so only the tail is loaded (the daily France Services
+           exports only append rows);
+- reload : anything else, and the whole table is replaced (always the case
+           for a changed Parquet file, whose footer is rewritten, and for a
+           table now loaded from a different file).
+
+Only the tables that were appended or reloaded are reported as changed, so
+only their rollups and statistics are refreshed.
+"""
+
+import os
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_SCHEMA = "ingestion"
+MANIFEST_TABLE = f"{MANIFEST_SCHEMA}.manifest"
+_CHUNK_SIZE = 1024 * 1024
+
+
+def scan_file(file_path: str, prefix_size: Optional[int] = None) -> Dict[str, Any]:
+    """Size and SHA-256 of a file, plus the hash of its first prefix_size bytes (one read)."""
+    size = os.path.getsize(file_path)
+    digest = hashlib.sha256()
+    prefix_digest = None
+    prefix_ends_line = False
+    read = 0
+
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            if prefix_size is not None and read < prefix_size <= read + len(chunk):
+                cut = prefix_size - read
+                prefix = digest.copy()
+                prefix.update(chunk[:cut])
+                prefix_digest = prefix.hexdigest()
+                prefix_ends_line = chunk[cut - 1:cut] == b"\n"
+            digest.update(chunk)
+            read += len(chunk)
+
+    return {
+        "size": size,
+        "sha256": digest.hexdigest(),
+        "prefix_sha256": prefix_digest,
+        "prefix_ends_line": prefix_ends_line,
+    }
+
+
+class IngestionManifest:
+    """Per-table record of the last loaded file, stored next to the data."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def ensure_table(self) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {MANIFEST_SCHEMA}"))
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+                    table_name  VARCHAR(100) PRIMARY KEY,
+                    file_path   TEXT NOT NULL,
+                    size_bytes  BIGINT NOT NULL,
+                    sha256      CHAR(64) NOT NULL,
+                    row_count   BIGINT NOT NULL,
+                    loaded_at   TIMESTAMP NOT NULL DEFAULT NOW()
+                )
+            """))
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        self.ensure_table()
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(
+                f"SELECT table_name, file_path, size_bytes, sha256, row_count, loaded_at FROM {MANIFEST_TABLE}"
+            )).mappings().all()
+        return {row["table_name"]: dict(row) for row in rows}
+
+    def plan(self, table_name: str, file_path: str,
+             entry: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Decide how to bring a table up to date with its file: skip, append or reload."""
+        previous_size = entry["size_bytes"] if entry else None
+        scan = scan_file(file_path, prefix_size=previous_size)
+
+        if entry is None or entry["file_path"] != file_path:
+            # Never loaded, or loaded from another file: its prefix proves nothing
+            action = "reload"
+        elif scan["size"] == previous_size and scan["sha256"] == entry["sha256"]:
+            action = "skip"
+        elif (scan["size"] > previous_size and scan["prefix_sha256"] == entry["sha256"]
+              and scan["prefix_ends_line"] and not file_path.endswith(".parquet")):
+            action = "append"
+        else:
+            action = "reload"
+
+        return {
+            "table": table_name,
+            "action": action,
+            "offset": previous_size if action == "append" else 0,
+            "previous_rows": entry["row_count"] if entry else 0,
+            "scan": scan,
+        }
+
+    def record(self, table_name: str, file_path: str, scan: Dict[str, Any], row_count: int) -> None:
+        self.ensure_table()
+        with self.engine.begin() as conn:
+            conn.execute(text(f"""
+                INSERT INTO {MANIFEST_TABLE} (table_name, file_path, size_bytes, sha256, row_count, loaded_at)
+                VALUES (:table_name, :file_path, :size, :sha256, :row_count, NOW())
+                ON CONFLICT (table_name) DO UPDATE SET
+                    file_path = EXCLUDED.file_path, size_bytes = EXCLUDED.size_bytes,
+                    sha256 = EXCLUDED.sha256, row_count = EXCLUDED.row_count, loaded_at = NOW()
+            """), {"table_name": table_name, "file_path": file_path, "size": scan["size"],
+                   "sha256": scan["sha256"], "row_count": row_count})
+        logger.info(f"Manifest updated for {table_name} ({row_count} rows)")
+
+    def clear(self) -> None:
+        self.ensure_table()
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {MANIFEST_TABLE}"))
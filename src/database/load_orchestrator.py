@@ -0,0 +1,229 @@
+# src/database/load_orchestrator.py
+"""
+Parallel loading of the CSV tables with deferred keys and indexes.
+
+The orchestrator runs after `DatabaseLoader.create_tables`:
+
+1. It reads the primary, unique and foreign keys from the catalog and drops
+   them, so rows land in bare heaps with no index maintenance and no per-row
+   FK checks.
+2. It builds the dependency graph from the foreign keys and loads the tables
+   in worker processes (one COPY per table, see bulk_load.py). A table is
+   submitted as soon as every table it references has loaded, so independent
+   tables load concurrently. If a table fails, the tables depending on it are
+   skipped.
+3. It rebuilds the keys and indexes in parallel sessions with a large
+   `maintenance_work_mem`:
+   - primary and unique keys;
+   - foreign keys, added NOT VALID and then validated (validation only takes
+     a SHARE UPDATE EXCLUSIVE lock, so it runs concurrently);
+   - the secondary indexes.
+4. It runs ANALYZE on every table.
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, List, Set
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+LOAD_WORKERS = int(os.getenv("LOAD_WORKERS", str(os.cpu_count() or 1)))
+MAINTENANCE_WORK_MEM = os.getenv("LOAD_MAINTENANCE_WORK_MEM", "512MB")
+MAX_PARALLEL_MAINTENANCE_WORKERS = int(os.getenv("LOAD_MAX_PARALLEL_MAINTENANCE_WORKERS", "2"))
+
+
+def _load_table_worker(file_path: str, table_name: str, partitioned: bool) -> Dict[str, Any]:
+    """Load one table in a worker process (engines cannot cross process boundaries)."""
+    from .loader import DatabaseLoader
+
+    loader = DatabaseLoader(partitioned=partitioned)
+    try:
+        return loader.load_table(file_path, table_name)
+    finally:
+        loader.engine.dispose()
+
+
+class LoadOrchestrator:
+    """Loads the tables of a DatabaseLoader concurrently, then rebuilds keys and indexes."""
+
+    def __init__(self, loader, workers: int = None):
+        self.loader = loader
+        self.console = loader.console
+        self.engine = loader.engine
+        self.workers = workers or LOAD_WORKERS
+        self.timings: Dict[str, float] = {}
+
+    def run(self) -> List[Dict[str, Any]]:
+        from .loader import FILES_TO_LOAD, source_path
+
+        tables = [table for _, table in FILES_TO_LOAD]
+        files = {table: str(source_path(csv_file)) for csv_file, table in FILES_TO_LOAD}
+
+        constraints = self._phase("contraintes", self._drop_constraints, tables)
+        restored = False
+        try:
+            dependencies = self._dependency_graph(tables, constraints)
+            stats = self._phase("chargement", self._load_tables, files, dependencies)
+
+            self._phase("clés", self._parallel, [c["add"] for c in constraints if c["type"] in ("p", "u")])
+            self._phase("clés étrangères", self._restore_foreign_keys,
+                        [c for c in constraints if c["type"] == "f"])
+            restored = True
+        finally:
+            if not restored:
+                # Never leave the schema without its keys
+                self._restore_missing_constraints(constraints)
+        loaded = [entry["table"] for entry in stats]
+
+        self._phase("index", self._parallel, self.loader.index_statements())
+        self._phase("ANALYZE", self._parallel, [f'ANALYZE "{table}"' for table in loaded])
+
+        self.loader._print_load_summary(stats)
+        self.console.print("⏱️  " + " · ".join(f"{name} {seconds:.1f}s" for name, seconds in self.timings.items()))
+        return stats
+
+    def _phase(self, name: str, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        self.timings[name] = time.perf_counter() - started
+        return result
+
+    # ----- constraints -----
+
+    def _drop_constraints(self, tables: List[str]) -> List[Dict[str, str]]:
+        """Drop primary, unique and foreign keys, returning what is needed to restore them."""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT c.conrelid::regclass::text, c.conname, c.contype,
+                       c.confrelid::regclass::text, pg_get_constraintdef(c.oid)
+                FROM pg_constraint c
+                WHERE c.contype IN ('p', 'u', 'f')
+                  AND c.conrelid::regclass::text = ANY(:tables)
+                  AND c.conparentid = 0
+            """), {"tables": tables}).fetchall()
+
+            constraints = [{
+                "table": table,
+                "name": name,
+                "type": contype,
+                "references": referenced if contype == "f" else None,
+                "add": f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}',
+            } for table, name, contype, referenced, definition in rows]
+
+            # Foreign keys first: they depend on the referenced primary keys
+            for constraint in sorted(constraints, key=lambda c: c["type"] != "f"):
+                conn.execute(text(
+                    f'ALTER TABLE "{constraint["table"]}" DROP CONSTRAINT "{constraint["name"]}"'
+                ))
+            conn.commit()
+
+        self.console.print(f"🔓 {len(constraints)} contraintes différées jusqu'à la fin du chargement")
+        return constraints
+
+    def _restore_foreign_keys(self, foreign_keys: List[Dict[str, str]]) -> None:
+        # NOT VALID is instant; the validations then scan the tables in parallel
+        with self.engine.connect() as conn:
+            for fk in foreign_keys:
+                conn.execute(text(f'{fk["add"]} NOT VALID'))
+            conn.commit()
+        self._parallel([f'ALTER TABLE "{fk["table"]}" VALIDATE CONSTRAINT "{fk["name"]}"'
+                        for fk in foreign_keys])
+
+    def _restore_missing_constraints(self, constraints: List[Dict[str, str]]) -> None:
+        """After a failed load: add back every dropped constraint still missing, one by one.
+
+        Foreign keys are added NOT VALID (enforced for new rows, existing rows
+        unchecked) so that a partially loaded table does not block them.
+        """
+        self.console.print("⚠️  Chargement interrompu : restauration des contraintes supprimées...")
+        with self.engine.connect() as conn:
+            existing = {(table, name) for table, name in conn.execute(text("""
+                SELECT conrelid::regclass::text, conname FROM pg_constraint
+                WHERE conrelid::regclass::text = ANY(:tables)
+            """), {"tables": sorted({c["table"] for c in constraints})}).fetchall()}
+
+        missing = [c for c in constraints if (c["table"], c["name"]) not in existing]
+        # Primary and unique keys first: foreign keys depend on them
+        for constraint in sorted(missing, key=lambda c: c["type"] == "f"):
+            statement = constraint["add"] + (" NOT VALID" if constraint["type"] == "f" else "")
+            try:
+                with self.engine.connect() as conn:
+                    conn.execute(text(statement))
+                    conn.commit()
+            except Exception as e:
+                self.console.print(f"❌ Impossible de restaurer {constraint['name']} sur {constraint['table']}: {e}")
+
+    # ----- loading -----
+
+    def _dependency_graph(self, tables: List[str], constraints: List[Dict[str, str]]) -> Dict[str, Set[str]]:
+        """table -> tables it references through foreign keys."""
+        dependencies = {table: set() for table in tables}
+        for constraint in constraints:
+            if constraint["type"] == "f" and constraint["references"] in dependencies \
+                    and constraint["references"] != constraint["table"]:
+                dependencies[constraint["table"]].add(constraint["references"])
+        return dependencies
+
+    def _load_tables(self, files: Dict[str, str], dependencies: Dict[str, Set[str]]) -> List[Dict[str, Any]]:
+        """Load every table in worker processes, each once its referenced tables are loaded."""
+        self.console.print(f"🚚 Chargement parallèle ({self.workers} processus)...")
+        loaded: Set[str] = set()
+        failed: Set[str] = set()
+        running = {}
+        stats = []
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = dict(dependencies)
+            while pending or running:
+                for table, deps in list(pending.items()):
+                    if deps & failed:
+                        self.console.print(f"⏭️  {table} ignorée : dépend de {', '.join(sorted(deps & failed))}")
+                        failed.add(table)
+                        del pending[table]
+                    elif deps <= loaded:
+                        future = pool.submit(_load_table_worker, files[table], table, self.loader.partitioned)
+                        running[future] = table
+                        del pending[table]
+
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    table = running.pop(future)
+                    try:
+                        table_stats = future.result()
+                    except Exception as e:
+                        self.console.print(f"❌ Échec du chargement de {table}: {e}")
+                        failed.add(table)
+                        continue
+                    if table_stats is None:
+                        failed.add(table)
+                        continue
+                    loaded.add(table)
+                    stats.append(table_stats)
+                    # In the parent process: avoids concurrent creation of the rollup schema
+                    self.loader.rollup_manager.record_load(table)
+
+        return stats
+
+    # ----- parallel DDL -----
+
+    def _parallel(self, statements: List[str]) -> None:
+        """Run independent DDL statements concurrently, each in its own tuned session."""
+        if not statements:
+            return
+
+        def execute(statement: str) -> None:
+            with self.engine.connect() as conn:
+                conn.execute(text(f"SET maintenance_work_mem = '{MAINTENANCE_WORK_MEM}'"))
+                conn.execute(text(f"SET max_parallel_maintenance_workers = {MAX_PARALLEL_MAINTENANCE_WORKERS}"))
+                conn.execute(text(statement))
+                conn.commit()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for future in [pool.submit(execute, statement) for statement in statements]:
+                future.result()
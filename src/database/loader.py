@@ -1,23 +1,61 @@
 # src/database/loader.py
-import pandas as pd
+import os
 import sys
 from pathlib import Path
 from rich.console import Console
 from rich.progress import Progress
+from rich.table import Table
 
 # Try to import psycopg2, but handle the case where it's not installed
 try:
     import psycopg2
     from sqlalchemy import text
     from .connection import DatabaseConnection
+    from .rollups import RollupManager
+    from .bulk_load import CopyLoader
+    from .load_orchestrator import LoadOrchestrator
+    from .ingest_manifest import IngestionManifest
+    from .rollups import SOURCE_TABLES
+    from .partitioning import (
+        PARTITIONED_TABLES, partition_clauses, ensure_default_partition,
+        ensure_monthly_partitions, brin_index_statements
+    )
     PSYCOPG2_AVAILABLE = True
 except ImportError:
     PSYCOPG2_AVAILABLE = False
 
 
+# Fichiers CSV et tables cibles, dans l'ordre des clés étrangères
+CSV_DIRECTORY = Path("data/csv")
+FILES_TO_LOAD = [
+    ('maisons_france_services.csv', 'maisons_france_services'),
+    ('usagers.csv', 'usagers'),
+    ('conseillers.csv', 'conseillers'),
+    ('demandes.csv', 'demandes'),
+    ('plannings.csv', 'plannings'),
+    ('statistiques_mensuelles.csv', 'statistiques_mensuelles'),
+    ('temps_attente.csv', 'temps_attente'),
+    ('services_details.csv', 'services_details'),
+    ('incidents_techniques.csv', 'incidents_techniques')
+]
+
+
+def source_path(csv_file):
+    """Fichier à charger pour une table : le Parquet du même nom s'il existe, sinon le CSV"""
+    csv_path = CSV_DIRECTORY / csv_file
+    parquet_path = csv_path.with_suffix('.parquet')
+    return parquet_path if parquet_path.exists() else csv_path
+
+
 class DatabaseLoader:
-    def __init__(self):
+    def __init__(self, partitioned: bool = None, workers: int = None):
         self.console = Console()
+        # Mode partitionné : partitions mensuelles + index BRIN sur les tables de faits datées
+        if partitioned is None:
+            partitioned = os.getenv('DATABASE_PARTITIONED', 'false').lower() in ('1', 'true', 'yes')
+        self.partitioned = partitioned
+        # Nombre de processus de chargement (1 = chargement séquentiel historique)
+        self.workers = workers
         
         if not PSYCOPG2_AVAILABLE:
             self.console.print("[bold red]Error:[/bold red] psycopg2 module not found.")
@@ -31,6 +69,7 @@ class DatabaseLoader:
             
         self.db_connection = DatabaseConnection()
         self.engine = self.db_connection.get_engine()
+        self.rollup_manager = RollupManager(self.db_connection)
 
     def create_tables(self):
         """Créer les tables PostgreSQL (version enrichie)"""
@@ -81,10 +120,11 @@ class DatabaseLoader:
                               );
                               """))
 
-            conn.execute(text("""
+            pk, partition_by = partition_clauses('demandes', self.partitioned)
+            conn.execute(text(f"""
                               CREATE TABLE demandes
                               (
-                                  id                 SERIAL PRIMARY KEY,
+                                  id                 SERIAL,
                                   usager_id          INTEGER REFERENCES usagers (id),
                                   maison_fs_id       INTEGER REFERENCES maisons_france_services (id),
                                   date_demande       TIMESTAMP,
@@ -96,8 +136,9 @@ class DatabaseLoader:
                                   resolu             BOOLEAN DEFAULT FALSE,
                                   conseiller_id      INTEGER,
                                   complexite         VARCHAR(20),
-                                  suivi_necessaire   BOOLEAN DEFAULT FALSE
-                              );
+                                  suivi_necessaire   BOOLEAN DEFAULT FALSE,
+                                  {pk}
+                              ) {partition_by};
                               """))
 
             # Nouvelles tables
@@ -115,9 +156,10 @@ class DatabaseLoader:
                 );
             """))
 
-            conn.execute(text("""
+            pk, partition_by = partition_clauses('plannings', self.partitioned)
+            conn.execute(text(f"""
                 CREATE TABLE plannings (
-                    id SERIAL PRIMARY KEY,
+                    id SERIAL,
                     maison_fs_id INTEGER REFERENCES maisons_france_services(id),
                     date DATE,
                     jour_semaine VARCHAR(20),
@@ -125,8 +167,9 @@ class DatabaseLoader:
                     heure_fermeture DECIMAL(3,1),
                     nb_conseillers_prevus INTEGER,
                     nb_conseillers_presents INTEGER,
-                    fermeture_exceptionnelle BOOLEAN DEFAULT FALSE
-                );
+                    fermeture_exceptionnelle BOOLEAN DEFAULT FALSE,
+                    {pk}
+                ) {partition_by};
             """))
 
             conn.execute(text("""
@@ -159,10 +202,12 @@ class DatabaseLoader:
                 );
             """))
 
-            conn.execute(text("""
+            # demandes(id) n'est plus unique seul une fois partitionnée : pas de clé étrangère
+            demande_ref = "" if self.partitioned else "REFERENCES demandes(id)"
+            conn.execute(text(f"""
                 CREATE TABLE temps_attente (
                     id SERIAL PRIMARY KEY,
-                    demande_id INTEGER REFERENCES demandes(id),
+                    demande_id INTEGER {demande_ref},
                     temps_attente_minutes INTEGER,
                     heure_demande INTEGER,
                     jour_semaine VARCHAR(20),
@@ -171,91 +216,256 @@ class DatabaseLoader:
                 );
             """))
 
-            conn.execute(text("""
+            pk, partition_by = partition_clauses('incidents_techniques', self.partitioned)
+            conn.execute(text(f"""
                 CREATE TABLE incidents_techniques (
-                    id SERIAL PRIMARY KEY,
+                    id SERIAL,
                     maison_fs_id INTEGER REFERENCES maisons_france_services(id),
                     type_incident VARCHAR(50),
                     date_debut TIMESTAMP,
                     duree_minutes INTEGER,
                     impact_usagers INTEGER,
                     resolu BOOLEAN DEFAULT FALSE,
-                    gravite VARCHAR(20)
-                );
+                    gravite VARCHAR(20),
+                    {pk}
+                ) {partition_by};
             """))
 
+            if self.partitioned:
+                for table in PARTITIONED_TABLES:
+                    ensure_default_partition(conn, table)
+
             conn.commit()
 
-        self.console.print("✅ Tables créées avec succès")
+        mode = " (partitionnées par mois)" if self.partitioned else ""
+        self.console.print(f"✅ Tables créées avec succès{mode}")
 
     def load_csv_data(self):
         """Charger les données CSV dans PostgreSQL (version enrichie)"""
-        csv_dir = Path("data/csv")
-
-        files_to_load = [
-            ('maisons_france_services.csv', 'maisons_france_services'),
-            ('usagers.csv', 'usagers'),
-            ('conseillers.csv', 'conseillers'),
-            ('demandes.csv', 'demandes'),
-            ('plannings.csv', 'plannings'),
-            ('statistiques_mensuelles.csv', 'statistiques_mensuelles'),
-            ('temps_attente.csv', 'temps_attente'),
-            ('services_details.csv', 'services_details'),
-            ('incidents_techniques.csv', 'incidents_techniques')
-        ]
+        stats = []
 
         with Progress() as progress:
-            task = progress.add_task("[blue]Chargement des données...", total=len(files_to_load))
+            task = progress.add_task("[blue]Chargement des données...", total=len(FILES_TO_LOAD))
+
+            for csv_file, table_name in FILES_TO_LOAD:
+                table_stats = self.load_table(source_path(csv_file), table_name)
+                if table_stats is not None:
+                    stats.append(table_stats)
+                    self.rollup_manager.record_load(table_name)
+                progress.update(task, advance=1)
+
+        self._print_load_summary(stats)
+        return stats
 
-            for csv_file, table_name in files_to_load:
-                file_path = csv_dir / csv_file
+    def load_table(self, file_path, table_name):
+        """Charger un fichier CSV dans sa table ; retourne les statistiques de chargement"""
+        file_path = Path(file_path)
+        if not file_path.exists():
+            self.console.print(f"❌ Fichier {file_path.name} non trouvé")
+            return None
 
-                if not file_path.exists():
-                    self.console.print(f"❌ Fichier {csv_file} non trouvé")
-                    continue
+        # COPY en flux vers une table de staging UNLOGGED, conversion des types côté serveur
+        partitioned = self.partitioned and table_name in PARTITIONED_TABLES
+        table_stats = CopyLoader(self.engine).load(
+            str(file_path), table_name,
+            order_by=PARTITIONED_TABLES[table_name] if partitioned else None,
+            before_insert=self._partition_hook(table_name) if partitioned else None
+        )
+        self.console.print(
+            f"✅ {file_path.name} chargé ({table_stats['rows']:,} lignes, "
+            f"{table_stats['rows_per_second']:,} lignes/s)"
+        )
+        return table_stats
 
-                df = pd.read_csv(file_path)
+    def _is_partitioned(self, table_name):
+        """Vrai si la table existante est partitionnée (relkind 'p' dans le catalogue)"""
+        with self.engine.connect() as conn:
+            relkind = conn.execute(text(
+                "SELECT relkind FROM pg_class WHERE oid = to_regclass(:table_name)"
+            ), {"table_name": f'"{table_name}"'}).scalar()
+        return relkind == 'p'
 
-                # Traitement des dates
-                date_columns = ['date_demande', 'date_ouverture', 'date_inscription', 
-                               'date_embauche', 'date', 'date_debut']
-                for col in date_columns:
-                    if col in df.columns:
-                        df[col] = pd.to_datetime(df[col])
+    def _partition_hook(self, table_name):
+        """Créer les partitions mensuelles couvrant les données de staging avant l'insertion"""
+        time_column = PARTITIONED_TABLES[table_name]
 
-                df.to_sql(table_name, self.engine, if_exists='append', index=False)
-                self.console.print(f"✅ {csv_file} chargé ({len(df)} lignes)")
-                progress.update(task, advance=1)
+        def before_insert(conn, staging_table):
+            start, end = conn.execute(text(f"""
+                SELECT MIN(NULLIF("{time_column}", '')::timestamp), MAX(NULLIF("{time_column}", '')::timestamp)
+                FROM "{staging_table}"
+            """)).one()
+            created = ensure_monthly_partitions(conn, table_name, start, end)
+            if created:
+                self.console.print(f"   🗂️  {len(created)} partitions créées pour {table_name}")
+
+        return before_insert
+
+    def _print_load_summary(self, stats):
+        """Afficher le débit de chargement par table"""
+        if not stats:
+            return
+
+        table = Table(title="Chargement COPY")
+        table.add_column("Table")
+        table.add_column("Lignes", justify="right")
+        table.add_column("Durée (s)", justify="right")
+        table.add_column("Lignes/s", justify="right")
+        for entry in stats:
+            table.add_row(entry['table'], f"{entry['rows']:,}", f"{entry['seconds']:.2f}",
+                          f"{entry['rows_per_second']:,}")
+
+        total_rows = sum(entry['rows'] for entry in stats)
+        total_seconds = sum(entry['seconds'] for entry in stats)
+        table.add_row("[bold]Total[/bold]", f"{total_rows:,}", f"{total_seconds:.2f}",
+                      f"{round(total_rows / total_seconds) if total_seconds else total_rows:,}")
+        self.console.print(table)
+
+    def index_statements(self):
+        """Instructions CREATE INDEX du schéma (version enrichie)"""
+        indexes = [
+            # Index existants
+            "CREATE INDEX IF NOT EXISTS idx_demandes_date ON demandes(date_demande);",
+            "CREATE INDEX IF NOT EXISTS idx_demandes_maison ON demandes(maison_fs_id);",
+            "CREATE INDEX IF NOT EXISTS idx_demandes_usager ON demandes(usager_id);",
+            "CREATE INDEX IF NOT EXISTS idx_demandes_service ON demandes(type_service);",
+            "CREATE INDEX IF NOT EXISTS idx_maisons_region ON maisons_france_services(region);",
+
+            # Nouveaux index
+            "CREATE INDEX IF NOT EXISTS idx_conseillers_maison ON conseillers(maison_fs_id);",
+            "CREATE INDEX IF NOT EXISTS idx_plannings_date ON plannings(date);",
+            "CREATE INDEX IF NOT EXISTS idx_plannings_maison ON plannings(maison_fs_id);",
+            "CREATE INDEX IF NOT EXISTS idx_stats_date ON statistiques_mensuelles(annee, mois);",
+            "CREATE INDEX IF NOT EXISTS idx_stats_maison ON statistiques_mensuelles(maison_fs_id);",
+            "CREATE INDEX IF NOT EXISTS idx_attente_demande ON temps_attente(demande_id);",
+            "CREATE INDEX IF NOT EXISTS idx_incidents_maison ON incidents_techniques(maison_fs_id);",
+            "CREATE INDEX IF NOT EXISTS idx_incidents_date ON incidents_techniques(date_debut);"
+        ]
+
+        if self.partitioned:
+            # Index BRIN sur les colonnes temporelles à la place des B-tree
+            btree_time_indexes = ('idx_demandes_date ', 'idx_plannings_date ', 'idx_incidents_date ')
+            indexes = [sql for sql in indexes if not any(name in sql for name in btree_time_indexes)]
+            for table in PARTITIONED_TABLES:
+                indexes.extend(brin_index_statements(table))
+
+        return indexes
 
     def create_indexes(self):
         """Créer les index pour optimiser les performances (version enrichie)"""
         with self.engine.connect() as conn:
-            indexes = [
-                # Index existants
-                "CREATE INDEX IF NOT EXISTS idx_demandes_date ON demandes(date_demande);",
-                "CREATE INDEX IF NOT EXISTS idx_demandes_maison ON demandes(maison_fs_id);",
-                "CREATE INDEX IF NOT EXISTS idx_demandes_usager ON demandes(usager_id);",
-                "CREATE INDEX IF NOT EXISTS idx_demandes_service ON demandes(type_service);",
-                "CREATE INDEX IF NOT EXISTS idx_maisons_region ON maisons_france_services(region);",
-                
-                # Nouveaux index
-                "CREATE INDEX IF NOT EXISTS idx_conseillers_maison ON conseillers(maison_fs_id);",
-                "CREATE INDEX IF NOT EXISTS idx_plannings_date ON plannings(date);",
-                "CREATE INDEX IF NOT EXISTS idx_plannings_maison ON plannings(maison_fs_id);",
-                "CREATE INDEX IF NOT EXISTS idx_stats_date ON statistiques_mensuelles(annee, mois);",
-                "CREATE INDEX IF NOT EXISTS idx_stats_maison ON statistiques_mensuelles(maison_fs_id);",
-                "CREATE INDEX IF NOT EXISTS idx_attente_demande ON temps_attente(demande_id);",
-                "CREATE INDEX IF NOT EXISTS idx_incidents_maison ON incidents_techniques(maison_fs_id);",
-                "CREATE INDEX IF NOT EXISTS idx_incidents_date ON incidents_techniques(date_debut);"
-            ]
-
-            for index_sql in indexes:
+            for index_sql in self.index_statements():
                 conn.execute(text(index_sql))
 
             conn.commit()
 
         self.console.print("✅ Index créés avec succès")
 
+    def _record_manifest(self, stats):
+        """Enregistrer empreinte, taille et nombre de lignes des fichiers chargés"""
+        from .ingest_manifest import scan_file
+
+        manifest = IngestionManifest(self.engine)
+        manifest.clear()
+        files = {table: source_path(csv_file) for csv_file, table in FILES_TO_LOAD}
+        for entry in stats:
+            path = files[entry['table']]
+            manifest.record(entry['table'], str(path), scan_file(str(path)), entry['rows'])
+
+    def refresh_incremental(self):
+        """Mettre à jour la base à partir des seuls fichiers CSV modifiés depuis le dernier chargement"""
+        if not PSYCOPG2_AVAILABLE:
+            self.initialize_database()
+            return
+
+        manifest = IngestionManifest(self.engine)
+        entries = manifest.entries()
+        if not entries:
+            self.console.print("ℹ️  Aucun manifeste d'ingestion : initialisation complète")
+            self.initialize_database()
+            return
+
+        self.console.print("🔄 Mise à jour incrémentale de la base de données...")
+        copy_loader = CopyLoader(self.engine)
+        stats = []
+
+        for csv_file, table_name in FILES_TO_LOAD:
+            file_path = source_path(csv_file)
+            if not file_path.exists():
+                self.console.print(f"❌ Fichier {csv_file} non trouvé")
+                continue
+
+            plan = manifest.plan(table_name, str(file_path), entries.get(table_name))
+            if plan['action'] == 'skip':
+                self.console.print(f"⏭️  {file_path.name} inchangé")
+                continue
+
+            # Le schéma existant fait foi, pas l'option --partitioned courante
+            partitioned = table_name in PARTITIONED_TABLES and self._is_partitioned(table_name)
+            table_stats = copy_loader.load(
+                str(file_path), table_name,
+                replace=plan['action'] == 'reload',
+                start_offset=plan['offset'],
+                order_by=PARTITIONED_TABLES[table_name] if partitioned else None,
+                before_insert=self._partition_hook(table_name) if partitioned else None
+            )
+            row_count = table_stats['rows'] + (plan['previous_rows'] if plan['action'] == 'append' else 0)
+            manifest.record(table_name, str(file_path), plan['scan'], row_count)
+            self.rollup_manager.record_load(table_name)
+            stats.append(table_stats)
+
+            label = "nouvelles lignes ajoutées" if plan['action'] == 'append' else "table rechargée"
+            self.console.print(
+                f"✅ {file_path.name} : {label} ({table_stats['rows']:,} lignes, "
+                f"{table_stats['rows_per_second']:,} lignes/s)"
+            )
+
+        if not stats:
+            self.console.print("✅ Base de données déjà à jour")
+            return
+
+        # Statistiques et agrégats uniquement pour les tables modifiées
+        changed = [entry['table'] for entry in stats]
+        with self.engine.connect() as conn:
+            for table_name in changed:
+                conn.execute(text(f'ANALYZE "{table_name}"'))
+            conn.commit()
+        if set(changed) & set(SOURCE_TABLES):
+            self.refresh_rollups()
+
+        self._print_load_summary(stats)
+        self.console.print(f"🎉 {len(changed)} table(s) mise(s) à jour : {', '.join(changed)}")
+
+    def refresh_rollups(self):
+        """Reconstruire les agrégats pré-calculés sur demandes"""
+        refreshed = self.rollup_manager.refresh_all()
+        for name, info in refreshed.items():
+            self.console.print(f"✅ Agrégat {name} reconstruit ({info['row_count']} lignes, {info['build_seconds']:.2f}s)")
+
+    def initialize_from_generator(self, generator):
+        """Initialiser la base en générant les données directement dans PostgreSQL (COPY, sans CSV)"""
+        from ..generation_sinks import PostgresCopySink
+
+        if not PSYCOPG2_AVAILABLE:
+            self.initialize_database()
+            return
+
+        self.console.print("🚀 Initialisation de la base de données par génération directe...")
+        self.create_tables()
+        stats = generator.generate_all_data(sink=PostgresCopySink(self.engine, partitioned=self.partitioned))
+        self.create_indexes()
+
+        with self.engine.connect() as conn:
+            for entry in stats:
+                conn.execute(text(f'ANALYZE "{entry["table"]}"'))
+            conn.commit()
+        for entry in stats:
+            self.rollup_manager.record_load(entry['table'])
+
+        # Aucun fichier source : la prochaine mise à jour incrémentale repartira de zéro
+        IngestionManifest(self.engine).clear()
+        self.refresh_rollups()
+        self.console.print("🎉 Base de données initialisée avec succès!")
+
     def initialize_database(self):
         """Initialiser complètement la base de données"""
         if not PSYCOPG2_AVAILABLE:
@@ -270,6 +480,12 @@ class DatabaseLoader:
             
         self.console.print("🚀 Initialisation de la base de données...")
         self.create_tables()
-        self.load_csv_data()
-        self.create_indexes()
+        if self.workers == 1:
+            stats = self.load_csv_data()
+            self.create_indexes()
+        else:
+            # Tables chargées en parallèle, clés et index reconstruits après le chargement
+            stats = LoadOrchestrator(self, workers=self.workers).run()
+        self._record_manifest(stats)
+        self.refresh_rollups()
         self.console.print("🎉 Base de données initialisée avec succès!")
@@ -0,0 +1,396 @@
+# src/database/pagination.py
+"""
+Result handles with keyset pagination.
+
+Instead of truncating every result at 1000 rows, the execution layer opens a
+`ResultHandle` per query. A `LIMIT 0` probe returns the output columns without
+scanning anything; the first page is then fetched in keyset order with
+`LIMIT page_size + 1` (so we know whether more rows exist without counting
+them), and further pages are fetched on demand by filtering past the last row
+seen on the ordering columns:
+
+    SELECT * FROM (<query>) AS __page
+    WHERE (k1 > :v1) OR (k1 = :v1 AND k2 > :v2) ...
+    ORDER BY k1, k2 LIMIT :page_size
+
+The ordering columns are the query's own ORDER BY (mapped to output columns),
+completed with every output column for grouped/DISTINCT results, or with `id`
+when it is the key of the only table read (not under a join, which repeats
+it), so the order is total (an unordered query is therefore paged in `id`
+order). Queries without a unique output row, whose
+ORDER BY cannot be mapped to output columns, that return duplicate column
+names or that use OFFSET fall back to OFFSET paging. OFFSET pages keep the
+query's own ORDER BY and break its ties on every output column position
+(ORDER BY ..., 1, 2, ..., n), so rows cannot move between pages from one
+execution to the next.
+
+The total row count is estimated cheaply: from the planner (`EXPLAIN`) for
+large results, refined by a count capped at COUNT_WINDOW rows for small ones.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import text
+
+from .connection import database_connection
+from .admission import workload_manager
+from .rollups import _mask_nested, _split_top_level, _split_alias
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = int(os.getenv("RESULT_PAGE_SIZE", "1000"))
+COUNT_WINDOW = int(os.getenv("RESULT_COUNT_WINDOW", "10000"))
+
+_LIMIT_TAIL = re.compile(
+    r"\s+(?:LIMIT\s+(?P<limit>\d+|ALL)(?:\s+OFFSET\s+(?P<offset>\d+))?"
+    r"|OFFSET\s+(?P<offset_first>\d+)(?:\s+LIMIT\s+(?P<limit_after>\d+|ALL))?"
+    r"|FETCH\s+(?:FIRST|NEXT)\s+(?P<fetch>\d+)\s+ROWS?\s+ONLY)\s*$",
+    re.IGNORECASE
+)
+_ORDER_TAIL = re.compile(r"\s+ORDER\s+BY\s+(?P<order>.+)$", re.IGNORECASE | re.DOTALL)
+
+
+def split_limit(query: str) -> Tuple[str, Optional[int], Optional[int]]:
+    """Split a top-level LIMIT/OFFSET off a query: (query without it, limit, offset).
+
+    Only the statement's own trailing clause counts: a LIMIT inside a subquery,
+    a string literal or an identifier does not.
+    """
+    normalized = " ".join(query.strip().rstrip(";").split())
+    match = _LIMIT_TAIL.search(_mask_nested(normalized))
+    if not match:
+        return normalized, None, None
+
+    limit = match.group("limit") or match.group("limit_after") or match.group("fetch")
+    offset = match.group("offset") or match.group("offset_first")
+    return (
+        normalized[:match.start()],
+        int(limit) if limit and limit.upper() != "ALL" else None,
+        int(offset) if offset else None,
+    )
+
+
+def split_order_by(query: str) -> Tuple[str, List[str]]:
+    """Split a top-level trailing ORDER BY off a query (which must have no LIMIT)."""
+    match = _ORDER_TAIL.search(_mask_nested(query))
+    if not match:
+        return query, []
+    return query[:match.start()], _split_top_level(query[match.start("order"):], ",")
+
+
+class ResultHandle:
+    """A query's result, fetched page by page."""
+
+    def __init__(self, db_connection, query: str, page_size: int = DEFAULT_PAGE_SIZE, user: str = "unknown"):
+        self.id = uuid.uuid4().hex
+        self.db_connection = db_connection
+        self.page_size = page_size
+        self.user = user
+        self.created_at = time.time()
+        self.last_access = self.created_at
+
+        base, self.limit, self.offset = split_limit(query)
+        self.base_query = base
+        self.columns: List[str] = []
+        self.delivered = 0
+        self.has_more = False
+        self.mode = "keyset"
+        self.order: List[Tuple[str, bool]] = []   # (output column, descending)
+        self.last_key: Optional[List[Any]] = None
+        self.total_estimate: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    # ----- first page -----
+
+    def probe_sql(self) -> str:
+        """Zero-row probe that returns the output column names without running the scan."""
+        return f"SELECT * FROM ({self._offset_base()}) AS __page LIMIT 0"
+
+    def accept_probe(self, result: Dict[str, Any]) -> None:
+        """Learn the output columns (probe executed by the caller, sync or async) and pick the ordering."""
+        self.columns = list(result.get("columns", []))
+        self._plan_pagination()
+
+    def first_page_sql(self) -> str:
+        """SQL of the first page, in page order, capped at one row past the page size."""
+        fetch = self._page_limit() + 1
+        if self.mode == "offset":
+            return self._offset_page_sql(fetch)
+        return f"SELECT * FROM ({self.base_query}) AS __page ORDER BY {self._order_sql()} LIMIT {fetch}"
+
+    def accept_first_page(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Consume the first page result (executed by the caller, sync or async)."""
+        return self._accept_page(result)
+
+    def fetch_first_page(self) -> Dict[str, Any]:
+        self.accept_probe(self.db_connection.execute_query_with_names(self.probe_sql()))
+        return self.accept_first_page(self.db_connection.execute_query_with_names(self.first_page_sql()))
+
+    # ----- further pages -----
+
+    def next_page(self) -> Dict[str, Any]:
+        """Fetch the page after the last one delivered (under a slot of the query's workload class)."""
+        with self._lock:
+            self.last_access = time.time()
+            if not self.has_more:
+                return {"columns": self.columns, "data": [], "row_count": 0, "has_more": False}
+
+            sql, params = self._next_page_sql()
+            with workload_manager.admit(self.base_query, user=self.user):
+                result = self.db_connection.execute_query_with_names(sql, params)
+            return self._accept_page(result)
+
+    def _next_page_sql(self) -> Tuple[str, Dict[str, Any]]:
+        fetch = self._page_limit() + 1
+        if self.mode == "offset":
+            return self._offset_page_sql(fetch), {}
+
+        disjuncts, params = [], {}
+        for i, (column, descending) in enumerate(self.order):
+            value = self.last_key[i]
+            terms = [self._equal_term(c, self.last_key[j], j, params) for j, (c, _d) in enumerate(self.order[:i])]
+            terms.append(self._after_term(column, descending, value, i, params))
+            disjuncts.append("(" + " AND ".join(terms) + ")")
+
+        sql = (f"SELECT * FROM ({self.base_query}) AS __page "
+               f"WHERE {' OR '.join(disjuncts)} ORDER BY {self._order_sql()} LIMIT {fetch}")
+        return sql, params
+
+    def _order_sql(self) -> str:
+        return ", ".join(f'__page."{c}"{" DESC" if d else ""}' for c, d in self.order)
+
+    def _equal_term(self, column: str, value: Any, index: int, params: Dict[str, Any]) -> str:
+        if value is None:
+            return f'__page."{column}" IS NULL'
+        params[f"k{index}"] = value
+        return f'__page."{column}" = :k{index}'
+
+    def _after_term(self, column: str, descending: bool, value: Any, index: int, params: Dict[str, Any]) -> str:
+        """Rows strictly after `value` in PostgreSQL's default order (NULLS LAST asc, NULLS FIRST desc)."""
+        ref = f'__page."{column}"'
+        if value is None:
+            return f"{ref} IS NOT NULL" if descending else "FALSE"
+        params[f"k{index}"] = value
+        if descending:
+            return f"{ref} < :k{index}"
+        return f"({ref} > :k{index} OR {ref} IS NULL)"
+
+    def _offset_page_sql(self, fetch: int) -> str:
+        """One OFFSET page, with LIMIT/OFFSET on the query itself so its total order applies."""
+        positions = ", ".join(str(i) for i in range(1, len(self.columns) + 1))
+        unordered, order_items = split_order_by(self.base_query)
+        order = ", ".join(order_items + [positions])
+        skip = (self.offset or 0) + self.delivered
+        return f"{unordered} ORDER BY {order} LIMIT {fetch}" + (f" OFFSET {skip}" if skip else "")
+
+    def _offset_base(self) -> str:
+        if self.offset:
+            return f"{self.base_query} OFFSET {self.offset}"
+        return self.base_query
+
+    def _page_limit(self) -> int:
+        if self.limit is None:
+            return self.page_size
+        return max(0, min(self.page_size, self.limit - self.delivered))
+
+    def _accept_page(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        data = result.get("data", [])
+        page_limit = self._page_limit()
+        more_rows = len(data) > page_limit
+        data = data[:page_limit]
+
+        self.delivered += len(data)
+        self.has_more = more_rows and (self.limit is None or self.delivered < self.limit)
+        if data and self.mode == "keyset":
+            positions = {c: i for i, c in enumerate(self.columns)}
+            self.last_key = [data[-1][positions[c]] for c, _d in self.order]
+
+        page = dict(result)
+        page.update({"data": data, "row_count": len(data), "has_more": self.has_more})
+        return page
+
+    # ----- ordering -----
+
+    def _plan_pagination(self) -> None:
+        """Choose the keyset columns, or fall back to OFFSET paging."""
+        if self.offset or len(set(self.columns)) != len(self.columns):
+            self.mode = "offset"
+            return
+
+        unordered, order_items = split_order_by(self.base_query)
+        order = []
+        for item in order_items:
+            mapped = self._map_order_item(item, unordered)
+            if mapped is None:
+                logger.debug(f"ORDER BY item not in the select list, paging with OFFSET: {item}")
+                self.mode = "offset"
+                return
+            order.append(mapped)
+
+        ordered_columns = {c for c, _d in order}
+        masked = _mask_nested(unordered)
+        if re.search(r"\bGROUP\s+BY\b|^SELECT\s+DISTINCT\b", masked, re.IGNORECASE):
+            # Grouped or distinct rows are unique on the full output row
+            order.extend((c, False) for c in self.columns if c not in ordered_columns)
+        elif self._id_is_unique(unordered, masked):
+            if "id" not in ordered_columns:
+                order.append(("id", False))
+        else:
+            # Without a unique column, identical rows would be skipped at page boundaries
+            self.mode = "offset"
+            return
+
+        self.order = order
+
+    def _id_is_unique(self, unordered: str, masked: str) -> bool:
+        """Whether the output `id` is the key of the only table read (a join repeats it across rows)."""
+        if "id" not in self.columns or re.search(r"\b(?:UNION|INTERSECT|EXCEPT)\b", masked, re.IGNORECASE):
+            return False
+        from_match = re.search(r"\bFROM\s+(?P<from>.+?)(?=\s+(?:WHERE|HAVING|WINDOW)\b|$)",
+                               masked, re.IGNORECASE | re.DOTALL)
+        single_table = r'[\w."]+(?:\s+(?:AS\s+)?\w+)?'
+        if not from_match or not re.fullmatch(single_table, from_match.group("from").strip(), re.IGNORECASE):
+            return False
+
+        # The selected id must be the table's own column, not another column renamed to id
+        select_match = re.match(r"^SELECT\s+(?P<select>.+?)\s+FROM\s", masked, re.IGNORECASE | re.DOTALL)
+        if not select_match:
+            return False
+        for select_item in _split_top_level(unordered[select_match.start("select"):select_match.end("select")], ","):
+            expr, alias = _split_alias(select_item)
+            expr = expr.strip()
+            if expr == "*" or expr.endswith(".*"):
+                continue
+            name = (alias or expr.split(".")[-1]).strip('"')
+            if name.lower() == "id":
+                return expr.split(".")[-1].strip('"').lower() == "id"
+        return True
+
+    def _map_order_item(self, item: str, unordered: str) -> Optional[Tuple[str, bool]]:
+        match = re.match(r"^(?P<expr>.+?)(?:\s+(?P<dir>ASC|DESC))?(?:\s+NULLS\s+(?:FIRST|LAST))?$",
+                         item.strip(), re.IGNORECASE | re.DOTALL)
+        if not match or re.search(r"\bNULLS\b", item, re.IGNORECASE):
+            return None  # explicit NULLS placement does not match the keyset predicates
+        expr, descending = match.group("expr").strip(), (match.group("dir") or "").upper() == "DESC"
+
+        if re.fullmatch(r"\d+", expr):
+            position = int(expr) - 1
+            return (self.columns[position], descending) if 0 <= position < len(self.columns) else None
+
+        name = expr.strip('"')
+        lowered = {c.lower(): c for c in self.columns}
+        if name.lower() in lowered:
+            return lowered[name.lower()], descending
+
+        # ORDER BY a selected expression, e.g. ORDER BY COUNT(*) with COUNT(*) AS total
+        select_match = re.match(r"^SELECT\s+(?:DISTINCT\s+)?(?P<select>.+?)\s+FROM\s",
+                                _mask_nested(unordered), re.IGNORECASE | re.DOTALL)
+        if select_match:
+            select_clause = unordered[select_match.start("select"):select_match.end("select")]
+            items = _split_top_level(select_clause, ",")
+            if len(items) == len(self.columns):
+                wanted = "".join(expr.split()).lower()
+                for position, select_item in enumerate(items):
+                    select_expr, _alias = _split_alias(select_item)
+                    if "".join(select_expr.split()).lower() == wanted:
+                        return self.columns[position], descending
+        return None
+
+    # ----- counting -----
+
+    def estimate_total(self) -> Dict[str, Any]:
+        """Cheap total row count: exact when known, capped count for small results, planner estimate otherwise."""
+        if self.total_estimate is not None:
+            return self.total_estimate
+
+        if not self.has_more:
+            self.total_estimate = {"count": self.delivered, "exact": True, "method": "complete"}
+            return self.total_estimate
+
+        count_query = self._offset_base()
+        estimate = None
+        try:
+            with self.db_connection.engine.connect() as conn:
+                plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {count_query}")).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                estimate = int(plan[0]["Plan"]["Plan Rows"])
+
+                if estimate <= COUNT_WINDOW:
+                    window = conn.execute(text(
+                        f"SELECT COUNT(*) FROM (SELECT 1 FROM ({count_query}) AS __q LIMIT {COUNT_WINDOW + 1}) AS __w"
+                    )).scalar()
+                    if window <= COUNT_WINDOW:
+                        total = min(window, self.limit) if self.limit is not None else window
+                        self.total_estimate = {"count": total, "exact": True, "method": "windowed"}
+                        return self.total_estimate
+                    estimate = max(estimate, window)
+        except Exception as e:
+            logger.warning(f"Row count estimate failed: {e}")
+            if estimate is None:
+                return {"count": None, "exact": False, "method": "unavailable"}
+
+        if self.limit is not None:
+            estimate = min(estimate, self.limit)
+        self.total_estimate = {"count": max(estimate, self.delivered), "exact": False, "method": "planner"}
+        return self.total_estimate
+
+    def describe(self) -> Dict[str, Any]:
+        """Serializable summary for the UI."""
+        return {
+            "id": self.id,
+            "page_size": self.page_size,
+            "delivered": self.delivered,
+            "has_more": self.has_more,
+            "mode": self.mode,
+            "total_estimate": self.total_estimate,
+            "user": self.user,
+        }
+
+
+class ResultHandleRegistry:
+    """In-process registry of open result handles, bounded in size and idle time."""
+
+    def __init__(self, max_handles: int = 200, idle_ttl: float = 3600.0):
+        self.max_handles = max_handles
+        self.idle_ttl = idle_ttl
+        self._handles: "OrderedDict[str, ResultHandle]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, query: str, page_size: int = DEFAULT_PAGE_SIZE, db_connection=None,
+             user: str = "unknown") -> ResultHandle:
+        handle = ResultHandle(db_connection or database_connection, query, page_size, user)
+        with self._lock:
+            self._expire()
+            self._handles[handle.id] = handle
+            while len(self._handles) > self.max_handles:
+                self._handles.popitem(last=False)
+        return handle
+
+    def get(self, handle_id: str) -> Optional[ResultHandle]:
+        with self._lock:
+            self._expire()
+            handle = self._handles.get(handle_id)
+            if handle is not None:
+                self._handles.move_to_end(handle_id)
+            return handle
+
+    def close(self, handle_id: str) -> None:
+        with self._lock:
+            self._handles.pop(handle_id, None)
+
+    def _expire(self) -> None:
+        now = time.time()
+        for handle_id in [h for h, handle in self._handles.items() if now - handle.last_access > self.idle_ttl]:
+            del self._handles[handle_id]
+
+
+# Global registry used by the execution layer and the Streamlit table
+result_handles = ResultHandleRegistry()
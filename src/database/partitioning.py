@@ -0,0 +1,113 @@
+# src/database/partitioning.py
+"""
+Monthly range partitioning of the time-based fact tables.
+
+In partitioned-schema mode `demandes`, `plannings` and `incidents_techniques`
+are declared `PARTITION BY RANGE` on their time column, with one partition per
+month plus a DEFAULT partition for NULL or out-of-range timestamps. Partitions
+are created on demand by the loaders just before rows for a month land, and the
+time columns get BRIN indexes instead of B-trees.
+
+`temps_attente` has no time column of its own (only `heure_demande` and
+`jour_semaine`), so it stays a regular heap table.
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> time column used as the range partition key
+PARTITIONED_TABLES: Dict[str, str] = {
+    'demandes': 'date_demande',
+    'plannings': 'date',
+    'incidents_techniques': 'date_debut',
+}
+
+DateLike = Union[date, datetime]
+
+
+def partition_clauses(table_name: str, partitioned: bool) -> Tuple[str, str]:
+    """Primary key and PARTITION BY clauses for a table's CREATE TABLE statement.
+
+    A partitioned table's primary key has to include the partition key.
+    """
+    column = PARTITIONED_TABLES.get(table_name)
+    if not partitioned or column is None:
+        return "PRIMARY KEY (id)", ""
+    return f'PRIMARY KEY (id, "{column}")', f'PARTITION BY RANGE ("{column}")'
+
+
+def month_starts(start: DateLike, end: DateLike) -> List[date]:
+    """First day of every month between start and end (inclusive)."""
+    current = date(start.year, start.month, 1)
+    last = date(end.year, end.month, 1)
+    months = []
+    while current <= last:
+        months.append(current)
+        current = _next_month(current)
+    return months
+
+
+def partition_name(table_name: str, month: date) -> str:
+    return f"{table_name}_p{month.year:04d}{month.month:02d}"
+
+
+def ensure_default_partition(conn, table_name: str) -> None:
+    """Create the catch-all partition (NULL and out-of-range time values)."""
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {table_name}_default PARTITION OF {table_name} DEFAULT"
+    ))
+
+
+def ensure_monthly_partitions(conn, table_name: str, start: Optional[DateLike],
+                              end: Optional[DateLike]) -> List[str]:
+    """Create the monthly partitions covering [start, end] that do not exist yet.
+
+    Must run before the rows are inserted: a partition cannot be attached once
+    matching rows have landed in the DEFAULT partition.
+    """
+    if start is None or end is None:
+        return []
+
+    existing = {
+        row[0] for row in conn.execute(text("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = :table_name
+        """), {"table_name": table_name})
+    }
+
+    created = []
+    for month in month_starts(start, end):
+        name = partition_name(table_name, month)
+        if name in existing:
+            continue
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table_name} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        ))
+        created.append(name)
+
+    if created:
+        logger.info(f"Created {len(created)} partitions for {table_name}: {created[0]} .. {created[-1]}")
+    return created
+
+
+def brin_index_statements(table_name: str) -> List[str]:
+    """BRIN index on the partition key (propagated to every partition)."""
+    column = PARTITIONED_TABLES[table_name]
+    return [
+        f'CREATE INDEX IF NOT EXISTS idx_{table_name}_{column}_brin '
+        f'ON {table_name} USING BRIN ("{column}") WITH (pages_per_range = 32);'
+    ]
+
+
+def _next_month(month: date) -> date:
+    if month.month == 12:
+        return date(month.year + 1, 1, 1)
+    return date(month.year, month.month + 1, 1)
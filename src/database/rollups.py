@@ -0,0 +1,752 @@
+# src/database/rollups.py
+"""
+Pre-aggregated rollups over `demandes` with transparent query routing.
+
+Three rollup tables live in the `rollups` schema (kept out of `public` so the
+schema tools never show them to the LLM):
+
+- demandes_daily   : jour x region x type_service x canal x organisme_concerne x complexite
+- demandes_monthly : mois x (same dimensions), built from the daily rollup
+- demandes_dims    : the dimensions only, no date bucket
+
+Each rollup stores re-aggregable measures (counts, sums, min/max) so COUNT, SUM,
+AVG, MIN and MAX over the fact table can be answered from it. `RollupRouter`
+recognises generated SQL of the form "aggregate demandes [JOIN maisons] WHERE
+dims GROUP BY dims" and rewrites it against the smallest rollup that covers it.
+
+Freshness is tracked against loads: the loader bumps a version per source table
+in `rollups.source_versions`, and a rollup is only used while the version it was
+built from matches the current one.
+"""
+
+import re
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import text
+
+from .connection import database_connection
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_SCHEMA = "rollups"
+SOURCE_TABLES = ("demandes", "maisons_france_services")
+
+# Dimensions available in every rollup (region comes from maisons_france_services)
+DEMANDES_DIMENSIONS = ("type_service", "canal", "organisme_concerne", "complexite")
+MAISON_DIMENSIONS = ("region",)
+DIMENSIONS = MAISON_DIMENSIONS + DEMANDES_DIMENSIONS
+
+# Numeric / boolean measures pre-aggregated in every rollup
+NUMERIC_MEASURES = ("duree_traitement", "satisfaction_score")
+FLAG_MEASURES = ("resolu", "suivi_necessaire")
+
+# Columns of the source tables, used to reject references the rollups cannot answer
+DEMANDES_COLUMNS = {
+    "id", "usager_id", "maison_fs_id", "date_demande", "type_service", "organisme_concerne",
+    "canal", "duree_traitement", "satisfaction_score", "resolu", "conseiller_id",
+    "complexite", "suivi_necessaire"
+}
+MAISONS_COLUMNS = {
+    "id", "nom", "adresse", "code_postal", "ville", "departement", "region", "latitude",
+    "longitude", "type_structure", "date_ouverture", "nb_conseillers",
+    "services_disponibles", "population_desservie", "statut"
+}
+
+# Columns of the rollup tables: an unqualified reference to one of them that no
+# table of the query provides must not resolve silently against the rollup
+ROLLUP_COLUMNS = set(DIMENSIONS) | {"jour", "mois", "maison_found", "nb_demandes"} | {
+    f"{prefix}_{col}" for col in NUMERIC_MEASURES for prefix in ("cnt", "sum", "min", "max")
+} | {f"nb_{col}" for col in FLAG_MEASURES}
+
+# Grain ordering: a rollup can answer any query whose grain is <= its own
+GRAIN_NONE, GRAIN_MONTH, GRAIN_DAY = 0, 1, 2
+
+ROLLUPS = {
+    "demandes_dims": {"grain": GRAIN_NONE, "date_column": None},
+    "demandes_monthly": {"grain": GRAIN_MONTH, "date_column": "mois"},
+    "demandes_daily": {"grain": GRAIN_DAY, "date_column": "jour"},
+}
+
+
+def _measure_columns_sql(source: str) -> str:
+    """SELECT list of measures, either from the fact table or re-aggregated from a rollup."""
+    parts = []
+    if source == "fact":
+        parts.append("COUNT(*) AS nb_demandes")
+        for col in NUMERIC_MEASURES:
+            parts.append(f"COUNT(d.{col}) AS cnt_{col}")
+            parts.append(f"SUM(d.{col}) AS sum_{col}")
+            parts.append(f"MIN(d.{col}) AS min_{col}")
+            parts.append(f"MAX(d.{col}) AS max_{col}")
+        for col in FLAG_MEASURES:
+            parts.append(f"SUM(CASE WHEN d.{col} THEN 1 ELSE 0 END) AS nb_{col}")
+    else:
+        parts.append("SUM(nb_demandes) AS nb_demandes")
+        for col in NUMERIC_MEASURES:
+            parts.append(f"SUM(cnt_{col}) AS cnt_{col}")
+            parts.append(f"SUM(sum_{col}) AS sum_{col}")
+            parts.append(f"MIN(min_{col}) AS min_{col}")
+            parts.append(f"MAX(max_{col}) AS max_{col}")
+        for col in FLAG_MEASURES:
+            parts.append(f"SUM(nb_{col}) AS nb_{col}")
+    return ",\n                   ".join(parts)
+
+
+class UnroutableQuery(Exception):
+    """Raised internally when a query cannot be answered from a rollup."""
+
+
+class RollupManager:
+    """Builds, refreshes and tracks the freshness of the demandes rollups."""
+
+    def __init__(self, db_connection):
+        self.db_connection = db_connection
+
+    @property
+    def engine(self):
+        return self.db_connection.engine
+
+    def ensure_metadata(self) -> None:
+        """Create the rollup schema and its bookkeeping tables."""
+        with self.engine.begin() as conn:
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ROLLUP_SCHEMA}"))
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {ROLLUP_SCHEMA}.source_versions (
+                    table_name VARCHAR(100) PRIMARY KEY,
+                    version BIGINT NOT NULL DEFAULT 0,
+                    loaded_at TIMESTAMP
+                )
+            """))
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {ROLLUP_SCHEMA}.rollup_state (
+                    rollup_name VARCHAR(100) PRIMARY KEY,
+                    source_version BIGINT NOT NULL,
+                    refreshed_at TIMESTAMP NOT NULL,
+                    row_count BIGINT,
+                    build_seconds DOUBLE PRECISION
+                )
+            """))
+
+    def record_load(self, table_name: str) -> None:
+        """Bump the load version of a source table, making dependent rollups stale."""
+        if table_name not in SOURCE_TABLES:
+            return
+
+        self.ensure_metadata()
+        with self.engine.begin() as conn:
+            conn.execute(text(f"""
+                INSERT INTO {ROLLUP_SCHEMA}.source_versions (table_name, version, loaded_at)
+                VALUES (:table_name, 1, NOW())
+                ON CONFLICT (table_name)
+                DO UPDATE SET version = {ROLLUP_SCHEMA}.source_versions.version + 1, loaded_at = NOW()
+            """), {"table_name": table_name})
+        logger.info(f"Recorded load of {table_name}, rollups are now stale")
+
+    def current_source_version(self, conn) -> int:
+        """Combined load version of all the rollups' source tables."""
+        source_list = ", ".join(f"'{table}'" for table in SOURCE_TABLES)
+        result = conn.execute(text(f"""
+            SELECT COALESCE(SUM(version), 0)
+            FROM {ROLLUP_SCHEMA}.source_versions
+            WHERE table_name IN ({source_list})
+        """))
+        return int(result.scalar() or 0)
+
+    def refresh_all(self) -> Dict[str, Any]:
+        """Rebuild every rollup (daily first, the others are derived from it)."""
+        self.ensure_metadata()
+        refreshed = {}
+        for rollup_name in ("demandes_daily", "demandes_monthly", "demandes_dims"):
+            refreshed[rollup_name] = self.refresh(rollup_name)
+        return refreshed
+
+    def refresh(self, rollup_name: str) -> Dict[str, Any]:
+        """Rebuild one rollup into a side table and swap it into place atomically."""
+        if rollup_name not in ROLLUPS:
+            raise ValueError(f"Unknown rollup: {rollup_name}")
+
+        start = time.perf_counter()
+        build_table = f"{ROLLUP_SCHEMA}.{rollup_name}__build"
+        target_table = f"{ROLLUP_SCHEMA}.{rollup_name}"
+        dims = ", ".join(DIMENSIONS)
+
+        if rollup_name == "demandes_daily":
+            select_sql = f"""
+                SELECT date_trunc('day', d.date_demande) AS jour,
+                       m.region, (m.id IS NOT NULL) AS maison_found,
+                       {", ".join(f"d.{c}" for c in DEMANDES_DIMENSIONS)},
+                       {_measure_columns_sql("fact")}
+                FROM demandes d
+                LEFT JOIN maisons_france_services m ON m.id = d.maison_fs_id
+                GROUP BY 1, 2, 3, {", ".join(str(i) for i in range(4, 4 + len(DEMANDES_DIMENSIONS)))}
+            """
+        elif rollup_name == "demandes_monthly":
+            select_sql = f"""
+                SELECT date_trunc('month', jour) AS mois, {dims}, maison_found,
+                       {_measure_columns_sql("rollup")}
+                FROM {ROLLUP_SCHEMA}.demandes_daily
+                GROUP BY date_trunc('month', jour), {dims}, maison_found
+            """
+        else:
+            select_sql = f"""
+                SELECT {dims}, maison_found,
+                       {_measure_columns_sql("rollup")}
+                FROM {ROLLUP_SCHEMA}.demandes_daily
+                GROUP BY {dims}, maison_found
+            """
+
+        with self.engine.begin() as conn:
+            # Read the version first: a load that lands during the build leaves the rollup stale
+            source_version = self.current_source_version(conn)
+            conn.execute(text(f"DROP TABLE IF EXISTS {build_table}"))
+            conn.execute(text(f"CREATE TABLE {build_table} AS {select_sql}"))
+            row_count = conn.execute(text(f"SELECT COUNT(*) FROM {build_table}")).scalar()
+
+            conn.execute(text(f"DROP TABLE IF EXISTS {target_table}"))
+            conn.execute(text(f"ALTER TABLE {build_table} RENAME TO {rollup_name}"))
+
+            date_column = ROLLUPS[rollup_name]["date_column"]
+            if date_column:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS idx_{rollup_name}_{date_column} "
+                    f"ON {target_table} ({date_column})"
+                ))
+            conn.execute(text(f"ANALYZE {target_table}"))
+
+            build_seconds = time.perf_counter() - start
+            conn.execute(text(f"""
+                INSERT INTO {ROLLUP_SCHEMA}.rollup_state
+                    (rollup_name, source_version, refreshed_at, row_count, build_seconds)
+                VALUES (:name, :version, NOW(), :row_count, :build_seconds)
+                ON CONFLICT (rollup_name) DO UPDATE SET
+                    source_version = EXCLUDED.source_version,
+                    refreshed_at = EXCLUDED.refreshed_at,
+                    row_count = EXCLUDED.row_count,
+                    build_seconds = EXCLUDED.build_seconds
+            """), {"name": rollup_name, "version": source_version,
+                   "row_count": row_count, "build_seconds": build_seconds})
+
+        logger.info(f"Refreshed rollup {rollup_name}: {row_count} rows in {build_seconds:.2f}s")
+        return {"rollup": rollup_name, "row_count": row_count, "build_seconds": build_seconds}
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """Freshness status of each rollup against the current source loads."""
+        status = {}
+        try:
+            with self.engine.connect() as conn:
+                source_version = self.current_source_version(conn)
+                rows = conn.execute(text(f"""
+                    SELECT rollup_name, source_version, refreshed_at, row_count, build_seconds
+                    FROM {ROLLUP_SCHEMA}.rollup_state
+                """)).fetchall()
+        except Exception as e:
+            logger.debug(f"Rollup status unavailable: {e}")
+            return status
+
+        for name, version, refreshed_at, row_count, build_seconds in rows:
+            status[name] = {
+                "fresh": int(version) == source_version,
+                "source_version": int(version),
+                "current_version": source_version,
+                "refreshed_at": refreshed_at,
+                "row_count": row_count,
+                "build_seconds": build_seconds,
+            }
+        return status
+
+
+class RollupRouter:
+    """Rewrites aggregate queries over demandes to read from a fresh rollup."""
+
+    _STRUCTURE = re.compile(
+        r"^SELECT\s+(?P<select>.+?)\s+FROM\s+(?P<from>.+?)"
+        r"(?:\s+WHERE\s+(?P<where>.+?))?"
+        r"(?:\s+GROUP\s+BY\s+(?P<group>.+?))?"
+        r"(?:\s+HAVING\s+(?P<having>.+?))?"
+        r"(?:\s+ORDER\s+BY\s+(?P<order>.+?))?"
+        r"(?:\s+LIMIT\s+(?P<limit>\d+))?$",
+        re.IGNORECASE | re.DOTALL
+    )
+    _TABLE_REF = re.compile(
+        r"^(?:public\.)?(?P<table>demandes|maisons_france_services)"
+        r"(?:\s+(?:AS\s+)?(?!(?:INNER|LEFT|JOIN|ON)\b)(?P<alias>\w+))?$",
+        re.IGNORECASE
+    )
+    _JOIN = re.compile(
+        r"^(?P<left>.+?)\s+(?P<join_type>INNER\s+JOIN|LEFT\s+(?:OUTER\s+)?JOIN|JOIN)\s+"
+        r"(?P<right>.+?)\s+ON\s+(?P<on>.+)$",
+        re.IGNORECASE | re.DOTALL
+    )
+    _UNSUPPORTED = re.compile(
+        r"\(\s*SELECT\b|\bDISTINCT\b|\bUNION\b|\bOVER\s*\(|\bWITH\b|\bOFFSET\b|\bFILTER\s*\(",
+        re.IGNORECASE
+    )
+    _ISO_DATE = re.compile(r"^(?:DATE\s+)?'(\d{4})-(\d{2})-(\d{2})'(?:::date)?$", re.IGNORECASE)
+
+    def __init__(self, manager: RollupManager, freshness_ttl: float = 30.0):
+        self.manager = manager
+        self.freshness_ttl = freshness_ttl
+        self._fresh_rollups: Optional[set] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Forget the cached freshness status (called after loads and refreshes)."""
+        with self._lock:
+            self._fresh_rollups = None
+            self._checked_at = 0.0
+
+    def _get_fresh_rollups(self) -> set:
+        with self._lock:
+            if self._fresh_rollups is None or time.monotonic() - self._checked_at > self.freshness_ttl:
+                status = self.manager.get_status()
+                self._fresh_rollups = {name for name, info in status.items() if info["fresh"]}
+                self._checked_at = time.monotonic()
+            return self._fresh_rollups
+
+    def rewrite(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return {'sql', 'rollup'} when the query can be answered from a fresh rollup, else None."""
+        try:
+            plan = self._plan(query)
+        except UnroutableQuery as e:
+            logger.debug(f"Query not routable to a rollup: {e}")
+            return None
+        except Exception as e:
+            logger.warning(f"Rollup routing failed, using base tables: {e}")
+            return None
+
+        fresh = self._get_fresh_rollups()
+        candidates = [name for name, info in sorted(ROLLUPS.items(), key=lambda kv: kv[1]["grain"])
+                      if info["grain"] >= plan["grain"] and name in fresh]
+        if not candidates:
+            return None
+
+        rollup_name = candidates[0]
+        sql = self._render(plan, rollup_name)
+        logger.info(f"Routed query to rollup {rollup_name}")
+        return {"sql": sql, "rollup": rollup_name}
+
+    # ----- parsing -----
+
+    def _plan(self, query: str) -> Dict[str, Any]:
+        normalized = " ".join(query.strip().rstrip(";").split())
+        if self._UNSUPPORTED.search(normalized):
+            raise UnroutableQuery("unsupported construct")
+
+        # Match clause keywords on a copy where parenthesised text and literals are masked,
+        # so "EXTRACT(YEAR FROM ...)" is not mistaken for the FROM clause
+        masked_match = self._STRUCTURE.match(_mask_nested(normalized))
+        if not masked_match:
+            raise UnroutableQuery("not a simple aggregate query")
+        match = _Clauses(normalized, masked_match)
+
+        ctx = self._parse_from(match.group("from"))
+        ctx["grain"] = GRAIN_NONE
+        ctx["aliases"] = set()
+
+        select_items = []
+        has_aggregate = False
+        for item in _split_top_level(match.group("select"), ","):
+            expr, alias = _split_alias(item)
+            mapped, is_aggregate = self._map_expression(expr, ctx)
+            has_aggregate = has_aggregate or is_aggregate
+            select_items.append((mapped, alias or self._default_alias(expr)))
+            if alias:
+                ctx["aliases"].add(alias.strip('"').lower())
+
+        if not has_aggregate:
+            raise UnroutableQuery("no aggregate in select list")
+
+        where = [self._map_predicate(p, ctx) for p in _split_top_level(match.group("where") or "", "AND")]
+        if ctx["join"] == "inner":
+            where.append("maison_found")
+
+        group = [self._map_expression(g, ctx, allow_aliases=True)[0]
+                 for g in _split_top_level(match.group("group") or "", ",")]
+        having = match.group("having")
+        if having:
+            having = self._map_expression(having, ctx, allow_aliases=True)[0]
+        order = [self._map_order_item(o, ctx) for o in _split_top_level(match.group("order") or "", ",")]
+
+        return {
+            "select": select_items,
+            "where": [w for w in where if w],
+            "group": group,
+            "having": having,
+            "order": order,
+            "limit": match.group("limit"),
+            "grain": ctx["grain"],
+        }
+
+    def _parse_from(self, from_clause: str) -> Dict[str, Any]:
+        join_match = self._JOIN.match(from_clause)
+        refs = [from_clause] if not join_match else [join_match.group("left"), join_match.group("right")]
+
+        tables = {}
+        for ref in refs:
+            ref_match = self._TABLE_REF.match(ref.strip())
+            if not ref_match:
+                raise UnroutableQuery(f"unsupported table reference: {ref}")
+            table = ref_match.group("table").lower()
+            tables[table] = (ref_match.group("alias") or table).lower()
+
+        if "demandes" not in tables:
+            raise UnroutableQuery("query does not read demandes")
+
+        ctx = {"demandes": tables["demandes"], "maisons": tables.get("maisons_france_services"), "join": None}
+        if not join_match:
+            return ctx
+
+        join_type = join_match.group("join_type").upper()
+        if join_type.startswith("LEFT"):
+            # LEFT JOIN keeps every demande only when demandes is the preserved side
+            if self._TABLE_REF.match(join_match.group("left").strip()).group("table").lower() != "demandes":
+                raise UnroutableQuery("left join preserving maisons_france_services")
+            ctx["join"] = "left"
+        else:
+            ctx["join"] = "inner"
+
+        d, m = ctx["demandes"], ctx["maisons"]
+        on = "".join(join_match.group("on").split()).lower()
+        if on not in (f"{m}.id={d}.maison_fs_id", f"{d}.maison_fs_id={m}.id"):
+            raise UnroutableQuery(f"unsupported join condition: {join_match.group('on')}")
+        return ctx
+
+    def _default_alias(self, expr: str) -> Optional[str]:
+        """Keep the output column name PostgreSQL gives a bare column or function call."""
+        expr = expr.strip()
+        match = re.fullmatch(r"(?:\w+\.)?(\w+)", expr)
+        if match:
+            return match.group(1)
+        match = re.match(r"(\w+)\s*\(", expr)
+        if match and _find_closing_paren(expr, expr.index("(")) == len(expr) - 1:
+            return match.group(1).lower()
+        return None
+
+    def _require_grain(self, ctx: Dict[str, Any], grain: int) -> None:
+        ctx["grain"] = max(ctx["grain"], grain)
+
+    def _column_owner(self, qualifier: Optional[str], column: str, ctx: Dict[str, Any]) -> Optional[str]:
+        """Which source table a column reference points to (None when it is not a source column)."""
+        qualifier = qualifier.lower() if qualifier else None
+        column = column.lower()
+        if qualifier:
+            if qualifier == ctx["demandes"]:
+                return "demandes"
+            if ctx["maisons"] and qualifier == ctx["maisons"]:
+                return "maisons"
+            raise UnroutableQuery(f"unknown qualifier {qualifier}")
+        if column in DEMANDES_COLUMNS:
+            return "demandes"
+        if ctx["maisons"] and column in MAISONS_COLUMNS:
+            return "maisons"
+        if column in MAISONS_COLUMNS or column in ROLLUP_COLUMNS:
+            raise UnroutableQuery(f"column {column} does not come from a table of the query")
+        return None
+
+    def _map_expression(self, expr: str, ctx: Dict[str, Any], allow_aliases: bool = False) -> Tuple[str, bool]:
+        """Map a select/group/having expression onto rollup columns."""
+        expr = expr.strip()
+        if re.fullmatch(r"\d+", expr):
+            return expr, False  # positional reference in GROUP BY / ORDER BY
+
+        literals: List[str] = []
+
+        def protect(match):
+            literals.append(match.group(0))
+            return f"__lit{len(literals) - 1}__"
+
+        work = re.sub(r"'(?:[^']|'')*'", protect, expr)
+
+        aggregates: List[str] = []
+        mapped, is_aggregate = self._map_aggregates(work, ctx, aggregates)
+        mapped = self._map_date_functions(mapped, ctx, literals)
+
+        def map_column(match):
+            qualifier, column = match.group(1), match.group(2)
+            if column.startswith("__lit") or column.startswith("__agg"):
+                return match.group(0)
+            if allow_aliases and not qualifier and column.lower() in ctx["aliases"]:
+                return match.group(0)
+            owner = self._column_owner(qualifier, column, ctx)
+            if owner is None:
+                return match.group(0)
+            column = column.lower()
+            if (owner == "demandes" and column in DEMANDES_DIMENSIONS) or \
+                    (owner == "maisons" and column in MAISON_DIMENSIONS):
+                return column
+            raise UnroutableQuery(f"column {column} is not a rollup dimension")
+
+        mapped = re.sub(r"(?<![\w.])(?:(\w+)\.)?(\w+)\b(?!\s*\()", map_column, mapped)
+        mapped = re.sub(r"__agg(\d+)__", lambda m: aggregates[int(m.group(1))], mapped)
+        mapped = re.sub(r"__lit(\d+)__", lambda m: literals[int(m.group(1))], mapped)
+        return mapped, is_aggregate
+
+    def _map_aggregates(self, work: str, ctx: Dict[str, Any], aggregates: List[str]) -> Tuple[str, bool]:
+        """Replace every aggregate call with a placeholder for its re-aggregation over rollup measures."""
+        output = []
+        position = 0
+        found = False
+        for match in re.finditer(r"\b(COUNT|SUM|AVG|MIN|MAX)\s*\(", work, re.IGNORECASE):
+            if match.start() < position:
+                continue
+            end = _find_closing_paren(work, match.end() - 1)
+            argument = work[match.end():end].strip()
+            aggregates.append(self._map_aggregate(match.group(1).upper(), argument, ctx))
+            output.append(work[position:match.start()])
+            output.append(f"__agg{len(aggregates) - 1}__")
+            position = end + 1
+            found = True
+        output.append(work[position:])
+        return "".join(output), found
+
+    def _map_aggregate(self, function: str, argument: str, ctx: Dict[str, Any]) -> str:
+        d = ctx["demandes"]
+        column_match = re.fullmatch(r"(?:(\w+)\.)?(\w+)", argument)
+        flag_match = re.fullmatch(
+            r"CASE\s+WHEN\s+(?:(\w+)\.)?(\w+)(?:\s*=\s*TRUE)?\s+THEN\s+1\s+ELSE\s+0\s+END",
+            argument, re.IGNORECASE
+        )
+
+        # COUNT over no rows is 0, whereas SUM over no rollup rows is NULL
+        if function == "COUNT" and argument in ("*", "1"):
+            return "COALESCE(SUM(nb_demandes), 0)::bigint"
+
+        if column_match:
+            qualifier, column = column_match.group(1), column_match.group(2).lower()
+            owner = self._column_owner(qualifier, column, ctx)
+            if owner == "demandes" and function == "COUNT" and column == "id":
+                return "COALESCE(SUM(nb_demandes), 0)::bigint"
+            if owner == "demandes" and column in NUMERIC_MEASURES:
+                if function == "COUNT":
+                    return f"COALESCE(SUM(cnt_{column}), 0)::bigint"
+                if function == "SUM":
+                    return f"SUM(sum_{column})::bigint"
+                if function == "AVG":
+                    return f"(SUM(sum_{column})::numeric / NULLIF(SUM(cnt_{column}), 0))"
+                return f"{function}({function.lower()}_{column})"
+
+        if flag_match and self._column_owner(flag_match.group(1), flag_match.group(2), ctx) == "demandes":
+            column = flag_match.group(2).lower()
+            if column in FLAG_MEASURES:
+                if function == "SUM":
+                    return f"SUM(nb_{column})::bigint"
+                if function == "AVG":
+                    return f"(SUM(nb_{column})::numeric / NULLIF(SUM(nb_demandes), 0))"
+
+        raise UnroutableQuery(f"unsupported aggregate {function}({argument}) on {d}")
+
+    def _map_date_functions(self, work: str, ctx: Dict[str, Any], literals: List[str]) -> str:
+        """Map date bucketing of date_demande onto the rollup date columns."""
+        date_ref = rf"(?:(?:{re.escape(ctx['demandes'])}|demandes)\.)?date_demande"
+
+        def literal_of(placeholder: str) -> str:
+            return literals[int(re.fullmatch(r"__lit(\d+)__", placeholder).group(1))]
+
+        def unit_of(placeholder: str) -> str:
+            return literal_of(placeholder).strip("'").lower()
+
+        def date_trunc(match):
+            unit = unit_of(match.group(1))
+            if unit in ("month", "quarter", "year"):
+                self._require_grain(ctx, GRAIN_MONTH)
+                return f"DATE_TRUNC('{unit}', __date_month__)"
+            if unit in ("day", "week"):
+                self._require_grain(ctx, GRAIN_DAY)
+                return f"DATE_TRUNC('{unit}', __date_day__)"
+            raise UnroutableQuery(f"date_trunc unit {unit} is finer than a day")
+
+        def extract(match):
+            field = match.group(1).upper()
+            if field in ("YEAR", "MONTH", "QUARTER"):
+                self._require_grain(ctx, GRAIN_MONTH)
+                return f"EXTRACT({field} FROM __date_month__)"
+            if field in ("DAY", "DOW", "ISODOW", "WEEK", "DOY"):
+                self._require_grain(ctx, GRAIN_DAY)
+                return f"EXTRACT({field} FROM __date_day__)"
+            raise UnroutableQuery(f"extract {field} is finer than a day")
+
+        def to_char(match):
+            fmt = unit_of(match.group(1))
+            if fmt in ("yyyy", "yyyy-mm", "mm"):
+                self._require_grain(ctx, GRAIN_MONTH)
+                return f"TO_CHAR(__date_month__, {literal_of(match.group(1))})"
+            if fmt == "yyyy-mm-dd":
+                self._require_grain(ctx, GRAIN_DAY)
+                return f"TO_CHAR(__date_day__, {literal_of(match.group(1))})"
+            raise UnroutableQuery(f"to_char format {fmt} is not supported")
+
+        def as_date(match):
+            self._require_grain(ctx, GRAIN_DAY)
+            return "__date_day__::date"
+
+        work = re.sub(rf"DATE_TRUNC\s*\(\s*(__lit\d+__)\s*,\s*{date_ref}\s*\)", date_trunc, work, flags=re.IGNORECASE)
+        work = re.sub(rf"EXTRACT\s*\(\s*(\w+)\s+FROM\s+{date_ref}\s*\)", extract, work, flags=re.IGNORECASE)
+        work = re.sub(rf"TO_CHAR\s*\(\s*{date_ref}\s*,\s*(__lit\d+__)\s*\)", to_char, work, flags=re.IGNORECASE)
+        work = re.sub(rf"(?:DATE\s*\(\s*{date_ref}\s*\)|CAST\s*\(\s*{date_ref}\s+AS\s+DATE\s*\)|{date_ref}\s*::\s*date)",
+                      as_date, work, flags=re.IGNORECASE)
+
+        if re.search(r"\bdate_demande\b", work, re.IGNORECASE):
+            raise UnroutableQuery("raw date_demande reference")
+        return work
+
+    def _map_predicate(self, predicate: str, ctx: Dict[str, Any]) -> str:
+        """Map one WHERE conjunct; only dimension filters and day-aligned date ranges are allowed."""
+        predicate = predicate.strip()
+        if re.search(r"\bOR\b", predicate, re.IGNORECASE):
+            raise UnroutableQuery("OR in WHERE clause")
+
+        date_match = re.fullmatch(
+            rf"(?:(?:{re.escape(ctx['demandes'])}|demandes)\.)?date_demande\s*(>=|<)\s*(.+)",
+            predicate, re.IGNORECASE
+        )
+        if date_match:
+            literal = self._ISO_DATE.match(date_match.group(2).strip())
+            if not literal:
+                raise UnroutableQuery("date filter is not a plain date literal")
+            year, month, day = literal.groups()
+            if day == "01":
+                self._require_grain(ctx, GRAIN_MONTH)
+                column = "__date_month__"
+            else:
+                self._require_grain(ctx, GRAIN_DAY)
+                column = "__date_day__"
+            return f"{column} {date_match.group(1)} '{year}-{month}-{day}'"
+
+        mapped, is_aggregate = self._map_expression(predicate, ctx)
+        if is_aggregate:
+            raise UnroutableQuery("aggregate in WHERE clause")
+        return mapped
+
+    def _map_order_item(self, item: str, ctx: Dict[str, Any]) -> str:
+        direction = re.search(r"\s+(ASC|DESC)(\s+NULLS\s+(?:FIRST|LAST))?$", item, re.IGNORECASE)
+        expr = item[:direction.start()] if direction else item
+        mapped = self._map_expression(expr, ctx, allow_aliases=True)[0]
+        return f"{mapped}{direction.group(0) if direction else ''}"
+
+    # ----- rendering -----
+
+    def _render(self, plan: Dict[str, Any], rollup_name: str) -> str:
+        date_column = ROLLUPS[rollup_name]["date_column"]
+
+        def resolve(sql: str) -> str:
+            # The daily rollup can serve month-grain expressions through date_trunc
+            if date_column == "jour":
+                sql = sql.replace("__date_month__", "DATE_TRUNC('month', jour)")
+            return sql.replace("__date_month__", "mois").replace("__date_day__", "jour")
+
+        select = ", ".join(
+            f"{resolve(expr)} AS {alias}" if alias else resolve(expr) for expr, alias in plan["select"]
+        )
+        sql = f"SELECT {select} FROM {ROLLUP_SCHEMA}.{rollup_name}"
+        if plan["where"]:
+            sql += " WHERE " + " AND ".join(resolve(w) for w in plan["where"])
+        if plan["group"]:
+            sql += " GROUP BY " + ", ".join(resolve(g) for g in plan["group"])
+        if plan["having"]:
+            sql += " HAVING " + resolve(plan["having"])
+        if plan["order"]:
+            sql += " ORDER BY " + ", ".join(resolve(o) for o in plan["order"])
+        if plan["limit"]:
+            sql += f" LIMIT {plan['limit']}"
+        return sql
+
+
+class _Clauses:
+    """Clause texts from the original query, located by a match on its masked copy."""
+
+    def __init__(self, original: str, masked_match):
+        self.original = original
+        self.masked_match = masked_match
+
+    def group(self, name: str) -> Optional[str]:
+        if self.masked_match.group(name) is None:
+            return None
+        start, end = self.masked_match.span(name)
+        return self.original[start:end]
+
+
+def _mask_nested(query: str) -> str:
+    """Replace characters inside parentheses and string literals with '#', keeping offsets."""
+    masked, depth, in_string = [], 0, False
+    for char in query:
+        if char == "'":
+            in_string = not in_string
+            masked.append(char)
+        elif in_string:
+            masked.append("#")
+        elif char == "(":
+            depth += 1
+            masked.append(char)
+        elif char == ")":
+            depth -= 1
+            masked.append(char)
+        else:
+            masked.append("#" if depth > 0 else char)
+    return "".join(masked)
+
+
+def _find_closing_paren(text_value: str, open_index: int) -> int:
+    depth = 0
+    for index in range(open_index, len(text_value)):
+        if text_value[index] == "(":
+            depth += 1
+        elif text_value[index] == ")":
+            depth -= 1
+            if depth == 0:
+                return index
+    raise UnroutableQuery("unbalanced parentheses")
+
+
+def _split_top_level(clause: str, separator: str) -> List[str]:
+    """Split on a separator (',' or 'AND') outside parentheses and string literals."""
+    if not clause.strip():
+        return []
+
+    parts, depth, current, in_string = [], 0, [], False
+    index = 0
+    keyword = separator.upper() != ","
+    while index < len(clause):
+        char = clause[index]
+        if char == "'":
+            in_string = not in_string
+        elif not in_string:
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            elif depth == 0:
+                if not keyword and char == ",":
+                    parts.append("".join(current))
+                    current = []
+                    index += 1
+                    continue
+                if keyword and re.match(rf"\s{separator}\s", clause[index:index + len(separator) + 2], re.IGNORECASE):
+                    # BETWEEN x AND y keeps its AND
+                    if not re.search(r"\bBETWEEN\s+\S+$", "".join(current), re.IGNORECASE):
+                        parts.append("".join(current))
+                        current = []
+                        index += len(separator) + 2
+                        continue
+        current.append(char)
+        index += 1
+    parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _split_alias(item: str) -> Tuple[str, Optional[str]]:
+    item = item.strip()
+    match = re.match(r"^(?P<expr>.+?)\s+AS\s+(?P<alias>\w+|\"[^\"]+\")$", item, re.IGNORECASE | re.DOTALL)
+    if match:
+        return match.group("expr"), match.group("alias")
+    match = re.match(r"^(?P<expr>.*[\w)'])\s+(?P<alias>\w+)$", item, re.DOTALL)
+    if match and match.group("alias").upper() not in ("DESC", "ASC", "END"):
+        return match.group("expr"), match.group("alias")
+    return item, None
+
+
+# Global instances sharing the application's database connection
+rollup_manager = RollupManager(database_connection)
+rollup_router = RollupRouter(rollup_manager)
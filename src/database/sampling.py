@@ -0,0 +1,280 @@
+# src/database/sampling.py
+"""
+Approximate answering over sampled fact tables.
+
+In approximate mode an eligible aggregate query ("COUNT/SUM/AVG over a large
+table, grouped by dimensions") is rewritten to read a random sample of its
+driving table: `TABLESAMPLE SYSTEM (p)` / `TABLESAMPLE BERNOULLI (p)` on
+PostgreSQL, a `random()` filter on SQLite. COUNT and SUM are scaled back up by
+100/p; AVG is left as is.
+
+Next to every estimated aggregate the rewritten query also returns the raw
+sample moments (n, sum, sum of squares) in hidden `__approx_*` columns.
+`finalize()` turns them into 95% confidence half-widths and strips them from
+the result. The intervals assume row-level (Bernoulli) sampling, so they are
+optimistic for SYSTEM block sampling on clustered data.
+
+Tables smaller than APPROXIMATE_MIN_ROWS (planner estimate) are never sampled,
+and the sampling rate is chosen to read about APPROXIMATE_TARGET_ROWS rows.
+"""
+
+import os
+import re
+import math
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import text
+
+from .connection import database_connection
+from .rollups import RollupRouter, UnroutableQuery, _Clauses, _mask_nested, _split_top_level, _split_alias, \
+    _find_closing_paren
+
+logger = logging.getLogger(__name__)
+
+# Fact tables large enough to be worth sampling
+SAMPLEABLE_TABLES = ("demandes", "temps_attente", "plannings", "incidents_techniques")
+
+Z_95 = 1.96
+
+
+class ApproximateRewriter:
+    """Rewrites eligible aggregate queries to run on a sample, and attaches error bounds."""
+
+    _STRUCTURE = RollupRouter._STRUCTURE
+    _UNSUPPORTED = RollupRouter._UNSUPPORTED
+    _DRIVING_TABLE = re.compile(
+        r"^(?:public\.)?(?P<table>\w+)"
+        r"(?:\s+(?:AS\s+)?(?!(?:INNER|LEFT|RIGHT|FULL|CROSS|JOIN|ON|TABLESAMPLE)\b)(?P<alias>\w+))?",
+        re.IGNORECASE
+    )
+
+    def __init__(self, db_connection, method: Optional[str] = None, min_rows: Optional[int] = None,
+                 target_rows: Optional[int] = None, size_ttl: float = 300.0):
+        self.db_connection = db_connection
+        self.method = (method or os.getenv("APPROXIMATE_SAMPLE_METHOD", "SYSTEM")).upper()
+        self.min_rows = min_rows or int(os.getenv("APPROXIMATE_MIN_ROWS", "1000000"))
+        self.target_rows = target_rows or int(os.getenv("APPROXIMATE_TARGET_ROWS", "200000"))
+        self.size_ttl = size_ttl
+        self._sizes: Dict[str, float] = {}
+        self._sizes_checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def rewrite(self, query: str, sample_percent: Optional[float] = None,
+                dialect: str = "postgresql", target_rows: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Return {'sql', 'table', 'sample_percent', 'method', 'aggregates'} or None when not eligible."""
+        try:
+            plan = self._plan(query)
+        except UnroutableQuery as e:
+            logger.debug(f"Query not eligible for approximate mode: {e}")
+            return None
+        except Exception as e:
+            logger.warning(f"Approximate rewrite failed, running exact query: {e}")
+            return None
+
+        if sample_percent is None:
+            estimated_rows = self._estimated_rows(plan["table"]) if dialect == "postgresql" else None
+            if estimated_rows is None or estimated_rows < self.min_rows:
+                logger.debug(f"Table {plan['table']} too small to sample ({estimated_rows} rows)")
+                return None
+            sample_percent = min(100.0, max(0.01, 100.0 * (target_rows or self.target_rows) / estimated_rows))
+
+        sample_percent = round(sample_percent, 4)
+        if sample_percent >= 100:
+            return None
+
+        sql = self._render(plan, sample_percent, dialect)
+        method = self.method if dialect == "postgresql" else "BERNOULLI"
+        logger.info(f"Approximate mode: sampling {sample_percent}% of {plan['table']} ({method})")
+        return {
+            "sql": sql,
+            "table": plan["table"],
+            "sample_percent": sample_percent,
+            "method": method,
+            "aggregates": plan["aggregates"],
+        }
+
+    def finalize(self, result: Dict[str, Any],
+                 approximation: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Strip the hidden moment columns and compute 95% confidence half-widths per row."""
+        columns = result.get("columns", [])
+        hidden = [i for i, c in enumerate(columns) if c.startswith("__approx_")]
+        visible = [i for i in range(len(columns)) if i not in hidden]
+        positions = {c: i for i, c in enumerate(columns)}
+        fraction = approximation["sample_percent"] / 100.0
+
+        intervals: Dict[str, List[Optional[float]]] = {}
+        small_groups = 0
+        for aggregate in approximation["aggregates"]:
+            margins = []
+            for row in result.get("data", []):
+                moments = {k: row[positions[f"__approx_{aggregate['index']}_{k}"]]
+                           for k in ("n", "s1", "s2") if f"__approx_{aggregate['index']}_{k}" in positions}
+                margin, n = self._margin(aggregate["function"], moments, fraction)
+                if n is not None and n < 30:
+                    small_groups += 1
+                margins.append(margin)
+            intervals[aggregate["column"]] = margins
+
+        finalized = dict(result)
+        finalized["columns"] = [columns[i] for i in visible]
+        finalized["data"] = [[row[i] for i in visible] for row in result.get("data", [])]
+        if "types" in result:
+            finalized["types"] = [result["types"][i] for i in visible if i < len(result["types"])]
+
+        summary = {k: v for k, v in approximation.items() if k not in ("sql", "aggregates")}
+        summary.update({"confidence": 0.95, "intervals": intervals, "small_groups": small_groups})
+        return finalized, summary
+
+    def _margin(self, function: str, moments: Dict[str, Any], fraction: float) -> Tuple[Optional[float], Optional[int]]:
+        try:
+            n = float(moments.get("n") or 0)
+            if function == "COUNT":
+                return Z_95 * math.sqrt(n * (1 - fraction)) / fraction, int(n)
+            s1, s2 = float(moments.get("s1") or 0), float(moments.get("s2") or 0)
+            if function == "SUM":
+                return Z_95 * math.sqrt(s2 * (1 - fraction)) / fraction, int(n)
+            if n < 2:
+                return None, int(n)
+            variance = max(0.0, (s2 - s1 * s1 / n) / (n - 1))
+            return Z_95 * math.sqrt(variance / n * (1 - fraction)), int(n)
+        except (TypeError, ValueError):
+            return None, None
+
+    # ----- parsing -----
+
+    def _plan(self, query: str) -> Dict[str, Any]:
+        normalized = " ".join(query.strip().rstrip(";").split())
+        if self._UNSUPPORTED.search(normalized):
+            raise UnroutableQuery("unsupported construct")
+
+        masked_match = self._STRUCTURE.match(_mask_nested(normalized))
+        if not masked_match:
+            raise UnroutableQuery("not a simple aggregate query")
+        match = _Clauses(normalized, masked_match)
+
+        if match.group("having"):
+            # Thresholds on sampled aggregates would silently drop or keep groups
+            raise UnroutableQuery("HAVING on sampled aggregates")
+
+        from_clause = match.group("from")
+        table_match = self._DRIVING_TABLE.match(from_clause)
+        if not table_match or table_match.group("table").lower() not in SAMPLEABLE_TABLES:
+            raise UnroutableQuery("driving table is not a sampleable fact table")
+
+        select_items, aggregates = [], []
+        for item in _split_top_level(match.group("select"), ","):
+            expr, alias = _split_alias(item)
+            aggregate = self._find_aggregate(expr)
+            if aggregate is None:
+                select_items.append(item)
+                continue
+            column = (alias or re.match(r"\s*(\w+)", expr).group(1).lower()).strip('"')
+            aggregate.update({"index": len(aggregates), "column": column, "expr": expr, "alias": alias})
+            aggregates.append(aggregate)
+            select_items.append(None)
+
+        if not aggregates:
+            raise UnroutableQuery("no COUNT/SUM/AVG in select list")
+
+        return {
+            "table": table_match.group("table").lower(),
+            "from": from_clause,
+            "table_ref_end": table_match.end(),
+            "table_ref": table_match.group(0),
+            "select": select_items,
+            "aggregates": aggregates,
+            "rest": normalized[masked_match.end("from"):],
+        }
+
+    def _find_aggregate(self, expr: str) -> Optional[Dict[str, Any]]:
+        """The single COUNT/SUM/AVG in a select expression, optionally wrapped in ROUND() and casts."""
+        calls = list(re.finditer(r"\b(COUNT|SUM|AVG|MIN|MAX|STDDEV\w*|VARIANCE|VAR_\w+)\s*\(", expr, re.IGNORECASE))
+        if not calls:
+            return None
+        if len(calls) > 1 or calls[0].group(1).upper() not in ("COUNT", "SUM", "AVG"):
+            raise UnroutableQuery(f"unsupported aggregate expression: {expr}")
+
+        call = calls[0]
+        end = _find_closing_paren(expr, call.end() - 1)
+        argument = expr[call.end():end].strip()
+        outer = expr[:call.start()] + "__agg__" + expr[end + 1:]
+        outer = re.sub(r"::\s*\w+(?:\s*\(\s*\d+(?:\s*,\s*\d+)?\s*\))?", "", outer)
+        if not re.fullmatch(r"\s*(?:ROUND\s*\(\s*__agg__\s*(?:,\s*\d+\s*)?\)|__agg__)\s*", outer, re.IGNORECASE):
+            raise UnroutableQuery(f"aggregate inside a larger expression: {expr}")
+
+        return {
+            "function": call.group(1).upper(),
+            "argument": argument,
+            "span": (call.start(), end + 1),
+        }
+
+    # ----- rendering -----
+
+    def _render(self, plan: Dict[str, Any], sample_percent: float, dialect: str) -> str:
+        scale = 100.0 / sample_percent
+
+        select = []
+        aggregates = iter(plan["aggregates"])
+        for item in plan["select"]:
+            if item is not None:
+                select.append(item)
+                continue
+            aggregate = next(aggregates)
+            start, end = aggregate["span"]
+            call = aggregate["expr"][start:end]
+            if aggregate["function"] in ("COUNT", "SUM"):
+                call = f"({call} * {scale!r})"
+            expr = aggregate["expr"][:start] + call + aggregate["expr"][end:]
+            select.append(f"{expr} AS {aggregate['alias'] or aggregate['column']}")
+
+        for aggregate in plan["aggregates"]:
+            prefix = f"__approx_{aggregate['index']}"
+            argument = aggregate["argument"]
+            if aggregate["function"] == "COUNT":
+                select.append(f"COUNT({argument}) AS {prefix}_n")
+                continue
+            value = f"CAST({argument} AS DOUBLE PRECISION)"
+            select.append(f"COUNT({argument}) AS {prefix}_n")
+            select.append(f"SUM({value}) AS {prefix}_s1")
+            select.append(f"SUM({value} * {value}) AS {prefix}_s2")
+
+        table_ref = plan["table_ref"]
+        if dialect == "postgresql":
+            sampled = f"{table_ref} TABLESAMPLE {self.method} ({sample_percent})"
+        else:
+            alias = self._DRIVING_TABLE.match(table_ref).group("alias") or plan["table"]
+            threshold = int(sample_percent * 100)
+            sampled = f"(SELECT * FROM {plan['table']} WHERE abs(random()) % 10000 < {threshold}) {alias}"
+        from_clause = sampled + plan["from"][plan["table_ref_end"]:]
+
+        return f"SELECT {', '.join(select)} FROM {from_clause}{plan['rest']}"
+
+    # ----- table sizes -----
+
+    def _estimated_rows(self, table_name: str) -> Optional[float]:
+        """Planner row estimate (pg_class.reltuples, summed over partitions), cached."""
+        with self._lock:
+            if time.monotonic() - self._sizes_checked_at > self.size_ttl:
+                try:
+                    with self.db_connection.engine.connect() as conn:
+                        rows = conn.execute(text("""
+                            SELECT COALESCE(p.relname, c.relname), SUM(GREATEST(c.reltuples, 0))
+                            FROM pg_class c
+                            JOIN pg_namespace n ON n.oid = c.relnamespace
+                            LEFT JOIN pg_inherits i ON i.inhrelid = c.oid
+                            LEFT JOIN pg_class p ON p.oid = i.inhparent
+                            WHERE n.nspname = 'public' AND c.relkind = 'r'
+                            GROUP BY 1
+                        """)).fetchall()
+                    self._sizes = {name: float(count) for name, count in rows}
+                    self._sizes_checked_at = time.monotonic()
+                except Exception as e:
+                    logger.warning(f"Could not read table size estimates: {e}")
+                    return None
+            return self._sizes.get(table_name)
+
+
+# Global instance sharing the application's database connection
+approximate_rewriter = ApproximateRewriter(database_connection)
@@ -0,0 +1,216 @@
+# src/database/slow_query_log.py
+"""
+Slow-query log with automatic plan capture.
+
+Every statement run through DatabaseConnection reports its duration here.
+Statements slower than SLOW_QUERY_THRESHOLD_MS are stored with their bind
+values, row count and duration. For a sample of them (SLOW_QUERY_EXPLAIN_SAMPLE_RATE)
+the statement is re-run under `EXPLAIN (ANALYZE, BUFFERS)` in a background
+thread, on DATABASE_REPLICA_URL when a read replica is configured, otherwise on
+the primary inside a READ ONLY transaction.
+
+Records live in a local SQLite file capped at SLOW_QUERY_LOG_MAX_RECORDS rows;
+the oldest records are rotated out first.
+"""
+
+import os
+import json
+import time
+import random
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from sqlalchemy import create_engine, text
+
+from .workload import fingerprint_query, normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+class SlowQueryLog:
+    """Records statements above a latency threshold, with sampled EXPLAIN ANALYZE plans."""
+
+    def __init__(self, db_path: Optional[str] = None, threshold_ms: Optional[float] = None,
+                 explain_sample_rate: Optional[float] = None, max_records: Optional[int] = None,
+                 replica_url: Optional[str] = None):
+        self.db_path = db_path or os.getenv("SLOW_QUERY_LOG_PATH", "data/slow_query_log.db")
+        self.threshold_ms = threshold_ms if threshold_ms is not None else float(
+            os.getenv("SLOW_QUERY_THRESHOLD_MS", "1000"))
+        self.explain_sample_rate = explain_sample_rate if explain_sample_rate is not None else float(
+            os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0.2"))
+        self.max_records = max_records or int(os.getenv("SLOW_QUERY_LOG_MAX_RECORDS", "5000"))
+        self.replica_url = replica_url or os.getenv("DATABASE_REPLICA_URL")
+
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._replica_engine = None
+        # A single worker keeps plan captures serialised and off the request path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=5)
+        if not self._initialized:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS slow_queries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    recorded_at REAL NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    normalized_sql TEXT NOT NULL,
+                    sql TEXT NOT NULL,
+                    params TEXT,
+                    row_count INTEGER,
+                    duration_ms REAL NOT NULL,
+                    plan TEXT,
+                    plan_source TEXT
+                )
+            """)
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_slow_queries_fingerprint ON slow_queries (fingerprint)"
+            )
+            self._initialized = True
+        return connection
+
+    def observe(self, sql: str, duration_ms: float, row_count: Optional[int] = None,
+                params: Optional[Dict[str, Any]] = None, engine=None) -> None:
+        """Report one execution. Never raises: the log must not break query execution."""
+        if duration_ms < self.threshold_ms:
+            return
+
+        try:
+            record_id = self._insert(sql, duration_ms, row_count, params)
+            logger.warning(f"Slow query ({duration_ms:.0f} ms, {row_count} rows): {sql}")
+        except Exception as e:
+            logger.warning(f"Failed to record slow query: {e}")
+            return
+
+        if engine is not None and random.random() < self.explain_sample_rate:
+            self._executor.submit(self._capture_plan, record_id, sql, params, engine)
+
+    def observe_in_background(self, sql: str, duration_ms: float, row_count: Optional[int] = None,
+                              params: Optional[Dict[str, Any]] = None, engine=None) -> None:
+        """Same as observe, but the SQLite write runs on the log's worker (for event-loop callers)."""
+        if duration_ms < self.threshold_ms:
+            return
+        self._executor.submit(self.observe, sql, duration_ms, row_count, params, engine)
+
+    def _insert(self, sql: str, duration_ms: float, row_count: Optional[int],
+                params: Optional[Dict[str, Any]]) -> int:
+        with self._lock:
+            connection = self._connect()
+            try:
+                with connection:
+                    cursor = connection.execute("""
+                        INSERT INTO slow_queries
+                            (recorded_at, fingerprint, normalized_sql, sql, params, row_count, duration_ms)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, (time.time(), fingerprint_query(sql), normalize_query(sql), sql,
+                          json.dumps(params, default=str) if params else None, row_count, duration_ms))
+                    record_id = cursor.lastrowid
+                    # Rotate: keep only the most recent max_records entries
+                    connection.execute("DELETE FROM slow_queries WHERE id <= ?",
+                                       (record_id - self.max_records,))
+                return record_id
+            finally:
+                connection.close()
+
+    def _capture_plan(self, record_id: int, sql: str, params: Optional[Dict[str, Any]], engine) -> None:
+        """Re-run the statement under EXPLAIN ANALYZE and attach the plan to its record."""
+        statement = text(f"EXPLAIN (ANALYZE, BUFFERS) {sql.rstrip().rstrip(';')}")
+        try:
+            if self.replica_url:
+                plan_source = "replica"
+                with self._get_replica_engine().connect() as connection:
+                    rows = connection.execute(statement, params or {}).fetchall()
+            else:
+                plan_source = "primary"
+                with engine.connect() as connection:
+                    # EXPLAIN ANALYZE executes the statement: make sure it cannot write
+                    connection.execute(text("SET TRANSACTION READ ONLY"))
+                    rows = connection.execute(statement, params or {}).fetchall()
+                    connection.rollback()
+            plan = "\n".join(row[0] for row in rows)
+        except Exception as e:
+            plan_source = "error"
+            plan = str(e)
+            logger.warning(f"Slow query plan capture failed: {e}")
+
+        try:
+            with self._lock:
+                connection = self._connect()
+                try:
+                    with connection:
+                        connection.execute("UPDATE slow_queries SET plan = ?, plan_source = ? WHERE id = ?",
+                                           (plan, plan_source, record_id))
+                finally:
+                    connection.close()
+        except Exception as e:
+            logger.warning(f"Failed to store slow query plan: {e}")
+
+    def _get_replica_engine(self):
+        if self._replica_engine is None:
+            self._replica_engine = create_engine(self.replica_url, pool_size=1, max_overflow=0)
+        return self._replica_engine
+
+    def top_offenders(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Fingerprints ranked by total time spent above the threshold."""
+        with self._lock:
+            connection = self._connect()
+            try:
+                connection.row_factory = sqlite3.Row
+                rows = connection.execute("""
+                    SELECT fingerprint,
+                           MIN(normalized_sql) AS normalized_sql,
+                           COUNT(*) AS occurrences,
+                           SUM(duration_ms) AS total_ms,
+                           AVG(duration_ms) AS mean_ms,
+                           MAX(duration_ms) AS max_ms,
+                           MAX(row_count) AS max_rows,
+                           MAX(recorded_at) AS last_seen,
+                           SUM(plan IS NOT NULL AND plan_source != 'error') AS plans
+                    FROM slow_queries
+                    GROUP BY fingerprint
+                    ORDER BY total_ms DESC
+                    LIMIT ?
+                """, (limit,)).fetchall()
+            finally:
+                connection.close()
+        return [dict(row) for row in rows]
+
+    def latest(self, fingerprint: str, with_plan: bool = True) -> Optional[Dict[str, Any]]:
+        """Most recent record of a fingerprint, preferring one with a captured plan."""
+        with self._lock:
+            connection = self._connect()
+            try:
+                connection.row_factory = sqlite3.Row
+                row = connection.execute(f"""
+                    SELECT * FROM slow_queries
+                    WHERE fingerprint = ?
+                    ORDER BY {"COALESCE(plan_source, '') = 'error', plan IS NULL, " if with_plan else ""}recorded_at DESC
+                    LIMIT 1
+                """, (fingerprint,)).fetchone()
+            finally:
+                connection.close()
+        if row is None:
+            return None
+        record = dict(row)
+        record['params'] = json.loads(record['params']) if record['params'] else None
+        return record
+
+    def clear(self) -> None:
+        with self._lock:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute("DELETE FROM slow_queries")
+            finally:
+                connection.close()
+
+
+# Global instance used by the execution layer
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,178 @@
+# src/database/speculative.py
+"""
+Speculative fast previews and cancellation of in-flight queries.
+
+While the full query of a question runs, a cheap variant of the same SQL runs
+in parallel on the separate preview pool (short statement timeout):
+
+- a sampled variant (see sampling.py) for aggregates over large fact tables;
+- the first QUERY_PREVIEW_ROWS rows for non-aggregate queries.
+
+The UI polls `get_preview(request_id)` and shows the preview until the full
+answer lands. Every full query runs with a `QueryCancelToken` registered under
+the question's request id; `cancel(request_id)` (the user moved on) issues
+`pg_cancel_backend` for the statement in flight, or makes it fail at start
+if it has not reached the database yet.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+from .connection import database_connection
+from .sampling import approximate_rewriter
+from .pagination import split_limit
+from .rollups import _mask_nested
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_ENABLED = os.getenv("QUERY_PREVIEW_ENABLED", "true").lower() in ("1", "true", "yes")
+PREVIEW_ROWS = int(os.getenv("QUERY_PREVIEW_ROWS", "50"))
+PREVIEW_SAMPLE_ROWS = int(os.getenv("QUERY_PREVIEW_SAMPLE_ROWS", "20000"))
+
+_AGGREGATE = re.compile(r"\bGROUP\s+BY\b|\b(?:COUNT|SUM|AVG|MIN|MAX)\s*\(|^SELECT\s+DISTINCT\b", re.IGNORECASE)
+
+
+class QueryCancelled(Exception):
+    """Raised when a query is cancelled because the user moved on."""
+
+
+class QueryCancelToken:
+    """Tracks the backend running a query so another thread can cancel it."""
+
+    def __init__(self, request_id: str, db_connection):
+        self.request_id = request_id
+        self.db_connection = db_connection
+        self.cancelled = False
+        self.backend_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def attach(self, backend_pid: int) -> None:
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled(f"Request {self.request_id} was cancelled")
+            self.backend_pid = backend_pid
+
+    def detach(self) -> None:
+        # Waits for a cancel in progress: the connection goes back to the pool only afterwards
+        with self._lock:
+            self.backend_pid = None
+
+    def cancel(self) -> None:
+        # The lock is held while cancelling so the backend cannot start someone else's statement meanwhile
+        with self._lock:
+            self.cancelled = True
+            if self.backend_pid is not None:
+                self.db_connection.cancel_backend(self.backend_pid)
+
+
+class SpeculativeExecutor:
+    """Runs preview variants of queries and tracks cancellable full queries per request."""
+
+    def __init__(self, db_connection, max_workers: int = 4, entry_ttl: float = 600.0):
+        self.db_connection = db_connection
+        self.entry_ttl = entry_ttl
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query-preview")
+
+    def _entry(self, request_id: str) -> Dict[str, Any]:
+        """Entry for a request (caller holds the lock); old entries are dropped on the way."""
+        now = time.time()
+        for stale in [r for r, e in self._entries.items() if now - e["created_at"] > self.entry_ttl]:
+            del self._entries[stale]
+        return self._entries.setdefault(request_id, {
+            "created_at": now,
+            "token": QueryCancelToken(request_id, self.db_connection),
+            "preview": None,
+            "full_done": False,
+        })
+
+    def start(self, request_id: str) -> QueryCancelToken:
+        """Cancel token for the full query of a request (already cancelled if the user moved on)."""
+        with self._lock:
+            return self._entry(request_id)["token"]
+
+    def launch_preview(self, request_id: str, sql_query: str) -> bool:
+        """Start the preview variant of a query in the background; False when there is none."""
+        if not PREVIEW_ENABLED:
+            return False
+        preview = self.preview_plan(sql_query)
+        if preview is None:
+            return False
+        self._executor.submit(self._run_preview, request_id, preview)
+        return True
+
+    def preview_plan(self, sql_query: str) -> Optional[Dict[str, Any]]:
+        """Cheap variant of a query: sampled aggregate, or its first rows."""
+        base, limit, _offset = split_limit(sql_query)
+        if _AGGREGATE.search(_mask_nested(base)):
+            approximation = approximate_rewriter.rewrite(base, target_rows=PREVIEW_SAMPLE_ROWS)
+            if approximation is None:
+                return None
+            return {"kind": "sampled", "sql": approximation["sql"], "approximation": approximation}
+
+        rows = min(PREVIEW_ROWS, limit) if limit is not None else PREVIEW_ROWS
+        return {"kind": "first_rows", "sql": f"SELECT * FROM ({base}) AS __preview LIMIT {rows}"}
+
+    def _run_preview(self, request_id: str, preview: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            result = self.db_connection.execute_query_with_names(
+                preview["sql"], engine=self.db_connection.get_preview_engine()
+            )
+            if preview["kind"] == "sampled":
+                result, preview["approximation"] = approximate_rewriter.finalize(result, preview["approximation"])
+        except Exception as e:
+            logger.info(f"Preview query skipped for {request_id}: {e}")
+            return
+
+        with self._lock:
+            entry = self._entries.get(request_id)
+            if entry is None or entry["full_done"] or entry["token"].cancelled:
+                return
+            entry["preview"] = {
+                "kind": preview["kind"],
+                "columns": result["columns"],
+                "data": result["data"],
+                "row_count": result["row_count"],
+                "approximation": preview.get("approximation"),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+        logger.info(f"Preview ready for {request_id} ({preview['kind']})")
+
+    def complete(self, request_id: str) -> None:
+        """The full query finished: a late preview is no longer published."""
+        with self._lock:
+            entry = self._entries.get(request_id)
+            if entry is not None:
+                entry["full_done"] = True
+
+    def get_preview(self, request_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(request_id)
+            return entry["preview"] if entry else None
+
+    def cancel(self, request_id: str) -> None:
+        """The user moved on: cancel the full query if it is running (or before it starts).
+
+        The cancelled entry is kept until it expires, so a worker that has not
+        called start() yet still gets the cancelled token.
+        """
+        with self._lock:
+            token = self._entry(request_id)["token"]
+        token.cancel()
+        logger.info(f"Cancelled request {request_id}")
+
+    def release(self, request_id: str) -> None:
+        """Drop a request whose full query completed normally."""
+        with self._lock:
+            self._entries.pop(request_id, None)
+
+
+# Global instance shared by the query executor node and the UI
+speculative_executor = SpeculativeExecutor(database_connection)
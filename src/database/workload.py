@@ -0,0 +1,135 @@
+# src/database/workload.py
+"""
+Workload log: fingerprints every SQL statement executed by QueryExecutionTool.
+
+Statements are normalised (literals replaced by `?`, IN-lists collapsed,
+whitespace and case folded) so that the same LLM-generated query shape with
+different values aggregates into one fingerprint. Per fingerprint we keep the
+call count, latency totals and a sample statement with real values, which the
+index advisor can EXPLAIN.
+
+The log is a small local SQLite file so recording never writes to PostgreSQL.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(sql: str) -> str:
+    """Normalise a statement so that queries differing only by literal values match."""
+    normalized = re.sub(r"--[^\n]*", " ", sql)
+    normalized = re.sub(r"/\*.*?\*/", " ", normalized, flags=re.DOTALL)
+    normalized = re.sub(r"'(?:[^']|'')*'", "?", normalized)
+    normalized = re.sub(r"(?<![\w.])-?\d+(?:\.\d+)?\b", "?", normalized)
+    normalized = re.sub(r"\(\s*\?(?:\s*,\s*\?)+\s*\)", "(?)", normalized)
+    normalized = " ".join(normalized.split()).rstrip(";").strip()
+    return normalized.lower()
+
+
+def fingerprint_query(sql: str) -> str:
+    """Stable short identifier of a normalised statement."""
+    return hashlib.sha1(normalize_query(sql).encode("utf-8")).hexdigest()[:16]
+
+
+class WorkloadLog:
+    """Aggregates executed statements by fingerprint in a local SQLite file."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("WORKLOAD_LOG_PATH", "data/workload_log.db")
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=5)
+        if not self._initialized:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS query_fingerprints (
+                    fingerprint TEXT PRIMARY KEY,
+                    normalized_sql TEXT NOT NULL,
+                    sample_sql TEXT NOT NULL,
+                    calls INTEGER NOT NULL DEFAULT 0,
+                    total_ms REAL NOT NULL DEFAULT 0,
+                    min_ms REAL,
+                    max_ms REAL,
+                    total_rows INTEGER NOT NULL DEFAULT 0,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL
+                )
+            """)
+            self._initialized = True
+        return connection
+
+    def record(self, sql: str, duration_ms: float, row_count: int = 0) -> None:
+        """Record one execution. Never raises: the log must not break query execution."""
+        try:
+            normalized = normalize_query(sql)
+            fingerprint = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+            now = time.time()
+
+            with self._lock:
+                connection = self._connect()
+                try:
+                    with connection:
+                        connection.execute("""
+                            INSERT INTO query_fingerprints
+                                (fingerprint, normalized_sql, sample_sql, calls, total_ms,
+                                 min_ms, max_ms, total_rows, first_seen, last_seen)
+                            VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?)
+                            ON CONFLICT (fingerprint) DO UPDATE SET
+                                sample_sql = excluded.sample_sql,
+                                calls = calls + 1,
+                                total_ms = total_ms + excluded.total_ms,
+                                min_ms = MIN(min_ms, excluded.min_ms),
+                                max_ms = MAX(max_ms, excluded.max_ms),
+                                total_rows = total_rows + excluded.total_rows,
+                                last_seen = excluded.last_seen
+                        """, (fingerprint, normalized, sql, duration_ms, duration_ms, duration_ms,
+                              row_count, now, now))
+                finally:
+                    connection.close()
+        except Exception as e:
+            logger.warning(f"Failed to record query in workload log: {e}")
+
+    def top(self, limit: int = 20, min_calls: int = 1) -> List[Dict[str, Any]]:
+        """Fingerprints ranked by total time spent in the database."""
+        with self._lock:
+            connection = self._connect()
+            try:
+                connection.row_factory = sqlite3.Row
+                rows = connection.execute("""
+                    SELECT fingerprint, normalized_sql, sample_sql, calls, total_ms,
+                           total_ms / calls AS mean_ms, min_ms, max_ms, total_rows,
+                           first_seen, last_seen
+                    FROM query_fingerprints
+                    WHERE calls >= ?
+                    ORDER BY total_ms DESC
+                    LIMIT ?
+                """, (min_calls, limit)).fetchall()
+            finally:
+                connection.close()
+        return [dict(row) for row in rows]
+
+    def clear(self) -> None:
+        with self._lock:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute("DELETE FROM query_fingerprints")
+            finally:
+                connection.close()
+
+
+# Global instance used by the execution layer
+workload_log = WorkloadLog()
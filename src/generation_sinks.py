@@ -0,0 +1,227 @@
+"""
+Destinations des données générées, alimentées chunk par chunk.
+
+Un sink reçoit les chunks d'une table dans l'ordre et ne garde jamais la table
+entière en mémoire : la mémoire consommée ne dépend que de la taille des
+chunks, pas du facteur d'échelle. `encode` tourne dans le processus qui a
+généré le chunk (la sérialisation est la partie coûteuse) ; `open`, `write` et
+`close` tournent dans le processus principal, qui écrit les chunks à la suite.
+
+- CsvSink : un CSV par table, en-tête puis lignes à la suite ;
+- ParquetSink : un fichier Parquet par table, un row group par chunk, avec
+  encodage dictionnaire, statistiques de colonnes et dates typées ;
+- PostgresCopySink : COPY FROM STDIN direct dans les tables PostgreSQL, sans
+  passer par un fichier.
+
+Les fichiers sont écrits sous un nom temporaire et renommés une fois complets.
+"""
+
+import io
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+# pyarrow n'est nécessaire que pour le format Parquet
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+class ChunkSink(ABC):
+    """Interface commune des sinks (encode et write à fournir par chaque sink)"""
+
+    label = ""
+
+    @staticmethod
+    @abstractmethod
+    def encode(table, df, first):
+        """Sérialiser un chunk (DataFrame) ; first est vrai pour le premier chunk de la table"""
+
+    def open(self, table):
+        pass
+
+    @abstractmethod
+    def write(self, table, payload):
+        """Écrire un chunk encodé dans la table"""
+
+    def close(self, table):
+        pass
+
+    def abort(self, table):
+        pass
+
+
+class _FileSink(ChunkSink):
+    """Sink écrivant un fichier par table dans un répertoire"""
+
+    extension = ""
+
+    def __init__(self, output_dir="data/csv"):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.label = f"📂 Fichiers {self.extension} sauvegardés dans : {self.output_dir}"
+
+    def path(self, table):
+        return self.output_dir / f"{table}.{self.extension}"
+
+    def _tmp_path(self, table):
+        return self.output_dir / f".{table}.{self.extension}.tmp"
+
+    def _finish(self, table):
+        os.replace(self._tmp_path(table), self.path(table))
+
+    def abort(self, table):
+        self._tmp_path(table).unlink(missing_ok=True)
+
+
+class CsvSink(_FileSink):
+    """CSV écrits chunk par chunk : l'en-tête avec le premier, puis les lignes à la suite"""
+
+    extension = "csv"
+
+    def __init__(self, output_dir="data/csv"):
+        super().__init__(output_dir)
+        self._files = {}
+
+    @staticmethod
+    def encode(table, df, first):
+        return df.to_csv(index=False, header=first).encode('utf-8')
+
+    def open(self, table):
+        self._files[table] = open(self._tmp_path(table), 'wb')
+
+    def write(self, table, payload):
+        self._files[table].write(payload)
+
+    def close(self, table):
+        self._files.pop(table).close()
+        self._finish(table)
+
+    def abort(self, table):
+        f = self._files.pop(table, None)
+        if f is not None:
+            f.close()
+        super().abort(table)
+
+
+class ParquetSink(_FileSink):
+    """Fichiers Parquet écrits chunk par chunk, un row group par chunk"""
+
+    extension = "parquet"
+
+    def __init__(self, output_dir="data/csv", compression="snappy"):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Le format Parquet nécessite pyarrow : pip install pyarrow")
+        super().__init__(output_dir)
+        self.compression = compression
+        self._writers = {}
+
+    @staticmethod
+    def encode(table, df, first):
+        from .data_generator import DATE_COLUMNS
+
+        arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+        for column in DATE_COLUMNS.get(table, []):
+            position = arrow_table.schema.get_field_index(column)
+            arrow_table = arrow_table.set_column(
+                position, column, arrow_table.column(column).cast(pa.date32())
+            )
+        return arrow_table
+
+    def open(self, table):
+        self._writers[table] = None
+
+    def write(self, table, payload):
+        writer = self._writers[table]
+        if writer is None:
+            # Le schéma du premier chunk fait foi pour toute la table
+            # Dictionnaire pour les colonnes répétitives, statistiques min/max/nulls par row group :
+            # les lecteurs obtiennent schéma, nombre de lignes et nulls sans lire les données
+            writer = pq.ParquetWriter(self._tmp_path(table), payload.schema, compression=self.compression,
+                                      use_dictionary=True, write_statistics=True)
+            self._writers[table] = writer
+        else:
+            payload = payload.cast(writer.schema)
+        writer.write_table(payload)
+
+    def close(self, table):
+        self._writers.pop(table).close()
+        self._finish(table)
+
+    def abort(self, table):
+        writer = self._writers.pop(table, None)
+        if writer is not None:
+            writer.close()
+        super().abort(table)
+
+
+class PostgresCopySink(ChunkSink):
+    """COPY FROM STDIN direct dans des tables PostgreSQL existantes, chunk par chunk.
+
+    Chaque chunk est copié puis validé : en mode partitionné, les partitions
+    mensuelles couvrant le chunk sont créées juste avant, sur une autre
+    connexion. La séquence de l'id est recalée à la fin de chaque table.
+    """
+
+    label = "🐘 Données copiées directement dans PostgreSQL"
+
+    def __init__(self, engine, partitioned=False):
+        self.engine = engine
+        self.partitioned = partitioned
+        self._raw = {}
+
+    @staticmethod
+    def encode(table, df, first):
+        from .database.partitioning import PARTITIONED_TABLES
+
+        time_column = PARTITIONED_TABLES.get(table)
+        time_range = None
+        if time_column in df and len(df):
+            time_range = (df[time_column].min(), df[time_column].max())
+        return {
+            'columns': list(df.columns),
+            'csv': df.to_csv(index=False, header=False).encode('utf-8'),
+            'time_range': time_range
+        }
+
+    def open(self, table):
+        self._raw[table] = self.engine.raw_connection()
+
+    def write(self, table, payload):
+        from .database.partitioning import ensure_monthly_partitions
+
+        if self.partitioned and payload['time_range']:
+            with self.engine.connect() as conn:
+                ensure_monthly_partitions(conn, table, *payload['time_range'])
+                conn.commit()
+
+        raw = self._raw[table]
+        column_list = ", ".join(f'"{c}"' for c in payload['columns'])
+        cursor = raw.cursor()
+        cursor.copy_expert(
+            f'COPY "{table}" ({column_list}) FROM STDIN WITH (FORMAT csv)', io.BytesIO(payload['csv'])
+        )
+        raw.commit()
+
+    def close(self, table):
+        from sqlalchemy import text
+
+        self._raw.pop(table).close()
+        # Les id ont été fournis : la séquence doit repartir après le plus grand
+        with self.engine.connect() as conn:
+            sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"),
+                                    {"table": table}).scalar()
+            if sequence:
+                conn.execute(text(
+                    f'SELECT setval(:sequence, COALESCE((SELECT MAX(id) FROM "{table}"), 0) + 1, false)'
+                ), {"sequence": sequence})
+            conn.commit()
+
+    def abort(self, table):
+        raw = self._raw.pop(table, None)
+        if raw is not None:
+            raw.rollback()
+            raw.close()
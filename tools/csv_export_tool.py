@@ -1,17 +1,32 @@
 """
 CSV export tool for saving query results - UPDATED: Clean data only, no metadata
+
+Exports are streamed by the export engine: when the query result has more rows
+than its first page, the whole query is re-read through a server-side cursor
+batch by batch instead of being held in memory. CSV (optionally gzip/zstd),
+Parquet and Arrow IPC outputs are available (EXPORT_FORMAT / EXPORT_COMPRESSION).
+Finished files go to the content-addressed artifact store: an export identical
+to an earlier one reuses its file.
 """
 
-import csv
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from langchain.tools import BaseTool
 from pydantic import Field
 from datetime import datetime
 import logging
 
+from src.database.export_engine import (
+    ExportEngine, rows_batches, export_suffix, DEFAULT_COMPRESSION, EXPORT_FORMATS
+)
+
 logger = logging.getLogger(__name__)
 
+EXPORT_FORMAT = os.getenv("EXPORT_FORMAT", "csv")
+# "default" picks the format's usual codec (zstd for Parquet, none for CSV and Arrow)
+EXPORT_COMPRESSION = os.getenv("EXPORT_COMPRESSION", "default")
+EXPORT_FULL_RESULT = os.getenv("EXPORT_FULL_RESULT", "true").lower() == "true"
+
 class CsvExportTool(BaseTool):
     """Tool for exporting query results to CSV files with clean data only."""
 
@@ -19,6 +34,7 @@ class CsvExportTool(BaseTool):
     description: str = """
     Export query results to CSV files for download.
     Creates clean CSV files with only the data, no metadata or query information.
+    Also writes compressed CSV (gzip/zstd), Parquet or Arrow IPC files.
     """
 
     # Properly declare the export_dir field for Pydantic v2
@@ -29,9 +45,20 @@ class CsvExportTool(BaseTool):
         # Create exports directory if it doesn't exist
         os.makedirs(self.export_dir, exist_ok=True)
 
-    def _run(self, query_result: Dict[str, Any], user_question: str = "", filename: str = None) -> Dict[str, Any]:
-        """Export query results to CSV file with clean data only."""
+    def _run(self, query_result: Dict[str, Any], user_question: str = "", filename: str = None,
+             export_format: str = None, compression: Optional[str] = "default") -> Dict[str, Any]:
+        """Export query results to a file (CSV by default) with clean data only."""
         try:
+            export_format = export_format or EXPORT_FORMAT
+            if export_format not in EXPORT_FORMATS:
+                raise ValueError(f"Unknown export format: {export_format}")
+            if compression == "default":
+                compression = EXPORT_COMPRESSION
+            if compression == "default":
+                compression = DEFAULT_COMPRESSION[export_format]
+            elif compression in ("", "none"):
+                compression = None
+
             # Check if we have valid data to export
             if not self._has_exportable_data(query_result):
                 return {
@@ -40,15 +67,18 @@ class CsvExportTool(BaseTool):
                     'message': 'Query returned no results or data is not exportable'
                 }
 
-            # Generate filename if not provided
+            # Generate filename if not provided (offered for download; the file is stored under its hash)
+            suffix = export_suffix(export_format, compression)
             if not filename:
-                filename = self._generate_filename(user_question)
+                filename = self._generate_filename(user_question, suffix)
 
-            # Get data from query result
-            export_data = self._extract_export_data(query_result)
-
-            # Create CSV file with clean data only
-            file_path = self._create_clean_csv_file(export_data, filename)
+            # Stream the data into the file: from the cursor when only a page is in memory
+            export_stats = ExportEngine(self.export_dir).export(
+                self._export_source(query_result), filename, export_format, compression
+            )
+            from core.artifact_store import artifact_store
+            artifact = artifact_store.put_file('csv', export_stats['file_path'], suffix)
+            file_path = artifact['path']
 
             # Get file stats
             file_stats = self._get_file_stats(file_path)
@@ -57,8 +87,12 @@ class CsvExportTool(BaseTool):
                 'success': True,
                 'file_path': file_path,
                 'filename': filename,
+                'artifact_id': artifact['artifact_id'],
+                'reused': artifact['reused'],
+                'format': export_format,
                 'file_stats': file_stats,
-                'message': f"Clean CSV file created successfully: {filename}"
+                'export_stats': export_stats,
+                'message': f"Clean {export_format.upper()} file created successfully: {filename}"
             }
 
         except Exception as e:
@@ -80,7 +114,7 @@ class CsvExportTool(BaseTool):
 
         return len(data) > 0 and len(columns) > 0
 
-    def _generate_filename(self, user_question: str = "") -> str:
+    def _generate_filename(self, user_question: str = "", suffix: str = ".csv") -> str:
         """Generate a filename based on timestamp and question."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
@@ -89,9 +123,9 @@ class CsvExportTool(BaseTool):
             clean_question = self._clean_filename(user_question)
             if len(clean_question) > 30:
                 clean_question = clean_question[:30]
-            filename = f"query_{clean_question}_{timestamp}.csv"
+            filename = f"query_{clean_question}_{timestamp}{suffix}"
         else:
-            filename = f"query_results_{timestamp}.csv"
+            filename = f"query_results_{timestamp}{suffix}"
 
         return filename
 
@@ -116,36 +150,22 @@ class CsvExportTool(BaseTool):
             'row_count': result_data.get('row_count', 0)
         }
 
-    def _create_clean_csv_file(self, export_data: Dict[str, Any], filename: str) -> str:
-        """Create CSV file with ONLY the clean data - no metadata."""
-        file_path = os.path.join(self.export_dir, filename)
-
-        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-
-            # Write headers
-            columns = export_data['columns']
-            writer.writerow(columns)
-
-            # Write ONLY the data rows - no metadata, no query, no comments
-            for row in export_data['data']:
-                # Convert each value to string and handle None values
-                csv_row = [self._format_csv_value(value) for value in row]
-                writer.writerow(csv_row)
-
-        logger.info(f"Clean CSV file created: {file_path}")
-        return file_path
-
-    def _format_csv_value(self, value: Any) -> str:
-        """Format a value for CSV output."""
-        if value is None:
-            return ""
-        elif isinstance(value, (int, float)):
-            return str(value)
-        elif isinstance(value, datetime):
-            return value.strftime("%Y-%m-%d %H:%M:%S")
-        else:
-            return str(value)
+    def _export_source(self, query_result: Dict[str, Any]):
+        """Batches to export: the full query through a cursor if rows remain beyond the page, else the page."""
+        handle = query_result.get('result_handle') or {}
+        executed_query = query_result.get('executed_query')
+        if EXPORT_FULL_RESULT and handle.get('has_more') and executed_query:
+            return self._admitted_batches(executed_query, handle.get('user') or 'unknown')
+
+        export_data = self._extract_export_data(query_result)
+        return rows_batches(export_data['columns'], export_data['data'])
+
+    def _admitted_batches(self, query: str, user: str):
+        """Stream the full query while holding a slot of its workload class."""
+        from src.database.connection import database_connection
+        from src.database.admission import workload_manager
+        with workload_manager.admit(query, user=user):
+            yield from database_connection.iter_query_batches(query)
 
     def _get_file_stats(self, file_path: str) -> Dict[str, Any]:
         """Get file statistics."""
@@ -170,21 +190,24 @@ class CsvExportTool(BaseTool):
         return f"{size_bytes:.1f} TB"
 
     def list_exported_files(self) -> List[Dict[str, Any]]:
-        """List all exported CSV files."""
+        """List all exported files (CSV, compressed CSV, Parquet, Arrow) from the artifact index."""
         try:
+            from core.artifact_store import artifact_store
             files = []
-            for filename in os.listdir(self.export_dir):
-                if filename.endswith('.csv'):
-                    file_path = os.path.join(self.export_dir, filename)
-                    stats = self._get_file_stats(file_path)
-                    files.append({
-                        'filename': filename,
-                        'path': file_path,
-                        **stats
-                    })
-
-            # Sort by creation time (newest first)
-            files.sort(key=lambda x: x.get('created', ''), reverse=True)
+            for artifact in artifact_store.list_artifacts('csv'):
+                file_path = artifact['path']
+                files.append({
+                    'filename': os.path.basename(file_path),
+                    'path': file_path,
+                    'artifact_id': artifact['artifact_id'],
+                    'size_bytes': artifact['size_bytes'],
+                    'size_human': self._format_file_size(artifact['size_bytes']),
+                    'created': datetime.fromtimestamp(artifact['created_at']).isoformat(),
+                    'last_access': datetime.fromtimestamp(artifact['last_access']).isoformat(),
+                    'absolute_path': os.path.abspath(file_path)
+                })
+
+            # Most recently used first
             return files
 
         except Exception as e:
@@ -207,10 +230,11 @@ class CsvExportTool(BaseTool):
             files_to_delete = files[max_files:]
             deleted_count = 0
 
+            from core.artifact_store import artifact_store
             for file_info in files_to_delete:
                 try:
-                    os.remove(file_info['path'])
-                    deleted_count += 1
+                    if artifact_store.remove(file_info['artifact_id']):
+                        deleted_count += 1
                 except Exception as e:
                     logger.error(f"Failed to delete {file_info['filename']}: {e}")
 
@@ -73,14 +73,18 @@ class ModernVisualizationTool(BaseTool):
                 logger.info(f"LLM Analysis Result: {viz_analysis}")
 
             # Generate the visualization
-            html_file = self._create_professional_visualization(columns, cleaned_data, viz_analysis, user_question)
+            artifact = self._create_professional_visualization(columns, cleaned_data, viz_analysis, user_question)
+            html_file = artifact['path']
 
-            # Get file stats
+            # Get file stats (the file is named by its hash; downloads keep a readable name)
             file_stats = self._get_file_stats(html_file)
+            file_stats['filename'] = artifact['name']
 
             return {
                 'success': True,
                 'html_file': html_file,
+                'artifact_id': artifact['artifact_id'],
+                'reused': artifact['reused'],
                 'visualization_type': viz_analysis.get('chart_type'),
                 'file_stats': file_stats,
                 'message': f"Professional visualization created: {os.path.basename(html_file)}"
@@ -999,13 +1003,17 @@ class ModernVisualizationTool(BaseTool):
     # HTML VISUALIZATION GENERATION
     # ========================================
 
-    def _create_professional_visualization(self, columns: List[str], data: List[List], viz_analysis: Dict[str, Any], user_question: str) -> str:
-        """Create the professional HTML visualization file with safe UTF-8 handling."""
+    def _create_professional_visualization(self, columns: List[str], data: List[List], viz_analysis: Dict[str, Any], user_question: str) -> Dict[str, Any]:
+        """Create the professional HTML visualization file with safe UTF-8 handling.
 
-        # Generate filename
+        The file is stored in the artifact store under the hash of its content,
+        so an identical chart reuses the existing file.
+        """
+        from core.artifact_store import artifact_store
+
+        # Generate filename (offered for download)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"chart_{timestamp}.html"
-        filepath = os.path.join(self.export_dir, filename)
 
         # Prepare chart data using the fixed method
         chart_data = self._prepare_chart_data(columns, data, viz_analysis)
@@ -1016,17 +1024,20 @@ class ModernVisualizationTool(BaseTool):
         # Generate HTML content
         html_content = self._generate_streamlit_optimized_html_template(chart_data, viz_analysis, user_question)
 
-        # Write to file with proper encoding
+        # Encode with proper encoding
         try:
-            with open(filepath, 'w', encoding='utf-8', errors='replace') as f:
-                f.write(html_content)
+            content = html_content.encode('utf-8', errors='replace')
         except UnicodeEncodeError:
             # Fallback to ASCII if UTF-8 fails
-            with open(filepath, 'w', encoding='ascii', errors='replace') as f:
-                f.write(html_content)
+            content = html_content.encode('ascii', errors='replace')
+
+        artifact = artifact_store.put_bytes('chart', content, self.export_dir, '.html', filename)
 
-        logger.info(f"Professional visualization created: {filepath}")
-        return filepath
+        if artifact['reused']:
+            logger.info(f"Identical visualization already stored: {artifact['path']}")
+        else:
+            logger.info(f"Professional visualization created: {artifact['path']}")
+        return artifact
 
     def _generate_streamlit_optimized_html_template(self, chart_data: Dict[str, Any], viz_analysis: Dict[str, Any], user_question: str) -> str:
         """Generate HTML template optimized for Streamlit container."""
@@ -1231,7 +1242,7 @@ class ModernVisualizationTool(BaseTool):
         </div>
         
         <div class="footer">
-            Powered by Castor • {datetime.now().strftime("%B %d, %Y at %I:%M %p")}
+            Powered by Castor • {datetime.now().strftime("%B %d, %Y")}
         </div>
     </div>
 
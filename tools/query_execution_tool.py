@@ -2,13 +2,20 @@
 Query execution tool with PostgreSQL database support.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from langchain.tools import BaseTool
 import re
+import time
+import asyncio
 import logging
 
 # Import from new database location
 from src.database.connection import database_connection
+from src.database.rollups import rollup_router
+from src.database.workload import workload_log
+from src.database.sampling import approximate_rewriter
+from src.database.pagination import result_handles, split_limit
+from src.database.admission import workload_manager
 
 logger = logging.getLogger(__name__)
 
@@ -18,45 +25,163 @@ class QueryExecutionTool(BaseTool):
     name: str = "execute_query"
     description: str = """
     Execute SQL queries on PostgreSQL database safely.
-    Validates queries, adds safety limits, and returns structured results.
+    Validates queries and returns the first page of results with a handle
+    for fetching further pages. With approximate=True, large aggregate scans
+    run on a table sample.
     """
 
-    def _run(self, sql_query: str) -> Dict[str, Any]:
-        """Execute the SQL query safely."""
+    def _run(self, sql_query: str, approximate: bool = False, cancel_token=None,
+             username: str = "unknown") -> Dict[str, Any]:
+        """Execute the SQL query safely (cancellable through cancel_token)."""
         try:
             # Validate query safety
             if not self._validate_query(sql_query):
-                return {
-                    'success': False,
-                    'error': 'Query validation failed - potentially unsafe query',
-                    'details': 'Only SELECT statements are allowed'
-                }
+                return self._validation_failure()
 
-            # Add safety limits
-            safe_query = self._add_safety_limits(sql_query)
+            safe_query, executed_query, routed, approximation = self._plan_execution(sql_query, approximate)
 
-            # Execute the query
-            result = database_connection.execute_query_with_names(safe_query)
+            # Wait for a slot of the query's workload class (interactive / heavy)
+            with workload_manager.admit(executed_query if routed or approximation else sql_query,
+                                        user=username) as ticket:
+                if routed or approximation:
+                    # Rewritten aggregates are small: run them in one go
+                    started = time.perf_counter()
+                    result = database_connection.execute_query_with_names(executed_query, cancel_token=cancel_token)
+                    self._record_workload(executed_query, started, result)
+                    return self._execution_success(result, executed_query, safe_query, routed, approximation,
+                                                   ticket=ticket)
 
-            # Process results
-            processed_result = self._process_results(result)
+                # Everything else is paged: first page now, the rest on demand
+                handle = result_handles.open(sql_query, user=username)
+                handle.accept_probe(database_connection.execute_query_with_names(handle.probe_sql()))
+                page_query = handle.first_page_sql()
 
-            return {
-                'success': True,
-                'result': processed_result,
-                'executed_query': safe_query,
-                'message': f"Query executed successfully"
-            }
+                started = time.perf_counter()
+                result = handle.accept_first_page(
+                    database_connection.execute_query_with_names(page_query, cancel_token=cancel_token)
+                )
+                self._record_workload(sql_query, started, result)
+
+                if handle.has_more:
+                    handle.estimate_total()
+                return self._execution_success(result, sql_query, safe_query, handle=handle, ticket=ticket)
 
         except Exception as e:
-            logger.error(f"Query execution failed: {e}")
-            error_info = self._parse_sql_error(str(e))
-            return {
-                'success': False,
-                'error': error_info['user_message'],
-                'suggestion': error_info['suggestion'],
-                'details': str(e)
-            }
+            return self._execution_failure(e)
+
+    async def _arun(self, sql_query: str, approximate: bool = False,
+                    username: str = "unknown") -> Dict[str, Any]:
+        """Execute the SQL query safely without blocking the event loop."""
+        ticket = None
+        try:
+            if not self._validate_query(sql_query):
+                return self._validation_failure()
+
+            safe_query, executed_query, routed, approximation = self._plan_execution(sql_query, approximate)
+
+            ticket = await asyncio.to_thread(
+                workload_manager.acquire, executed_query if routed or approximation else sql_query, username
+            )
+
+            if routed or approximation:
+                started = time.perf_counter()
+                result = await database_connection.execute_query_with_names_async(executed_query)
+                self._record_workload(executed_query, started, result)
+                return self._execution_success(result, executed_query, safe_query, routed, approximation,
+                                               ticket=ticket)
+
+            handle = result_handles.open(sql_query, user=username)
+            handle.accept_probe(await database_connection.execute_query_with_names_async(handle.probe_sql()))
+            page_query = handle.first_page_sql()
+
+            started = time.perf_counter()
+            result = handle.accept_first_page(await database_connection.execute_query_with_names_async(page_query))
+            self._record_workload(sql_query, started, result)
+
+            if handle.has_more:
+                await asyncio.to_thread(handle.estimate_total)
+            return self._execution_success(result, sql_query, safe_query, handle=handle, ticket=ticket)
+
+        except Exception as e:
+            return self._execution_failure(e)
+        finally:
+            workload_manager.release(ticket)
+
+    def _plan_execution(self, sql_query: str, approximate: bool = False
+                        ) -> Tuple[str, str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Decide whether a rollup rewrite or a sampled rewrite runs instead of the paged query."""
+        # Rewrites run in one go, so they keep a safety limit
+        safe_query = self._add_safety_limits(sql_query)
+
+        # Answer from a pre-aggregated rollup when one covers the query
+        routed = rollup_router.rewrite(safe_query)
+        if routed:
+            return safe_query, routed['sql'], routed, None
+
+        # An exact rollup answer beats a sample; otherwise sample large scans on request
+        approximation = approximate_rewriter.rewrite(safe_query) if approximate else None
+        if approximation:
+            return safe_query, approximation['sql'], None, approximation
+
+        return safe_query, safe_query, None, None
+
+    def _record_workload(self, statement: str, started: float, result: Dict[str, Any]) -> None:
+        """Feed a statement and its latency to the workload log (the user's query, not its paging wrapper)."""
+        duration_ms = (time.perf_counter() - started) * 1000
+        workload_log.record(statement, duration_ms, result.get('row_count', 0))
+
+    def _validation_failure(self) -> Dict[str, Any]:
+        """Result returned when a query is rejected by validation."""
+        return {
+            'success': False,
+            'error': 'Query validation failed - potentially unsafe query',
+            'details': 'Only SELECT statements are allowed'
+        }
+
+    def _execution_success(self, result: Dict[str, Any], executed_query: str, safe_query: str,
+                           routed: Optional[Dict[str, Any]] = None,
+                           approximation: Optional[Dict[str, Any]] = None,
+                           handle=None, ticket=None) -> Dict[str, Any]:
+        """Wrap raw database results into the tool's success payload."""
+        if approximation:
+            result, approximation = approximate_rewriter.finalize(result, approximation)
+
+        # Process results
+        processed_result = self._process_results(result)
+
+        payload = {
+            'success': True,
+            'result': processed_result,
+            'executed_query': executed_query,
+            'message': f"Query executed successfully"
+        }
+
+        if routed:
+            payload['rollup_used'] = routed['rollup']
+            payload['original_query'] = safe_query
+
+        if approximation:
+            payload['approximation'] = approximation
+            payload['original_query'] = safe_query
+
+        if handle is not None:
+            payload['result_handle'] = handle.describe()
+
+        if ticket is not None:
+            payload['admission'] = {'workload_class': ticket.workload_class, 'wait_ms': ticket.wait_ms}
+
+        return payload
+
+    def _execution_failure(self, error: Exception) -> Dict[str, Any]:
+        """Turn a database exception into the tool's failure payload."""
+        logger.error(f"Query execution failed: {error}")
+        error_info = self._parse_sql_error(str(error))
+        return {
+            'success': False,
+            'error': error_info['user_message'],
+            'suggestion': error_info['suggestion'],
+            'details': str(error)
+        }
 
     def _validate_query(self, query: str) -> bool:
         """Validate SQL query for security and safety."""
@@ -85,10 +210,9 @@ class QueryExecutionTool(BaseTool):
 
     def _add_safety_limits(self, query: str, default_limit: int = 1000) -> str:
         """Add LIMIT clause if not present."""
-        query_upper = query.upper()
-
-        # Check if LIMIT already exists
-        if 'LIMIT' in query_upper:
+        # Only the statement's own trailing LIMIT counts, not one in a subquery or literal
+        _, limit, _ = split_limit(query)
+        if limit is not None:
             return query
 
         # Add LIMIT clause
@@ -116,7 +240,17 @@ class QueryExecutionTool(BaseTool):
         """Parse SQL error and provide user-friendly messages."""
         error_lower = error_str.lower()
 
-        if 'syntax error' in error_lower:
+        if 'database busy' in error_lower:
+            return {
+                'user_message': 'Database is busy',
+                'suggestion': 'Too many heavy queries are running right now; try again in a moment or narrow the question'
+            }
+        elif 'canceling statement due to user request' in error_lower or 'was cancelled' in error_lower:
+            return {
+                'user_message': 'Query cancelled',
+                'suggestion': 'The query was stopped because a newer request replaced it'
+            }
+        elif 'syntax error' in error_lower:
             return {
                 'user_message': 'SQL syntax error in the generated query',
                 'suggestion': 'Please rephrase your question or try a simpler request'
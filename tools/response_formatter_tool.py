@@ -66,7 +66,19 @@ class ResponseFormatterTool(BaseTool):
 
         # 1. Data Results Section (placeholder for Streamlit dataframe)
         response_parts.append("**📊 Data Results:**")
-        response_parts.append("[TABLE_DATA_PLACEHOLDER]")
+        handle = result.get('result_handle')
+        if handle and handle.get('has_more'):
+            # The table fetches further pages through the result handle
+            response_parts.append(f"[TABLE_DATA_PLACEHOLDER][RESULT_HANDLE:{handle['id']}]")
+            response_parts.append(self._format_pagination_note(handle))
+        else:
+            response_parts.append("[TABLE_DATA_PLACEHOLDER]")
+
+        # 1b. Approximate Answer Section (sampled execution with error bounds)
+        if result.get('approximation'):
+            response_parts.append("**≈ Approximate Answer:**")
+            response_parts.append(self._format_approximation(result['approximation'], query_result))
+            response_parts.append("[EXACT_RUN_PLACEHOLDER]")
 
         # 2. Key Insights Section (with proper line breaks as you requested)
         insights = self._generate_key_insights_formatted(query_result)
@@ -80,8 +92,9 @@ class ResponseFormatterTool(BaseTool):
             response_parts.append("**⚡ Executed Query:**")
             response_parts.append(f"```sql\n{clean_query}\n```")
 
-        # 4. Chart Generated Section
-        if visualization_result and visualization_result.get('success', False):
+        # 4. Chart Generated Section (a background chart job fills it once done)
+        if visualization_result and (visualization_result.get('success', False)
+                                     or visualization_result.get('job_id')):
             response_parts.append("**📈 Chart Generated:**")
             response_parts.append("[CHART_DISPLAY_PLACEHOLDER]")
 
@@ -151,6 +164,50 @@ class ResponseFormatterTool(BaseTool):
             logger.debug(f"Insights generation failed: {e}")
             return ""
 
+    def _format_pagination_note(self, handle: Dict[str, Any]) -> str:
+        """Tell the user the table shows the first page of a larger result."""
+        estimate = handle.get('total_estimate') or {}
+        count = estimate.get('count')
+        if count is None:
+            total = "more"
+        elif estimate.get('exact'):
+            total = f"{count:,}"
+        else:
+            total = f"~{self._format_number_clean(count)}"
+        return f"*Showing the first {handle['delivered']:,} of {total} rows — load more from the table*"
+
+    def _format_approximation(self, approximation: Dict[str, Any], query_result: Dict[str, Any]) -> str:
+        """Describe the sample and show confidence intervals for the estimated columns."""
+        lines = [
+            f"• **Sample:** {approximation['sample_percent']:g}% of `{approximation['table']}` "
+            f"({approximation['method']}), {approximation['confidence']:.0%} confidence intervals"
+        ]
+
+        columns = query_result.get('columns', [])
+        data = query_result.get('data', [])
+        label_index = next((i for i, c in enumerate(columns) if c not in approximation['intervals']), None)
+
+        for column, margins in approximation['intervals'].items():
+            if column not in columns:
+                continue
+            index = columns.index(column)
+            for row_number, (row, margin) in enumerate(zip(data, margins)):
+                if row_number >= 5:
+                    lines.append(f"• … {len(data) - 5} more rows")
+                    break
+                label = f" ({self._format_cell_value_clean(row[label_index])})" if label_index is not None else ""
+                value = row[index]
+                if margin is None or value is None:
+                    lines.append(f"• **{column}**{label}: {self._format_cell_value_clean(value)} (interval unavailable)")
+                else:
+                    lines.append(f"• **{column}**{label}: {float(value):,.2f} ± {margin:,.2f}")
+
+        if approximation.get('small_groups'):
+            lines.append(f"• ⚠️ {approximation['small_groups']} groups have fewer than 30 sampled rows: "
+                         f"their intervals are unreliable")
+
+        return "\n\n".join(lines)
+
     def _clean_sql_for_streamlit(self, sql_query: str) -> str:
         """Clean SQL query for Streamlit display."""
         # Remove artifacts and clean up
@@ -194,15 +251,22 @@ class ResponseFormatterTool(BaseTool):
 
     def _prepare_streamlit_attachments(self, csv_result: Dict[str, Any] = None,
                                      visualization_result: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Prepare file attachments optimized for Streamlit."""
+        """Prepare file attachments optimized for Streamlit (handed to the UI through the graph state)."""
         attachments = {}
 
+        # Artifacts still being generated are referenced by job
+        pending = {kind: result['job_id'] for kind, result in (('csv', csv_result), ('chart', visualization_result))
+                   if result and result.get('job_id')}
+        if pending:
+            attachments['pending_artifacts'] = pending
+
         if csv_result and csv_result.get('success', False):
             attachments['csv'] = {
                 'type': 'csv',
                 'filename': csv_result.get('filename'),
                 'path': csv_result.get('file_path'),
                 'size': csv_result.get('file_stats', {}).get('size_human'),
+                'artifact_id': csv_result.get('artifact_id'),
                 'label': f"📊 CSV Data ({csv_result.get('file_stats', {}).get('size_human', 'Unknown')})"
             }
 
@@ -214,6 +278,7 @@ class ResponseFormatterTool(BaseTool):
                 'filename': file_stats.get('filename'),
                 'path': visualization_result.get('html_file'),
                 'size': file_stats.get('size_human'),
+                'artifact_id': visualization_result.get('artifact_id'),
                 'label': f"📈 {viz_type.title()} Chart ({file_stats.get('size_human', 'Unknown')})"
             }
 